@@ -0,0 +1,134 @@
+import os
+import threading
+import http.client
+import urllib.parse
+
+# Tamaño de cada bloque al volcar una descarga a disco
+_TAM_BLOQUE = 64 * 1024
+
+# Errores que indican que el servidor cerró una conexión reutilizada
+# (keep-alive caducado). La petición se reintenta una vez con una nueva.
+_ERRORES_CONEXION_CADUCADA = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+    ConnectionAbortedError,
+)
+
+
+# Conexiones HTTP(S) persistentes (keep-alive), una por host y por hilo.
+#
+# urllib.request abre y cierra una conexión (con su handshake TLS) en cada
+# petición; aquí cada hilo guarda la suya con http.client y la reutiliza
+# mientras el servidor no la cierre. Son por hilo porque
+# http.client.HTTPConnection no se puede compartir entre hilos.
+class ConexionesHTTP:
+    def __init__(self, user_agent="TFG-Emulador"):
+        self.user_agent = user_agent
+        self._local = threading.local()
+
+    # GET de 'url'. Devuelve (status, reason, cuerpo en bytes). Los errores
+    # de red se propagan (OSError, http.client.HTTPException).
+    def get(self, url, timeout=30):
+        status, reason, cuerpo, _ = self._peticion(url, {}, timeout, lambda respuesta: respuesta.read())
+        return status, reason, cuerpo
+
+    # GET de 'url' volcando el cuerpo a 'ruta_destino' por bloques, sin
+    # tenerlo entero en memoria. Se escribe en ruta_destino + ".part" y solo
+    # se renombra al destino si la descarga termina bien.
+    # Con 'etag' se hace una petición condicional (If-None-Match): si el
+    # servidor responde 304 el archivo local sigue valiendo y no se toca.
+    # Devuelve (status, reason, ETag de la respuesta o None, bytes escritos);
+    # si status no es 200, el destino no cambia.
+    def descargar(self, url, ruta_destino, timeout=30, etag=None):
+        cabeceras = {"If-None-Match": etag} if etag else {}
+        tmp = ruta_destino + ".part"
+
+        def volcar(respuesta):
+            if respuesta.status != 200:
+                respuesta.read()   # vaciar para poder reutilizar la conexión
+                return 0
+            escritos = 0
+            with open(tmp, "wb") as archivo:
+                while True:
+                    bloque = respuesta.read(_TAM_BLOQUE)
+                    if not bloque:
+                        break
+                    archivo.write(bloque)
+                    escritos += len(bloque)
+            return escritos
+
+        try:
+            status, reason, escritos, cabeceras_resp = self._peticion(url, cabeceras, timeout, volcar)
+            if status == 200:
+                os.replace(tmp, ruta_destino)
+        except BaseException:
+            _borrar(tmp)
+            raise
+        return status, reason, cabeceras_resp.get("ETag"), escritos
+
+    # Hace la petición por la conexión persistente del hilo y pasa la
+    # respuesta a 'consumir', que debe leer el cuerpo entero. Devuelve
+    # (status, reason, lo que devuelva consumir, cabeceras de la respuesta).
+    def _peticion(self, url, cabeceras_extra, timeout, consumir):
+        partes = urllib.parse.urlsplit(url)
+        ruta = partes.path or "/"
+        if partes.query:
+            ruta += "?" + partes.query
+        cabeceras = {"User-Agent": self.user_agent, **cabeceras_extra}
+
+        clave = (partes.scheme, partes.netloc)
+        conexiones = self._conexiones()
+        for intento in range(2):
+            conexion = conexiones.get(clave)
+            reutilizada = conexion is not None
+            if conexion is None:
+                clase = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+                conexion = conexiones[clave] = clase(partes.netloc, timeout=timeout)
+            elif conexion.sock is not None:
+                conexion.sock.settimeout(timeout)
+            try:
+                conexion.request("GET", ruta, headers=cabeceras)
+                respuesta = conexion.getresponse()
+            except _ERRORES_CONEXION_CADUCADA:
+                self._descartar(clave)
+                if reutilizada and intento == 0:
+                    continue
+                raise
+            except Exception:
+                self._descartar(clave)
+                raise
+            # Un fallo a mitad del cuerpo no se reintenta (ya se ha consumido parte)
+            try:
+                resultado = consumir(respuesta)
+            except BaseException:
+                self._descartar(clave)
+                raise
+            if respuesta.will_close:
+                self._descartar(clave)
+            return respuesta.status, respuesta.reason, resultado, respuesta.headers
+
+    # Cierra las conexiones del hilo actual
+    def cerrar(self):
+        for clave in list(self._conexiones()):
+            self._descartar(clave)
+
+    def _conexiones(self):
+        conexiones = getattr(self._local, "conexiones", None)
+        if conexiones is None:
+            conexiones = self._local.conexiones = {}
+        return conexiones
+
+    def _descartar(self, clave):
+        conexion = self._conexiones().pop(clave, None)
+        if conexion is not None:
+            conexion.close()
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
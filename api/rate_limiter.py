@@ -0,0 +1,77 @@
+import time
+import threading
+
+# Cuota por defecto hasta que la API informa de la de la cuenta: un hilo y
+# una petición por segundo
+HILOS_POR_DEFECTO = 1
+PETICIONES_POR_MINUTO_POR_DEFECTO = 60
+
+
+# Limitador de peticiones a ScreenScraper (token bucket + hilos simultáneos).
+#
+# La API limita cada cuenta a 'maxthreads' peticiones simultáneas y a
+# 'maxrequestspermin' por minuto; si se pasan, responde 429/430 y puede
+# bloquear la cuenta un rato. Antes de cada petición se llama a adquirir(),
+# que espera hasta que:
+#   - hay menos de hilos_max peticiones en curso, y
+#   - queda un token en el cubo. El cubo se rellena a por_minuto / 60
+#     tokens por segundo y guarda como mucho hilos_max (la ráfaga máxima).
+# liberar() se llama al terminar la petición (con try/finally).
+#
+# Es compartido por todos los hilos que usan la misma ScreenScraperAPI.
+class LimitadorPeticiones:
+    def __init__(self, hilos_max=HILOS_POR_DEFECTO, por_minuto=PETICIONES_POR_MINUTO_POR_DEFECTO):
+        self._cond = threading.Condition()
+        self._hilos_max = max(1, hilos_max)
+        self._tasa = max(1, por_minuto) / 60.0      # tokens por segundo
+        self._tokens = float(self._hilos_max)
+        self._ultimo_relleno = time.monotonic()
+        self._en_curso = 0
+        self._pausa_hasta = 0.0
+
+    @property
+    def hilos_max(self):
+        return self._hilos_max
+
+    # Actualiza la cuota (p. ej. con la que devuelve la API en 'ssuser')
+    def ajustar(self, hilos_max=None, por_minuto=None):
+        with self._cond:
+            if hilos_max:
+                self._hilos_max = max(1, hilos_max)
+                self._tokens = min(self._tokens, self._hilos_max)
+            if por_minuto:
+                self._rellenar(time.monotonic())
+                self._tasa = max(1, por_minuto) / 60.0
+            self._cond.notify_all()
+
+    # No deja empezar peticiones durante 'segundos' (tras un 429/430)
+    def pausar(self, segundos):
+        with self._cond:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+
+    # Bloquea hasta que se pueda hacer una petición
+    def adquirir(self):
+        with self._cond:
+            while True:
+                ahora = time.monotonic()
+                self._rellenar(ahora)
+                if self._en_curso >= self._hilos_max:
+                    espera = None                  # hasta que otro hilo libere
+                elif ahora < self._pausa_hasta:
+                    espera = self._pausa_hasta - ahora
+                elif self._tokens < 1:
+                    espera = (1 - self._tokens) / self._tasa
+                else:
+                    self._tokens -= 1
+                    self._en_curso += 1
+                    return
+                self._cond.wait(espera)
+
+    def liberar(self):
+        with self._cond:
+            self._en_curso -= 1
+            self._cond.notify_all()
+
+    def _rellenar(self, ahora):
+        self._tokens = min(self._hilos_max, self._tokens + (ahora - self._ultimo_relleno) * self._tasa)
+        self._ultimo_relleno = ahora
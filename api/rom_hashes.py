@@ -0,0 +1,188 @@
+import os
+import json
+import zlib
+import hashlib
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+
+HASHES_FILE = "hashes.json"
+
+# Tamaño de cada lectura al calcular los hashes. Con bloques grandes
+# hashlib y zlib pasan casi todo el tiempo en C sin el GIL, y se hacen
+# muchas menos llamadas a read() sobre imágenes de varios GB.
+_TAM_BUFFER = 8 << 20   # 8 MB
+
+# Hilos que calculan hashes. El cuello de botella es el disco: más hilos
+# solo harían que varias ROMs grandes compitieran por él.
+_NUM_WORKERS = 2
+
+_POOL = ThreadPoolExecutor(max_workers=_NUM_WORKERS, thread_name_prefix="hashes")
+# Se activa al cerrar la app para cortar los cálculos en marcha
+_PARAR = threading.Event()
+
+
+# Caché persistente de los hashes (CRC32, MD5, SHA1) de las ROMs para
+# identificarlas en ScreenScraper.
+#
+# Se guarda en <carpeta>/hashes.json. Cada entrada va asociada al archivo
+# (por inodo si el sistema de archivos lo da, así sobrevive a un renombrado;
+# si no, por ruta) y guarda el tamaño y el mtime con los que se calculó: si
+# alguno cambia, la ROM se vuelve a leer. Así cada versión de una ROM se
+# lee entera como mucho una vez.
+#
+# Los hashes se calculan en un pool de hilos compartido. calcular() devuelve
+# un Future (varias peticiones de la misma ROM comparten el mismo) y
+# obtener() espera al resultado; se llama desde los hilos del scraper,
+# nunca desde el de la GUI.
+class RomHashCache:
+    def __init__(self, ruta_json):
+        self.ruta_json = ruta_json
+        self._lock = threading.Lock()
+        self._entradas = self._cargar()   # clave → {tamano, mtime_ns, crc, md5, sha1}
+        self._en_curso = {}               # clave → Future
+
+    # Hashes de la ROM: {"crc", "md5", "sha1"} en hexadecimal mayúsculas, o
+    # None si no se pudo leer (no existe, sigue copiándose...)
+    def obtener(self, ruta_rom):
+        try:
+            return self.calcular(ruta_rom).result()
+        except CancelledError:
+            return None
+
+    # Future con los hashes de la ROM (ya resuelto si estaban en caché)
+    def calcular(self, ruta_rom):
+        try:
+            st = os.stat(ruta_rom)
+        except OSError:
+            return _resuelto(None)
+        clave = _clave(ruta_rom, st)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada and (entrada["tamano"], entrada["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+                return _resuelto({k: entrada[k] for k in ("crc", "md5", "sha1")})
+            futuro = self._en_curso.get(clave)
+            if futuro is None:
+                try:
+                    futuro = _POOL.submit(self._calcular, ruta_rom, clave, st)
+                except RuntimeError:   # pool ya cerrado (la app se está cerrando)
+                    return _resuelto(None)
+                self._en_curso[clave] = futuro
+            return futuro
+
+    # --- Hilos del pool ---
+
+    def _calcular(self, ruta_rom, clave, st):
+        try:
+            hashes = _hashear(ruta_rom)
+            # Si la ROM cambió mientras se leía (p. ej. aún se estaba
+            # copiando) los hashes no valen para la firma de ninguna versión
+            if hashes and _firma(ruta_rom) == (st.st_size, st.st_mtime_ns):
+                with self._lock:
+                    self._entradas[clave] = {"tamano": st.st_size, "mtime_ns": st.st_mtime_ns, **hashes}
+                    self._guardar()
+            return hashes
+        finally:
+            with self._lock:
+                self._en_curso.pop(clave, None)
+
+    def _cargar(self):
+        try:
+            with open(self.ruta_json, "r", encoding="utf-8") as archivo:
+                datos = json.load(archivo)
+            return datos if isinstance(datos, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    # Se llama con _lock tomado. Se escribe en un temporal y se renombra
+    # para no dejar el JSON a medias si la app se cierra a mitad.
+    def _guardar(self):
+        tmp = self.ruta_json + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.ruta_json), exist_ok=True)
+            with open(tmp, "w", encoding="utf-8") as archivo:
+                json.dump(self._entradas, archivo)
+            os.replace(tmp, self.ruta_json)
+        except OSError as e:
+            print(f"[ScreenScraper] No se pudo guardar la caché de hashes: {e}")
+
+
+# Lee la ROM una vez calculando los tres hashes a la vez. Reutiliza el
+# mismo buffer en cada lectura (readinto) en lugar de crear un bytes nuevo.
+def _hashear(ruta_rom):
+    nombre_rom = os.path.basename(ruta_rom)
+    try:
+        archivo_rom = open(ruta_rom, "rb", buffering=0)
+    except PermissionError:
+        print(f"[ScreenScraper] Archivo '{nombre_rom}' aún bloqueado (copiando), saltando hash")
+        return None
+    except OSError:
+        return None
+
+    crc_val = 0
+    md5 = hashlib.md5()
+    sha1 = hashlib.sha1()
+    buffer = bytearray(_TAM_BUFFER)
+    vista = memoryview(buffer)
+    with archivo_rom:
+        while True:
+            if _PARAR.is_set():
+                return None
+            leidos = archivo_rom.readinto(buffer)
+            if not leidos:
+                break
+            bloque = vista[:leidos]
+            crc_val = zlib.crc32(bloque, crc_val)
+            md5.update(bloque)
+            sha1.update(bloque)
+
+    # Formato hexadecimal en mayúsculas, como lo espera la API
+    hashes = {
+        "crc": format(crc_val & 0xFFFFFFFF, '08X'),
+        "md5": md5.hexdigest().upper(),
+        "sha1": sha1.hexdigest().upper(),
+    }
+    print(f"[ScreenScraper] Hashes de '{nombre_rom}': CRC={hashes['crc']}, "
+          f"MD5={hashes['md5'][:16]}…, SHA1={hashes['sha1'][:16]}…")
+    return hashes
+
+
+# Clave de un archivo en la caché: su inodo (estable al renombrar) o, si el
+# sistema de archivos no lo da, su ruta absoluta
+def _clave(ruta_rom, st):
+    if st.st_ino:
+        return f"ino:{st.st_dev}:{st.st_ino}"
+    return os.path.abspath(ruta_rom)
+
+
+def _firma(ruta_rom):
+    try:
+        st = os.stat(ruta_rom)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _resuelto(valor):
+    futuro = Future()
+    futuro.set_result(valor)
+    return futuro
+
+
+# Una caché por archivo de hashes (una por carpeta de juegos)
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def obtener_cache_hashes(directorio):
+    ruta_json = os.path.join(directorio, HASHES_FILE)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(ruta_json)
+        if cache is None:
+            cache = _CACHES[ruta_json] = RomHashCache(ruta_json)
+        return cache
+
+
+# Corta los cálculos en marcha y descarta los encolados (al cerrar la app)
+def cerrar_hashes():
+    _PARAR.set()
+    _POOL.shutdown(wait=False, cancel_futures=True)
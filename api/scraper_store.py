@@ -0,0 +1,354 @@
+import os
+import json
+import shutil
+import sqlite3
+import threading
+
+CACHE_INFO_FILE = "info.json"
+# Registro de las medias descargadas de cada juego (url, ETag y tamaño),
+# para no volver a bajarlas
+MEDIAS_FILE = "medias.json"
+
+# Subcarpeta de scraper_cache con el almacén unificado. Como la de los
+# hashes, empieza por punto y va en una subcarpeta para que sus escrituras
+# no disparen el QFileSystemWatcher de MainWindow sobre scraper_cache.
+STORE_DIR_NAME = ".store"
+STORE_DB_FILE = "scraper.db"
+STORE_MEDIAS_DIR = "medias"
+
+_EXTENSIONES_IMAGEN = ('.png', '.jpg', '.jpeg')
+
+
+# Caché de ScreenScraper con el formato de siempre: una carpeta por juego
+# en scraper_cache/ con info.json, medias.json y las imágenes.
+#
+# Los dos almacenes tienen la misma interfaz. Además de la de uso normal
+# (por nombre de archivo de la ROM) tienen juegos / exportar / importar /
+# borrar, por clave de juego (la ROM sin extensión), para pasar la caché de
+# un formato a otro (ver api.screenscraper.migrar_almacen).
+class AlmacenCarpetas:
+    def __init__(self, raiz):
+        self.raiz = raiz
+        # medias.json se relee y reescribe entero: dos descargas del mismo
+        # juego (galería diferida) no deben pisarse
+        self._lock_manifiestos = threading.Lock()
+
+    def carpeta(self, nombre_archivo):
+        return os.path.join(self.raiz, os.path.splitext(nombre_archivo)[0])
+
+    def ruta_media(self, nombre_archivo, nombre):
+        return os.path.join(self.carpeta(nombre_archivo), nombre)
+
+    def leer_info(self, nombre_archivo):
+        return _leer_info(self.carpeta(nombre_archivo))
+
+    def guardar_info(self, nombre_archivo, info):
+        directorio = self.carpeta(nombre_archivo)
+        os.makedirs(directorio, exist_ok=True)
+        with open(os.path.join(directorio, CACHE_INFO_FILE), "w", encoding="utf-8") as archivo:
+            json.dump(info, archivo, ensure_ascii=False, indent=2)
+
+    # Medias descargadas del juego: {nombre: {url, etag, tamano}}
+    def leer_manifiesto(self, nombre_archivo):
+        return _leer_manifiesto(self.carpeta(nombre_archivo))
+
+    # Añade o actualiza entradas del manifiesto
+    def actualizar_manifiesto(self, nombre_archivo, entradas):
+        if not entradas:
+            return
+        directorio = self.carpeta(nombre_archivo)
+        with self._lock_manifiestos:
+            manifiesto = _leer_manifiesto(directorio)
+            manifiesto.update(entradas)
+            try:
+                with open(os.path.join(directorio, MEDIAS_FILE), "w", encoding="utf-8") as archivo:
+                    json.dump(manifiesto, archivo, ensure_ascii=False, indent=2)
+            except OSError as error:
+                print(f"[ScreenScraper] No se pudo guardar {MEDIAS_FILE}: {error}")
+
+    # La portada siempre se guarda como "cover" seguido de su extensión
+    def buscar_portada(self, nombre_archivo):
+        directorio = self.carpeta(nombre_archivo)
+        for extension in _EXTENSIONES_IMAGEN:
+            ruta = os.path.join(directorio, f"cover{extension}")
+            if os.path.exists(ruta):
+                return ruta
+        return None
+
+    # Rutas de las imágenes de galería (todas menos la portada)
+    def listar_galeria(self, nombre_archivo):
+        directorio = self.carpeta(nombre_archivo)
+        rutas = []
+        if os.path.isdir(directorio):
+            for nombre_fichero in sorted(os.listdir(directorio)):
+                if nombre_fichero.startswith("cover"):
+                    continue
+                if nombre_fichero.lower().endswith(_EXTENSIONES_IMAGEN):
+                    rutas.append(os.path.join(directorio, nombre_fichero))
+        return rutas
+
+    # Renombra la caché de un juego cuando se renombra su ROM
+    def renombrar(self, nombre_viejo, nombre_nuevo):
+        viejo_dir = self.carpeta(nombre_viejo)
+        nuevo_dir = self.carpeta(nombre_nuevo)
+        if os.path.isdir(viejo_dir) and not os.path.exists(nuevo_dir):
+            try:
+                os.rename(viejo_dir, nuevo_dir)
+            except OSError:
+                pass
+
+    # ── Migración entre formatos ──
+
+    def juegos(self):
+        try:
+            with os.scandir(self.raiz) as it:
+                return [e.name for e in it if e.is_dir() and not e.name.startswith(".")]
+        except OSError:
+            return []
+
+    # (info, manifiesto, {nombre: ruta de la imagen}) de un juego
+    def exportar(self, juego):
+        directorio = os.path.join(self.raiz, juego)
+        try:
+            nombres = os.listdir(directorio)
+        except OSError:
+            return None, {}, {}
+        rutas = {n: os.path.join(directorio, n) for n in nombres if n.lower().endswith(_EXTENSIONES_IMAGEN)}
+        return _leer_info(directorio), _completar_manifiesto(_leer_manifiesto(directorio), rutas), rutas
+
+    def importar(self, juego, info, manifiesto, rutas):
+        if not info and not rutas:
+            return
+        directorio = os.path.join(self.raiz, juego)
+        os.makedirs(directorio, exist_ok=True)
+        for nombre, origen in rutas.items():
+            _enlazar(origen, os.path.join(directorio, nombre))
+        if info:
+            with open(os.path.join(directorio, CACHE_INFO_FILE), "w", encoding="utf-8") as archivo:
+                json.dump(info, archivo, ensure_ascii=False, indent=2)
+        with open(os.path.join(directorio, MEDIAS_FILE), "w", encoding="utf-8") as archivo:
+            json.dump({n: manifiesto[n] for n in rutas}, archivo, ensure_ascii=False, indent=2)
+
+    # Borra toda la caché guardada en este formato
+    def borrar(self):
+        for juego in self.juegos():
+            shutil.rmtree(os.path.join(self.raiz, juego), ignore_errors=True)
+
+
+# Caché de ScreenScraper en un único archivo SQLite
+# (scraper_cache/.store/scraper.db).
+#
+# Con miles de juegos el formato de carpetas son miles de directorios, dos
+# JSON pequeños por juego que se reescriben en cada scrapeo y listados de
+# carpeta para encontrar la portada y la galería. Aquí la info y el
+# registro de medias de todos los juegos son filas de la base de datos, y
+# portada y galería salen de una consulta.
+#
+# Las imágenes siguen siendo archivos (la GUI y la caché de miniaturas
+# trabajan con rutas), pero todas en una sola carpeta plana,
+# .store/medias/<juego>__<nombre>, que nunca se lista.
+#
+# Es opcional: api.screenscraper.migrar_almacen pasa la caché de un formato
+# a otro (en los dos sentidos) cuando se cambia la opción.
+# Se usa desde el hilo de la GUI y desde los del scraper: una conexión
+# compartida protegida con un lock.
+class AlmacenSQLite:
+    _ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS juegos (
+        juego TEXT PRIMARY KEY,   -- nombre de la ROM sin extensión
+        info  TEXT NOT NULL       -- la info del juego en JSON (lo que era info.json)
+    );
+    CREATE TABLE IF NOT EXISTS medias (
+        juego  TEXT NOT NULL,
+        nombre TEXT NOT NULL,     -- nombre local (cover.png, ss_wor.png...)
+        url    TEXT,
+        etag   TEXT,
+        tamano INTEGER,
+        PRIMARY KEY (juego, nombre)
+    );
+    """
+
+    def __init__(self, raiz):
+        self.raiz = raiz
+        self.directorio = os.path.join(raiz, STORE_DIR_NAME)
+        self.dir_medias = os.path.join(self.directorio, STORE_MEDIAS_DIR)
+        os.makedirs(self.dir_medias, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.directorio, STORE_DB_FILE), check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(self._ESQUEMA)
+
+    def ruta_media(self, nombre_archivo, nombre):
+        return self._ruta(_juego(nombre_archivo), nombre)
+
+    def _ruta(self, juego, nombre):
+        return os.path.join(self.dir_medias, f"{juego}__{nombre}")
+
+    def leer_info(self, nombre_archivo):
+        return self._info(_juego(nombre_archivo))
+
+    def _info(self, juego):
+        fila = self._consultar("SELECT info FROM juegos WHERE juego = ?", (juego,))
+        if not fila:
+            return None
+        try:
+            return json.loads(fila[0][0])
+        except ValueError:
+            return None
+
+    def guardar_info(self, nombre_archivo, info):
+        self._guardar_info(_juego(nombre_archivo), info)
+
+    def _guardar_info(self, juego, info):
+        self._ejecutar("INSERT OR REPLACE INTO juegos (juego, info) VALUES (?, ?)",
+                       [(juego, json.dumps(info, ensure_ascii=False))])
+
+    def leer_manifiesto(self, nombre_archivo):
+        return self._manifiesto(_juego(nombre_archivo))
+
+    def _manifiesto(self, juego):
+        filas = self._consultar("SELECT nombre, url, etag, tamano FROM medias WHERE juego = ?", (juego,))
+        return {nombre: {"url": url, "etag": etag, "tamano": tamano} for nombre, url, etag, tamano in filas}
+
+    def actualizar_manifiesto(self, nombre_archivo, entradas):
+        self._actualizar_manifiesto(_juego(nombre_archivo), entradas)
+
+    def _actualizar_manifiesto(self, juego, entradas):
+        self._ejecutar(
+            "INSERT OR REPLACE INTO medias (juego, nombre, url, etag, tamano) VALUES (?, ?, ?, ?, ?)",
+            [(juego, nombre, e.get("url"), e.get("etag"), e.get("tamano")) for nombre, e in entradas.items()],
+        )
+
+    def buscar_portada(self, nombre_archivo):
+        nombres = {n for n, in self._consultar(
+            "SELECT nombre FROM medias WHERE juego = ? AND nombre LIKE 'cover%'", (_juego(nombre_archivo),))}
+        for extension in _EXTENSIONES_IMAGEN:
+            if f"cover{extension}" in nombres:
+                return self.ruta_media(nombre_archivo, f"cover{extension}")
+        return None
+
+    def listar_galeria(self, nombre_archivo):
+        filas = self._consultar(
+            "SELECT nombre FROM medias WHERE juego = ? AND nombre NOT LIKE 'cover%' ORDER BY nombre",
+            (_juego(nombre_archivo),))
+        return [self.ruta_media(nombre_archivo, nombre) for nombre, in filas]
+
+    def renombrar(self, nombre_viejo, nombre_nuevo):
+        viejo, nuevo = _juego(nombre_viejo), _juego(nombre_nuevo)
+        if viejo == nuevo or self._consultar("SELECT 1 FROM juegos WHERE juego = ?", (nuevo,)):
+            return
+        for nombre in self.leer_manifiesto(nombre_viejo):
+            try:
+                os.replace(self.ruta_media(nombre_viejo, nombre), self.ruta_media(nombre_nuevo, nombre))
+            except OSError:
+                pass
+        self._ejecutar("UPDATE juegos SET juego = ? WHERE juego = ?", [(nuevo, viejo)])
+        self._ejecutar("UPDATE medias SET juego = ? WHERE juego = ?", [(nuevo, viejo)])
+
+    # ── Migración entre formatos ──
+
+    def juegos(self):
+        return [j for j, in self._consultar("SELECT juego FROM juegos UNION SELECT juego FROM medias", ())]
+
+    def exportar(self, juego):
+        manifiesto = self._manifiesto(juego)
+        rutas = {n: self._ruta(juego, n) for n in manifiesto if os.path.exists(self._ruta(juego, n))}
+        return self._info(juego), manifiesto, rutas
+
+    def importar(self, juego, info, manifiesto, rutas):
+        for nombre, origen in rutas.items():
+            _enlazar(origen, self._ruta(juego, nombre))
+        if info:
+            self._guardar_info(juego, info)
+        self._actualizar_manifiesto(juego, {n: manifiesto[n] for n in rutas})
+
+    # Cierra la base de datos y borra el almacén entero (.store)
+    def borrar(self):
+        with self._lock:
+            self._conn.close()
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def _consultar(self, sql, parametros):
+        try:
+            with self._lock:
+                return self._conn.execute(sql, parametros).fetchall()
+        except sqlite3.Error as e:
+            print(f"[ScreenScraper] Error leyendo {STORE_DB_FILE}: {e}")
+            return []
+
+    def _ejecutar(self, sql, filas):
+        if not filas:
+            return
+        try:
+            with self._lock, self._conn:   # una sola transacción por lote
+                self._conn.executemany(sql, filas)
+        except sqlite3.Error as e:
+            print(f"[ScreenScraper] Error actualizando {STORE_DB_FILE}: {e}")
+
+
+# Carga el info.json de una carpeta de juego, o None si no existe o está vacío
+def _leer_info(directorio):
+    ruta_cache = os.path.join(directorio, CACHE_INFO_FILE)
+    if os.path.exists(ruta_cache):
+        try:
+            with open(ruta_cache, "r", encoding="utf-8") as archivo:
+                datos = json.load(archivo)
+
+            # Descartar cachés vacías (sin id ni título)
+            # Esto significa que la API no devolvió nada
+            if not datos.get("id") and not datos.get("titulo"):
+                os.remove(ruta_cache)
+                return None
+
+            return datos
+        except Exception:
+            pass
+    return None
+
+
+# Clave de un juego en el almacén: el nombre de la ROM sin extensión (como
+# la carpeta del formato anterior)
+def _juego(nombre_archivo):
+    return os.path.splitext(nombre_archivo)[0]
+
+
+def _leer_manifiesto(directorio):
+    try:
+        with open(os.path.join(directorio, MEDIAS_FILE), "r", encoding="utf-8") as archivo:
+            datos = json.load(archivo)
+        return datos if isinstance(datos, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+# Entradas del manifiesto para las imágenes que no tenían (cachés anteriores
+# a medias.json): sin URL, así que se vuelven a validar al re-scrapear
+def _completar_manifiesto(manifiesto, rutas):
+    completo = {}
+    for nombre, ruta in rutas.items():
+        entrada = manifiesto.get(nombre)
+        if entrada is None:
+            try:
+                entrada = {"url": None, "etag": None, "tamano": os.path.getsize(ruta)}
+            except OSError:
+                continue
+        completo[nombre] = entrada
+    return completo
+
+
+# Pone en 'destino' el contenido de 'origen' sin copiarlo (enlace duro, en
+# el mismo disco); si el sistema de archivos no lo permite, lo copia. El
+# origen queda intacto: se sigue leyendo mientras dura la migración.
+def _enlazar(origen, destino):
+    _borrar(destino)
+    try:
+        os.link(origen, destino)
+    except OSError:
+        shutil.copy2(origen, destino)
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
@@ -1,10 +1,13 @@
 import os
 import json
-import hashlib
-import zlib
-import urllib.request
+import threading
 import urllib.parse
-import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+from api.rom_hashes import obtener_cache_hashes
+from api.http_pool import ConexionesHTTP
+from api.rate_limiter import LimitadorPeticiones
+from api.scraper_store import AlmacenCarpetas, AlmacenSQLite, STORE_DIR_NAME, STORE_DB_FILE
 
 # Mapeo de extensiones a system IDs de ScreenScraper
 # Verificar en: api2/systemesListe.php
@@ -14,19 +17,43 @@ SYSTEM_IDS = {
 }
 
 CACHE_DIR_NAME = "scraper_cache" 
-CACHE_INFO_FILE = "info.json"
+# Subcarpeta de scraper_cache con la caché de hashes. Va en una subcarpeta
+# porque MainWindow vigila scraper_cache y cada escritura directa en ella
+# provocaría un reescaneo de la biblioteca.
+HASHES_DIR_NAME = ".hashes"
+
+# Segundos sin peticiones tras un 429/430 (cuota superada)
+_PAUSA_CUOTA = 30
+
+# Máximo de imágenes de galería que se descargan por juego
+MAX_IMAGENES_GALERIA = 20
+
+# Descargas de medias simultáneas (compartidas por todos los juegos que se
+# estén scrapeando). Es solo el techo: las medias son llamadas a la API
+# (mediaJeu.php con las credenciales) y pasan por el limitador como las
+# demás, así que las que van a la vez las decide la cuota de la cuenta.
+_HILOS_DESCARGA = 6
+_POOL_DESCARGAS = ThreadPoolExecutor(max_workers=_HILOS_DESCARGA, thread_name_prefix="medias")
 
 # Clase principal para interactuar con la API de ScreenScraper, 
 # incluyendo métodos para buscar juegos por hash o nombre, descargar imágenes 
 # y manejar la caché local.
+#
+# Es segura entre hilos (la usan los hilos de ScrapingService): cada hilo
+# reutiliza sus propias conexiones keep-alive (ConexionesHTTP) y todas las
+# peticiones pasan por el mismo limitador, que respeta la cuota de la cuenta.
 class ScreenScraperAPI:
 
     BASE_URL = "https://api.screenscraper.fr/api2"
 
-    def __init__(self, devid, devpassword, softname="TFG-Emulador"):
+    # base_url permite apuntar a otro servidor (p. ej. uno local de pruebas)
+    def __init__(self, devid, devpassword, softname="TFG-Emulador", base_url=None):
         self.devid = devid
         self.devpassword = devpassword
         self.softname = softname
+        self.base_url = base_url or self.BASE_URL
+        self.limitador = LimitadorPeticiones()
+        self._http = ConexionesHTTP(softname)
 
     # Parametros base que se requiere poner en la url para las llamadas a la API
     def _parametros_base(self, extra=None):
@@ -40,6 +67,57 @@ class ScreenScraperAPI:
             params.update(extra)
         return params
 
+    # GET a la API o a una URL de medios pasando por el limitador.
+    # Devuelve (status, reason, cuerpo) o lanza la excepción de red.
+    def _get(self, url, timeout):
+        self.limitador.adquirir()
+        try:
+            status, reason, cuerpo = self._http.get(url, timeout=timeout)
+        finally:
+            self.limitador.liberar()
+        # 429: demasiadas peticiones; 430: cuota diaria superada
+        if status in (429, 430):
+            print(f"[ScreenScraper] Cuota superada (HTTP {status}), pausando {_PAUSA_CUOTA} s")
+            self.limitador.pausar(_PAUSA_CUOTA)
+        return status, reason, cuerpo
+
+    # Llama a un endpoint de la API y devuelve el JSON de la respuesta, o
+    # None si falla. 'etiqueta' y 'contexto' solo se usan en los mensajes.
+    def _llamar_api(self, endpoint, extra, timeout, etiqueta, contexto):
+        # urlencode se encarga de formatear los parametros para que internet lo entienda
+        url = f"{self.base_url}/{endpoint}?{urllib.parse.urlencode(self._parametros_base(extra))}"
+        try:
+            status, reason, cuerpo = self._get(url, timeout)
+        except Exception as error:
+            print(f"[ScreenScraper] {etiqueta}Error: {error}")
+            return None
+
+        # Control de errores HTTP para obtener información útil en caso de fallo
+        if status >= 400:
+            cuerpo_error = cuerpo.decode("utf-8", errors="ignore")[:300]
+            print(f"[ScreenScraper] {etiqueta}HTTP {status}: {reason} | {contexto} | body: {cuerpo_error}")
+            return None
+        print(f"[ScreenScraper] {etiqueta}HTTP {status} para {contexto}")
+        try:
+            datos_respuesta = json.loads(cuerpo.decode("utf-8"))
+        except ValueError as error:
+            print(f"[ScreenScraper] {etiqueta}Error: {error}")
+            return None
+        self._ajustar_cuota(datos_respuesta)
+        return datos_respuesta
+
+    # Cuando la API devuelve los datos de la cuenta ('ssuser'), ajusta el
+    # limitador a su cuota real de hilos y de peticiones por minuto
+    def _ajustar_cuota(self, datos_respuesta):
+        try:
+            usuario = datos_respuesta.get("response", {}).get("ssuser") or {}
+            hilos = int(usuario.get("maxthreads") or 0)
+            por_minuto = int(usuario.get("maxrequestspermin") or 0)
+        except (AttributeError, TypeError, ValueError):
+            return
+        if hilos or por_minuto:
+            self.limitador.ajustar(hilos or None, por_minuto or None)
+
     # LLamada a la API (concretamente a jeuInfos.php), busqueda por hash del 
     # contenodo del fichero ROM 
     def buscar_por_hash(self, ruta_rom, extension):
@@ -49,42 +127,19 @@ class ScreenScraperAPI:
         nombre_rom = os.path.basename(ruta_rom)
         taille = os.path.getsize(ruta_rom)
 
-        # Calcular hashes en una sola pasada
-        crc_val = 0
-        md5 = hashlib.md5()
-        sha1 = hashlib.sha1()
-        
-        try:
-            f = open(ruta_rom, 'rb')
-        except PermissionError:
-            print(f"[ScreenScraper] Archivo '{nombre_rom}' aún bloqueado (copiando), saltando hash")
+        # Hashes de la ROM: se calculan en el pool de rom_hashes y se guardan
+        # en disco, así cada versión de la ROM se lee entera una sola vez
+        cache_hashes = obtener_cache_hashes(
+            os.path.join(os.path.dirname(os.path.abspath(ruta_rom)), CACHE_DIR_NAME, HASHES_DIR_NAME))
+        hashes = cache_hashes.obtener(ruta_rom)
+        if not hashes:
             return None
 
-        # Con el with se asegura de cerrar la conexión automáticamente
-        with f as archivo_rom:
-            # Se lee el archivo en bloques de 1 MB para no cargarlo todo en memoria
-            while True:
-                bloque = archivo_rom.read(1 << 20)  # 1 MB
-                if not bloque:
-                    break
-                crc_val = zlib.crc32(bloque, crc_val)
-                
-                # El update funciona de la misma forma que un += pero para hashes
-                md5.update(bloque)
-                sha1.update(bloque)
-        
-        # Formatear hashes como hexadecimales ya que la API asi lo espera       
-        crc_hex = format(crc_val & 0xFFFFFFFF, '08X')
-        md5_hex = md5.hexdigest().upper()
-        sha1_hex = sha1.hexdigest().upper()
-
-        print(f"[ScreenScraper] Hashes de '{nombre_rom}': CRC={crc_hex}, MD5={md5_hex[:16]}…, SHA1={sha1_hex[:16]}…")
-
         # Parametros extra para la llamada a la API de la busqueda por hash
         extra = {
-            "crc": crc_hex,
-            "md5": md5_hex,
-            "sha1": sha1_hex,
+            "crc": hashes["crc"],
+            "md5": hashes["md5"],
+            "sha1": hashes["sha1"],
             "romnom": nombre_rom,
             "romtaille": str(taille),
             "romtype": "rom",
@@ -95,35 +150,8 @@ class ScreenScraperAPI:
         if extension and extension in SYSTEM_IDS:
             extra["systemeid"] = str(SYSTEM_IDS[extension])
 
-        params = self._parametros_base(extra)
-    
-        # Construir la URL
-        # urlencode se encarga de formatear los parametros para que internet lo entienda
-        url = f"{self.BASE_URL}/jeuInfos.php?{urllib.parse.urlencode(params)}"
-
-        # Realizar la solicitud HTTP
-        try:
-            # Se añade un User-Agent personalizado para evitar bloqueos por parte del servidor
-            request = urllib.request.Request(url, headers={"User-Agent": self.softname})
-            
-            with urllib.request.urlopen(request, timeout=30) as respuesta:
-                status = respuesta.getcode()
-                print(f"[ScreenScraper] jeuInfos HTTP {status} para '{nombre_rom}'")
-                
-                contenido_crudo = respuesta.read().decode("utf-8")
-                datos_respuesta = json.loads(contenido_crudo)
-        
-        # Control de errores HTTP para obtener información útil en caso de fallo
-        except urllib.error.HTTPError as error_http:
-            cuerpo_error = ""
-            try:
-                cuerpo_error = error_http.read().decode("utf-8", errors="ignore")[:300]
-            except Exception:
-                pass
-            print(f"[ScreenScraper] jeuInfos HTTP {error_http.code}: {error_http.reason} | rom: '{nombre_rom}' | body: {cuerpo_error}")
-            return None
-        except Exception as error:
-            print(f"[ScreenScraper] jeuInfos Error: {error}")
+        datos_respuesta = self._llamar_api("jeuInfos.php", extra, 30, "jeuInfos ", f"rom: '{nombre_rom}'")
+        if datos_respuesta is None:
             return None
 
         return self._parsear_respuesta_hash_un_juego(datos_respuesta)
@@ -172,34 +200,9 @@ class ScreenScraperAPI:
         if extension and extension in SYSTEM_IDS:
             extra["systemeid"] = str(SYSTEM_IDS[extension])
 
-        params = self._parametros_base(extra)
-        
-        # Construir la URL
-        # urlencode se encarga de formatear los parametros para que internet lo entienda
-        url = f"{self.BASE_URL}/jeuRecherche.php?{urllib.parse.urlencode(params)}"
-
-        # Realizar la solicitud HTTP
-        try:
-            # Se añade un User-Agent personalizado para evitar bloqueos por parte del servidor
-            request = urllib.request.Request(url, headers={"User-Agent": self.softname})
-            
-            with urllib.request.urlopen(request, timeout=20) as respuesta:
-                status = respuesta.getcode()
-                contenido_crudo = respuesta.read().decode("utf-8")
-                print(f"[ScreenScraper] HTTP {status} para búsqueda: '{extra.get('recherche', '')}'") 
-                datos_respuesta = json.loads(contenido_crudo)
-        
-        # Control de errores HTTP para obtener información útil en caso de fallo
-        except urllib.error.HTTPError as error_http:
-            cuerpo_error = ""
-            try:
-                cuerpo_error = error_http.read().decode("utf-8", errors="ignore")[:300]
-            except Exception:
-                pass
-            print(f"[ScreenScraper] HTTP {error_http.code}: {error_http.reason} | búsqueda: '{extra.get('recherche', '')}' | body: {cuerpo_error}")
-            return None
-        except Exception as error:
-            print(f"[ScreenScraper] Error: {error}")
+        datos_respuesta = self._llamar_api(
+            "jeuRecherche.php", extra, 20, "", f"búsqueda: '{extra.get('recherche', '')}'")
+        if datos_respuesta is None:
             return None
 
         return self._parsear_respuesta_nombre_varios_juegos(datos_respuesta)
@@ -238,31 +241,155 @@ class ScreenScraperAPI:
             return None
 
     # Descarga imagenes de la API, dada la URL y la ruta destino local donde guardarla
-    @staticmethod
-    def descargar_imagen(url, ruta_destino):
+    def descargar_imagen(self, url, ruta_destino):
+        return self._descargar_media(url, ruta_destino, None) is not None
+
+    # Descarga varias medias de un juego a la vez en el pool de descargas.
+    # 'trabajos' es una lista de (nombre local, url).
+    # Devuelve el conjunto de nombres que quedan disponibles en disco. Lo
+    # que ya estaba descargado (según el registro de medias) no se vuelve a bajar.
+    def descargar_medias(self, ruta_games, nombre_archivo, trabajos):
+        almacen = _almacen(ruta_games)
+        manifiesto = almacen.leer_manifiesto(nombre_archivo)
+        futuros = {
+            nombre: _POOL_DESCARGAS.submit(
+                self._descargar_media, url, almacen.ruta_media(nombre_archivo, nombre), manifiesto.get(nombre))
+            for nombre, url in trabajos
+        }
+        disponibles = {}
+        for nombre, futuro in futuros.items():
+            try:
+                entrada = futuro.result()
+            except Exception as error:
+                print(f"[ScreenScraper] Error descargando: {error}")
+                entrada = None
+            if entrada is not None:
+                disponibles[nombre] = entrada
+        almacen.actualizar_manifiesto(nombre_archivo, disponibles)
+        _anotar_escritura(ruta_games, almacen, nombre_archivo)
+        if trabajos:
+            invalidar_metadatos(obtener_cache_dir(ruta_games, nombre_archivo))
+        return set(disponibles)
+
+    # Descarga una imagen de la galería de un juego ya scrapeado con la
+    # galería diferida (ver info["galeria"]). Bloquea; devuelve la ruta
+    # local o None.
+    def descargar_media_galeria(self, ruta_games, nombre_archivo, nombre, url):
+        if nombre in self.descargar_medias(ruta_games, nombre_archivo, [(nombre, url)]):
+            return obtener_ruta_media(ruta_games, nombre_archivo, nombre)
+        return None
+
+    # Descarga una media a 'ruta_destino' salvo que ya esté en caché.
+    # 'entrada' es lo que el registro de medias tenía de ese archivo ({url, etag,
+    # tamano}) o None. Se considera en caché si es la misma URL y:
+    #   - hay ETag y el servidor responde 304 a la petición condicional, o
+    #   - no hay ETag y el archivo local tiene el tamaño registrado.
+    # Si el archivo ya existía sin registro (cachés de versiones anteriores)
+    # se da por bueno. Devuelve la entrada actualizada, o None si no hay media.
+    def _descargar_media(self, url, ruta_destino, entrada):
+        try:
+            tamano_local = os.path.getsize(ruta_destino)
+        except OSError:
+            tamano_local = None
+        etag = None
+        if tamano_local is not None:
+            if entrada is None:
+                return {"url": url, "etag": None, "tamano": tamano_local}
+            if entrada.get("url") == url and entrada.get("tamano") == tamano_local:
+                if not entrada.get("etag"):
+                    return entrada
+                etag = entrada["etag"]
+
         try:
             os.makedirs(os.path.dirname(ruta_destino), exist_ok=True)
-            
-            request = urllib.request.Request(url, headers={"User-Agent": "TFG-Emulador"})
-            
-            with urllib.request.urlopen(request, timeout=30) as respuesta:
+            self.limitador.adquirir()
+            try:
+                status, reason, etag_nuevo, tamano = self._http.descargar(
+                    url, ruta_destino, timeout=30, etag=etag)
+            finally:
+                self.limitador.liberar()
+        except Exception as error:
+            print(f"[ScreenScraper] Error descargando: {error}")
+            return None
+        if status == 304:
+            return entrada
+        if status in (429, 430):
+            print(f"[ScreenScraper] Cuota superada (HTTP {status}), pausando {_PAUSA_CUOTA} s")
+            self.limitador.pausar(_PAUSA_CUOTA)
+        if status != 200:
+            print(f"[ScreenScraper] Error descargando: HTTP {status} {reason}")
+            return None
 
-                contenido = respuesta.read()
+        # La API devuelve texto si no hay media
+        if tamano < 100:
+            with open(ruta_destino, "rb") as archivo:
+                texto = archivo.read().decode("utf-8", errors="ignore").strip()
+            if texto in ("CRCOK", "MD5OK", "SHA1OK", "NOMEDIA"):
+                _borrar(ruta_destino)
+                return None
 
-                # La API devuelve texto si no hay media
-                if len(contenido) < 100:
-                    texto = contenido.decode("utf-8", errors="ignore").strip()
+        return {"url": url, "etag": etag_nuevo, "tamano": tamano}
+
+    # Identifica el juego (por hash y, si no, por nombre), descarga portada
+    # y galería y guarda todo en la caché. Bloquea: se llama desde los hilos
+    # de ScrapingService. Devuelve la info guardada o None si no se encontró.
+    # Con galeria_diferida solo se descarga la portada: las imágenes de la
+    # galería quedan en info["galeria"] ([{nombre, url}]) y se bajan cuando
+    # se muestran (descargar_media_galeria).
+    def scrapear(self, nombre_busqueda, extension, ruta_games, nombre_archivo, ruta_rom,
+                 galeria_diferida=False):
+        # 1º: Buscar por hash del fichero ROM (identificación exacta)
+        print(f"[ScreenScraper] Intentando identificar por hash: '{nombre_archivo}'")
+        info = self.buscar_por_hash(ruta_rom, extension)
+
+        # 2º: Fallback a búsqueda por nombre
+        if not info:
+            print(f"[ScreenScraper] Hash no encontrado, buscando por nombre: '{nombre_busqueda}'")
+            info = self.buscar_por_nombre(nombre_busqueda, extension)
+
+        if not info:
+            return None
 
-                    if texto in ("CRCOK", "MD5OK", "SHA1OK", "NOMEDIA"):
-                        return False
-                    
-                with open(ruta_destino, 'wb') as archivo:
-                    archivo.write(contenido)
-            
-            return True
-        except Exception as error:
-            print(f"[ScreenScraper] Error descargando: {error}")
-            return False
+        # Portada y galería se descargan a la vez: el juego tarda lo que la
+        # imagen más lenta, no la suma de todas
+        medias = info.get("medias", {})
+        trabajos = []
+        portada_url = medias.get("portada_url")
+        nombre_portada = None
+        if portada_url:
+            ext = ".png" if ".png" in portada_url.lower() else ".jpg"
+            nombre_portada = f"cover{ext}"
+            trabajos.append((nombre_portada, portada_url))
+
+        galeria = []
+        for i, img in enumerate(medias.get("imagenes", [])[:MAX_IMAGENES_GALERIA]):
+            url = img.get("url", "")
+            if not url:
+                continue
+            tipo = img.get("type", f"img{i}")
+            region = img.get("region", "")
+            ext = ".png" if ".png" in url.lower() else ".jpg"
+            safe = "".join(c for c in f"{tipo}_{region}"
+                           if c.isalnum() or c in "_-") + ext
+            # Dos medias con el mismo tipo y región irían al mismo archivo
+            if any(g["nombre"] == safe for g in galeria):
+                continue
+            galeria.append({"nombre": safe, "url": url})
+            if not galeria_diferida:
+                trabajos.append((safe, url))
+
+        disponibles = self.descargar_medias(ruta_games, nombre_archivo, trabajos)
+        if nombre_portada in disponibles:
+            info["cover_local"] = nombre_portada
+        imagenes_locales = [g["nombre"] for g in galeria if g["nombre"] in disponibles]
+        info["galeria"] = galeria
+
+        info["imagenes_locales"] = imagenes_locales
+
+        # Quitar URLs crudas antes de cachear
+        info.pop("medias", None)
+        guardar_info_cache(ruta_games, nombre_archivo, info)
+        return info
 
 
 # ── Helpers de parseo ──
@@ -363,74 +490,212 @@ def _recorrer(diccionario_medias, resultado_medias):
 
 # ── Cache ──
 
-# Renombra el directorio de caché del scraper cuando se renombra una ROM
+# Dónde se guarda la caché de cada carpeta de juegos: AlmacenCarpetas (una
+# carpeta por juego, el formato de siempre) o AlmacenSQLite (un solo
+# archivo, opcional). Se elige al arrancar con usar_almacen_unificado() o,
+# si la caché está en el otro formato, con preparar_almacen() y luego
+# migrar_almacen().
+_ALMACENES = {}                 # carpeta scraper_cache → almacén
+_LOCK_ALMACENES = threading.Lock()
+_almacen_unificado = False
+# Migración en curso: {"destino": almacén nuevo, "escritos": juegos escritos
+# en el de origen mientras se copiaba}. None si no hay ninguna.
+_migracion = None
+
+
+def usar_almacen_unificado(activo):
+    global _almacen_unificado
+    with _LOCK_ALMACENES:
+        _almacen_unificado = bool(activo)
+        _ALMACENES.clear()
+    invalidar_metadatos()
+
+
+def _almacen(ruta_games):
+    raiz = os.path.join(ruta_games, CACHE_DIR_NAME)
+    with _LOCK_ALMACENES:
+        almacen = _ALMACENES.get(raiz)
+        if almacen is None:
+            clase = AlmacenSQLite if _almacen_unificado else AlmacenCarpetas
+            almacen = _ALMACENES[raiz] = clase(raiz)
+        return almacen
+
+
+# Elige el formato de la caché al arrancar. Si 'unificado' no es el formato
+# en el que está la caché en disco, sigue usando el de disco y devuelve True:
+# hay que llamar a migrar_almacen() (que tarda) para pasarla al nuevo.
+def preparar_almacen(ruta_games, unificado):
+    pendiente = migracion_pendiente(ruta_games, unificado)
+    usar_almacen_unificado(unificado != pendiente)
+    return pendiente
+
+
+def migracion_pendiente(ruta_games, unificado):
+    raiz = os.path.join(ruta_games, CACHE_DIR_NAME)
+    if unificado:
+        return bool(AlmacenCarpetas(raiz).juegos())
+    return os.path.exists(os.path.join(raiz, STORE_DIR_NAME, STORE_DB_FILE))
+
+
+# Copia la caché del formato activo al otro ('unificado' es el de destino)
+# y, al terminar, cambia a él. Bloquea: se llama desde un hilo aparte.
+# Mientras copia se sigue leyendo y escribiendo en el formato de origen, que
+# no se toca; lo que se escribe en él entretanto se vuelve a copiar antes de
+# cambiar. al_avanzar(hechos, total) se llama tras cada juego.
+#
+# Devuelve el almacén de origen: se borra con su método borrar() cuando
+# convenga. Si la migración se corta (se cierra la app), el origen sigue
+# intacto y la siguiente continúa: lo que ya está en el destino no se pisa.
+def migrar_almacen(ruta_games, unificado, al_avanzar=None):
+    global _migracion, _almacen_unificado
+    raiz = os.path.join(ruta_games, CACHE_DIR_NAME)
+    origen = _almacen(ruta_games)
+    destino = (AlmacenSQLite if unificado else AlmacenCarpetas)(raiz)
+    with _LOCK_ALMACENES:
+        _migracion = {"destino": destino, "escritos": set()}
+    try:
+        copiados = set(destino.juegos())
+        juegos = [juego for juego in origen.juegos() if juego not in copiados]
+        for hechos, juego in enumerate(juegos, 1):
+            destino.importar(juego, *origen.exportar(juego))
+            if al_avanzar:
+                al_avanzar(hechos, len(juegos))
+        while True:
+            with _LOCK_ALMACENES:
+                escritos = _migracion["escritos"]
+                if not escritos:
+                    _almacen_unificado = bool(unificado)
+                    _ALMACENES[raiz] = destino
+                    break
+                _migracion["escritos"] = set()
+            for juego in escritos:
+                destino.importar(juego, *origen.exportar(juego))
+    finally:
+        with _LOCK_ALMACENES:
+            _migracion = None
+    invalidar_metadatos()
+    print(f"[ScreenScraper] Caché migrada a {'un solo archivo' if unificado else 'carpetas'} ({len(juegos)} juegos)")
+    return origen
+
+
+# Tras escribir en 'almacen' la caché de un juego: si hay una migración en
+# curso lo apunta para volver a copiarlo; si acaba de terminar una (se
+# escribió en el almacén viejo), lo copia ya al nuevo.
+def _anotar_escritura(ruta_games, almacen, nombre_archivo):
+    juego = os.path.splitext(nombre_archivo)[0]
+    with _LOCK_ALMACENES:
+        if _migracion is not None:
+            _migracion["escritos"].add(juego)
+            return
+        actual = _ALMACENES.get(os.path.join(ruta_games, CACHE_DIR_NAME))
+    if actual is not None and actual is not almacen:
+        actual.importar(juego, *almacen.exportar(juego))
+
+
+# Caché en memoria (para todo el proceso) de lo que se lee del almacén:
+# la info, la ruta de la portada y las rutas de la galería de cada juego.
+# El grid y la página de detalle los piden a menudo; así solo tocan el
+# disco la primera vez.
+#
+# Se invalida:
+#   - por juego, al escribir en su caché desde esta app
+#     (guardar_info_cache, descargar_medias, migrar_cache_renombrado);
+#   - entera, con invalidar_metadatos() sin argumentos, que MainWindow llama
+#     cuando su QFileSystemWatcher ve cambiar scraper_cache.
+_METADATOS = {}                 # obtener_cache_dir del juego → {"info", "portada", "galeria"}
+_LOCK_METADATOS = threading.Lock()
+# Sube con cada invalidación: un valor leído del disco mientras se
+# invalidaba no se guarda (podría ser ya viejo)
+_generacion_metadatos = 0
+
+
+def invalidar_metadatos(directorio=None):
+    global _generacion_metadatos
+    with _LOCK_METADATOS:
+        _generacion_metadatos += 1
+        if directorio is None:
+            _METADATOS.clear()
+        else:
+            _METADATOS.pop(directorio, None)
+
+
+# Devuelve el campo de la caché en memoria o, si no está, lo lee con
+# leer() y lo guarda
+def _metadato(ruta_games, nombre_archivo, campo, leer):
+    clave = obtener_cache_dir(ruta_games, nombre_archivo)
+    with _LOCK_METADATOS:
+        entrada = _METADATOS.get(clave)
+        if entrada is not None and campo in entrada:
+            return entrada[campo]
+        generacion = _generacion_metadatos
+    valor = leer()
+    with _LOCK_METADATOS:
+        if generacion == _generacion_metadatos:
+            _METADATOS.setdefault(clave, {})[campo] = valor
+    return valor
+
+
+# Renombra la caché del scraper cuando se renombra una ROM
 def migrar_cache_renombrado(ruta_games, nombre_viejo, nombre_nuevo):
-    viejo_dir = obtener_cache_dir(ruta_games, nombre_viejo)
-    nuevo_dir = obtener_cache_dir(ruta_games, nombre_nuevo)
-    if os.path.isdir(viejo_dir) and not os.path.exists(nuevo_dir):
-        try:
-            os.rename(viejo_dir, nuevo_dir)
-        except OSError:
-            pass
+    almacen = _almacen(ruta_games)
+    almacen.renombrar(nombre_viejo, nombre_nuevo)
+    # Si se está migrando, lo ya copiado al destino también se renombra
+    with _LOCK_ALMACENES:
+        destino = _migracion["destino"] if _migracion is not None else None
+    if destino is not None:
+        destino.renombrar(nombre_viejo, nombre_nuevo)
+    _anotar_escritura(ruta_games, almacen, nombre_nuevo)
+    invalidar_metadatos(obtener_cache_dir(ruta_games, nombre_viejo))
+    invalidar_metadatos(obtener_cache_dir(ruta_games, nombre_nuevo))
 
 
 # Esta funcion devuelve el directorio de caché para un juego concreto,
-# basado en la ruta de los juegos y el nombre del archivo ROM,
+# basado en la ruta de los juegos y el nombre del archivo ROM.
+# (Con el almacén unificado la carpeta no existe: solo sirve de clave.)
 def obtener_cache_dir(ruta_games, nombre_archivo):
     base = os.path.splitext(nombre_archivo)[0]
     return os.path.join(ruta_games, CACHE_DIR_NAME, base)
 
+
+# Ruta local de una media del juego ('nombre' como cover.png o los de
+# info["galeria"]), exista ya o no
+def obtener_ruta_media(ruta_games, nombre_archivo, nombre):
+    return _almacen(ruta_games).ruta_media(nombre_archivo, nombre)
+
 # Carga la info cacheada de un juego, o None si no existe o está vacía.
+# El dict es el de la caché en memoria: no se debe modificar.
 def cargar_info_cache(ruta_games, nombre_archivo):
-    ruta_cache = os.path.join(obtener_cache_dir(ruta_games, nombre_archivo), CACHE_INFO_FILE)
-    if os.path.exists(ruta_cache):
-        try:
-            with open(ruta_cache, "r", encoding="utf-8") as archivo:
-                datos = json.load(archivo)
-
-            # Descartar cachés vacías (sin id ni título)
-            # Esto significa que la API no devolvió nada
-            if not datos.get("id") and not datos.get("titulo"):
-                os.remove(ruta_cache)
-                return None
-            
-            return datos
-        except Exception:
-            pass
-    return None
+    return _metadato(ruta_games, nombre_archivo, "info",
+                     lambda: _almacen(ruta_games).leer_info(nombre_archivo))
 
 
  # Guarda la info de un juego en la caché, incluyendo la descarga de 
  # imágenes a partir de las URLs obtenidas de la API.
 def guardar_info_cache(ruta_games, nombre_archivo, info):
-    directorio = obtener_cache_dir(ruta_games, nombre_archivo)
-    os.makedirs(directorio, exist_ok=True)
-    with open(os.path.join(directorio, CACHE_INFO_FILE), "w", encoding="utf-8") as archivo:
-        json.dump(info, archivo, ensure_ascii=False, indent=2)
+    almacen = _almacen(ruta_games)
+    almacen.guardar_info(nombre_archivo, info)
+    _anotar_escritura(ruta_games, almacen, nombre_archivo)
+    invalidar_metadatos(obtener_cache_dir(ruta_games, nombre_archivo))
 
 
 # Esta funcion obtiene la ruta de la portada 
 # (que siempre se guarda con el nombre "cover" seguido de su extensión) 
 # dada la ruta de los juegos y el nombre del archivo ROM
 def obtener_ruta_portada(ruta_games, nombre_archivo):
-    directorio = obtener_cache_dir(ruta_games, nombre_archivo)
-    for extension in (".png", ".jpg", ".jpeg"):
-        ruta = os.path.join(directorio, f"cover{extension}")
-        if os.path.exists(ruta):
-            return ruta
-    return None
+    return _metadato(ruta_games, nombre_archivo, "portada",
+                     lambda: _almacen(ruta_games).buscar_portada(nombre_archivo))
 
 
 # Esta función devuelve una lista de rutas a las imágenes de galería cacheadas,
 # excluyendo la portada, dada la ruta de los juegos y el nombre del archivo ROM
 # dada la ruta de los juegos y el nombre del archivo ROM. 
 def obtener_rutas_galeria(ruta_games, nombre_archivo):
-    directorio = obtener_cache_dir(ruta_games, nombre_archivo)
-    rutas = []
-    if os.path.isdir(directorio):
-        for nombre_fichero in sorted(os.listdir(directorio)):
-            if nombre_fichero.startswith("cover") or nombre_fichero == CACHE_INFO_FILE:
-                continue
-            if nombre_fichero.lower().endswith(('.png', '.jpg', '.jpeg')):
-                rutas.append(os.path.join(directorio, nombre_fichero))
-    return rutas
+    return list(_metadato(ruta_games, nombre_archivo, "galeria",
+                          lambda: _almacen(ruta_games).listar_galeria(nombre_archivo)))
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except OSError:
+        pass
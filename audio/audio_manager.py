@@ -1,6 +1,21 @@
 import ctypes
 import struct      # Para desempaquetar/empaquetar datos binarios (muestras de audio PCM)
 import array       # Para crear arrays tipados eficientes de muestras de audio
+from audio.audio_ring import AudioRingBuffer
+
+# audioop (stdlib hasta Python 3.12) trae un resampler en C (ratecv) que se
+# usa para el control dinámico de tasa. Sin él, el audio pasa sin ajustar.
+try:
+    import audioop
+except ImportError:
+    audioop = None
+
+# NumPy es opcional (el .exe lo excluye): solo se usa para el volumen si
+# audioop no existe (Python 3.13+).
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # Intentar importar PyAudio; si no está instalado, se desactiva el audio
 try:
@@ -20,17 +35,43 @@ try:
 except ImportError:
     _qt_media_available = False
 
+# Latencia de audio por defecto (profundidad del buffer circular, en ms)
+DEFAULT_LATENCY_MS = 64
+
+# Frames que PortAudio pide en cada llamada al callback (como máximo)
+_FRAMES_POR_BLOQUE = 256
+
+
 # Clase encargada de gestionar la salida de audio del emulador.
 # Recibe las muestras de audio del core Libretro y las reproduce mediante PyAudio.
+#
+# El core escribe en un buffer circular preasignado (AudioRingBuffer) y un
+# stream de PortAudio en modo callback lo vacía desde su propio hilo. Así
+# el callback de audio del core nunca bloquea retro_run, y la latencia es
+# la profundidad del buffer (latency_ms) y no lo que dé un write bloqueante.
 class AudioManager:
-    # Inicializa las variables del gestor de audio
-    def __init__(self):
-        self.audio_stream = None           # Stream de salida de PyAudio
+    # Inicializa las variables del gestor de audio.
+    # latency_ms: profundidad del buffer circular en milisegundos.
+    def __init__(self, latency_ms=DEFAULT_LATENCY_MS):
+        self.audio_stream = None           # Stream de salida de PyAudio (modo callback)
         self.pyaudio_instance = None       # Instancia principal de PyAudio
+        self.latency_ms = latency_ms       # Profundidad del buffer circular (se aplica al abrir el stream)
+        self._ring = None                  # AudioRingBuffer entre el core y el callback
+        self._salida = bytearray()         # Buffer reutilizado por el callback de PortAudio
         self._volume = 1.0                 # Volumen actual (rango 0.0 a 1.0)
         self._muted = False                # True → write() descarta muestras (fast-forward)
         self._sample_rate = 0              # Sample rate del stream actual (para reabrir tras cambio de dispositivo)
         self._device_name = ""             # Nombre del dispositivo con el que abrimos el stream
+        # ── Control dinámico de tasa (DRC) ──
+        # Con DRC activo se remuestrea cada bloque un ±max_rate_delta según lo
+        # lleno que esté el buffer circular, para que se mantenga a media
+        # capacidad aunque el reloj de emulación y el de la tarjeta difieran
+        # un poco.
+        self.max_rate_delta = 0.005        # Ajuste máximo de tasa (±0.5%)
+        self._drc_enabled = False          # True → remuestreo según el llenado del buffer
+        self._ratecv_state = None          # Estado de audioop.ratecv entre bloques
+        self.dropped_frames = 0            # Frames descartados por buffer lleno (diagnóstico)
+        self.underrun_frames = 0           # Frames de silencio rellenados por buffer vacío (diagnóstico)
 
     # Propiedad de solo lectura para obtener el volumen actual
     @property
@@ -93,6 +134,8 @@ class AudioManager:
     # Elige el dispositivo apuntando al que Qt considera default (Qt sí ve
     # los cambios en caliente); si no lo encuentra en la lista de PyAudio,
     # se cae al default de PortAudio.
+    # El stream se abre en modo callback: PortAudio llama a _callback desde
+    # su hilo cada vez que necesita un bloque y este lo saca del buffer circular.
     def init_stream(self, sample_rate):
         if not pyaudio:
             print("Advertencia: PyAudio no encontrado.")
@@ -111,42 +154,146 @@ class AudioManager:
             except Exception:
                 self._device_name = ""
 
+        # Buffer circular de latency_ms; el bloque del callback no pasa de
+        # un cuarto del buffer para que haya margen entre productor y consumidor.
+        ring_frames = max(_FRAMES_POR_BLOQUE, sample_rate * self.latency_ms // 1000)
+        self._ring = AudioRingBuffer(ring_frames * 4)
+        self._ratecv_state = None
+
         kwargs = {
             "format": pyaudio.paInt16,
             "channels": 2,
             "rate": sample_rate,
             "output": True,
+            "frames_per_buffer": min(_FRAMES_POR_BLOQUE, ring_frames // 4),
+            "stream_callback": self._callback,
         }
         if device_index is not None:
             kwargs["output_device_index"] = device_index
 
         self.audio_stream = self.pyaudio_instance.open(**kwargs)
-        print(f"[Audio] Stream abierto a {sample_rate} Hz en '{self._device_name}' (índice PyAudio: {device_index})")
+        print(f"[Audio] Stream abierto a {sample_rate} Hz en '{self._device_name}' "
+              f"(índice PyAudio: {device_index}, buffer {self.latency_ms} ms)")
+
+    # Callback de PortAudio (hilo de audio): copia el siguiente bloque del
+    # buffer circular y rellena con silencio si no hay suficiente. El
+    # volumen se aplica aquí, así un cambio de volumen se oye al momento.
+    def _callback(self, in_data, frame_count, time_info, status):
+        n = frame_count * 4
+        if len(self._salida) != n:
+            self._salida = bytearray(n)
+        salida = self._salida
+        ring = self._ring
+        copiado = ring.leer_en(salida) if ring else 0
+        if copiado < n:
+            salida[copiado:] = bytes(n - copiado)
+            if not self._muted:
+                self.underrun_frames += (n - copiado) // 4
+        if self._volume < 1.0:
+            return self._apply_volume(salida), pyaudio.paContinue
+        return bytes(salida), pyaudio.paContinue
 
     # Activa/desactiva el modo mudo. En modo mudo, write() descarta las
-    # muestras sin enviarlas al stream de PyAudio, liberando el throttle
-    # bloqueante y permitiendo que el emulador corra a más de velocidad
-    # nativa (fast-forward). El stream sigue abierto reproduciendo silencio.
+    # muestras y el FramePacer deja de usar el audio como reloj, permitiendo
+    # que el emulador corra a más de velocidad nativa (fast-forward). El
+    # stream sigue abierto y el callback reproduce silencio al vaciarse.
     def set_muted(self, muted):
         self._muted = bool(muted)
 
-    # Escribe un bloque de muestras de audio en el stream de reproducción.
-    # Si el volumen es menor a 1.0, aplica el escalado antes de escribir.
-    # En modo mudo se descartan las muestras (no se llama a write bloqueante).
+    # Activa/desactiva el control dinámico de tasa. Lo activan el FramePacer
+    # de GameWindow (que usa el nivel del buffer como reloj de emulación) y
+    # el EmulationThread (cuyo reloj de pared deriva respecto al de la tarjeta).
+    def set_dynamic_rate_control(self, enabled):
+        self._drc_enabled = bool(enabled)
+        self._ratecv_state = None
+
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    # Capacidad del buffer circular en frames (0 si no hay stream)
+    @property
+    def buffer_capacity(self):
+        return self._ring.capacidad // 4 if self._ring else 0
+
+    # Fracción (0.0 a 1.0) del buffer circular ocupada por audio pendiente
+    # de reproducir. None si no hay stream o está en modo mudo: en ese caso
+    # el audio no sirve como reloj.
+    def buffer_fill(self):
+        if self._muted or not self.audio_stream or not self._ring:
+            return None
+        return self._ring.ocupado() / self._ring.capacidad
+
+    # Escribe un bloque de muestras de audio (bytes PCM int16 estéreo) en el
+    # buffer circular. En modo mudo se descartan las muestras.
     def write(self, data):
-        if self._muted or not self.audio_stream:
+        if self._muted or not self.audio_stream or not self._ring:
             return
-        if self._volume < 1.0:
-            data = self._apply_volume(data)
-        self.audio_stream.write(data)
+        if self._drc_enabled:
+            fill = self.buffer_fill()
+            if fill is not None:
+                data = self._ajustar_tasa(data, fill)
+        self._encolar(data, len(data))
+
+    # Igual que write() pero leyendo directamente del puntero C que pasa el
+    # core (audio_sample_batch): se copia con memmove al buffer circular sin
+    # crear un objeto bytes intermedio. Solo si DRC tiene que remuestrear el
+    # bloque hace falta materializarlo.
+    def write_ptr(self, ptr, frames):
+        if self._muted or not self.audio_stream or not self._ring:
+            return
+        if self._drc_enabled and self._tasa_ajustada(self.buffer_fill()) != self._sample_rate:
+            self.write(ctypes.string_at(ptr, frames * 4))
+            return
+        self._encolar(ptr, frames * 4)
+
+    # Copia al buffer circular lo que quepa; lo que no, se descarta (el
+    # productor va por delante del dispositivo) y se cuenta en dropped_frames.
+    def _encolar(self, origen, n):
+        escritos = self._ring.escribir(origen, n)
+        if escritos < n:
+            self.dropped_frames += (n - escritos) // 4
+
+    # Tasa de salida a la que DRC remuestrea con el llenado dado:
+    #   ratio = 1 + max_rate_delta * (1 - 2 * fill)
+    # Buffer vacío → +0.5% de muestras (se rellena); lleno → -0.5% (se vacía).
+    # Se redondea a Hz enteros, que es lo que admite ratecv.
+    def _tasa_ajustada(self, fill):
+        if audioop is None or fill is None or not self._sample_rate:
+            return self._sample_rate
+        ratio = 1.0 + self.max_rate_delta * (1.0 - 2.0 * fill)
+        return int(round(self._sample_rate * ratio))
 
-    # Aplica el multiplicador de volumen a muestras PCM int16 estéreo.
-    # Desempaqueta los bytes en muestras numéricas, las escala y las vuelve a empaquetar.
+    # Remuestrea un bloque PCM int16 estéreo con el ajuste de DRC
+    # (ver _tasa_ajustada). Sin cambio de tasa devuelve el bloque tal cual.
+    def _ajustar_tasa(self, data, fill):
+        out_rate = self._tasa_ajustada(fill)
+        if out_rate == self._sample_rate:
+            return data
+        data, self._ratecv_state = audioop.ratecv(
+            data, 2, 2, self._sample_rate, out_rate, self._ratecv_state
+        )
+        return data
+
+    # Aplica el multiplicador de volumen a muestras PCM int16 estéreo y
+    # devuelve los bytes escalados. Con volumen en [0, 1] no puede haber
+    # desbordamiento, así que basta con multiplicar en bloque:
+    #   - audioop.mul: una sola pasada en C sobre el bloque entero.
+    #   - NumPy (si no hay audioop): multiplica en sitio una vista int16 del
+    #     bytearray, sin crear arrays intermedios de muestras.
+    #   - Si no hay ninguno, se escala muestra a muestra (lento).
+    # data puede ser bytes o el bytearray que rellena el callback.
     def _apply_volume(self, data):
         vol = self._volume
         # Si el volumen es 0, devolver silencio directamente (bytes a cero)
         if vol <= 0.0:
-            return b'\x00' * len(data)
+            return bytes(len(data))
+        if audioop is not None:
+            return audioop.mul(data, 2, vol)
+        if numpy is not None and isinstance(data, bytearray):
+            muestras = numpy.frombuffer(data, dtype=numpy.int16)
+            numpy.multiply(muestras, vol, out=muestras, casting="unsafe")
+            return bytes(data)
         # Cada muestra ocupa 2 bytes (int16), así que el número de muestras es len/2
         n_samples = len(data) // 2
         # Desempaquetar los bytes como enteros de 16 bits con signo en little-endian
@@ -156,7 +303,7 @@ class AudioManager:
         scaled = array.array('h', (max(-32768, min(32767, int(s * vol))) for s in samples))
         # Convertir de vuelta a bytes para enviar al stream
         return scaled.tobytes()
-    
+
     # Detiene y cierra el stream de audio, liberando los recursos de PyAudio.
     # Deja los atributos a None para que write() no intente usar un stream
     # cerrado tras un reopen o al terminar la sesión.
@@ -168,6 +315,7 @@ class AudioManager:
             except Exception:
                 pass
             self.audio_stream = None
+        self._ring = None
         if self.pyaudio_instance:
             try:
                 self.pyaudio_instance.terminate()
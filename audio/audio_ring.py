@@ -0,0 +1,69 @@
+import ctypes
+
+
+# Buffer circular de audio PCM preasignado, de un solo productor (el core,
+# desde audio_sample_batch) y un solo consumidor (el callback de PortAudio).
+#
+# No usa locks: el productor solo avanza _escrito y el consumidor solo
+# avanza _leido. Ambos son contadores de bytes que crecen sin límite (los
+# int de Python no desbordan) y la posición real es contador % capacidad.
+# Con el GIL, asignar un int es atómico, así que cada lado ve siempre un
+# valor coherente del contador del otro.
+#
+# El almacenamiento es un array de ctypes para poder copiar con memmove
+# directamente desde el puntero que nos da el core, sin pasar por bytes.
+class AudioRingBuffer:
+    def __init__(self, capacidad):
+        # Capacidad en bytes, múltiplo de 4 (un frame estéreo int16)
+        self.capacidad = max(4, capacidad - capacidad % 4)
+        self._buf = ctypes.create_string_buffer(self.capacidad)
+        self._base = ctypes.addressof(self._buf)
+        self._vista = memoryview(self._buf).cast("B")
+        self._escrito = 0   # Bytes escritos en total (solo lo toca el productor)
+        self._leido = 0     # Bytes leídos en total (solo lo toca el consumidor)
+
+    # Bytes pendientes de leer
+    def ocupado(self):
+        return self._escrito - self._leido
+
+    # Bytes que se pueden escribir sin pisar datos no leídos
+    def libre(self):
+        return self.capacidad - (self._escrito - self._leido)
+
+    # Copia hasta n bytes desde origen (puntero C como int/c_void_p o un
+    # objeto bytes) al buffer. Lo que no cabe se descarta y se devuelve el
+    # número de bytes realmente escritos.
+    def escribir(self, origen, n):
+        n = min(n, self.libre())
+        n -= n % 4
+        if n <= 0:
+            return 0
+        if not isinstance(origen, int):
+            origen = ctypes.cast(origen, ctypes.c_void_p).value
+        pos = self._escrito % self.capacidad
+        primero = min(n, self.capacidad - pos)
+        ctypes.memmove(self._base + pos, origen, primero)
+        if primero < n:
+            ctypes.memmove(self._base, origen + primero, n - primero)
+        self._escrito += n
+        return n
+
+    # Copia hasta len(destino) bytes pendientes en destino (bytearray o
+    # memoryview escribible). Devuelve los bytes copiados; el resto de
+    # destino queda intacto (el llamador lo rellena con silencio).
+    def leer_en(self, destino):
+        n = min(len(destino), self.ocupado())
+        n -= n % 4
+        if n <= 0:
+            return 0
+        pos = self._leido % self.capacidad
+        primero = min(n, self.capacidad - pos)
+        destino[:primero] = self._vista[pos:pos + primero]
+        if primero < n:
+            destino[primero:n] = self._vista[:n - primero]
+        self._leido += n
+        return n
+
+    # Descarta todo lo pendiente (lo llama el consumidor o con el stream parado)
+    def vaciar(self):
+        self._leido = self._escrito
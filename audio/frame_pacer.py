@@ -0,0 +1,58 @@
+import math
+import time
+
+
+# Motor de ritmo de frames guiado por audio (audio como reloj maestro).
+# En lugar de fiarse de un QTimer de 16 ms (que no encaja con cores a
+# 59.8 fps), mira cuánto audio queda en el buffer circular de AudioManager
+# y decide cuántos frames hay que emular para mantenerlo en torno a
+# 'objetivo'. El pequeño desfase que
+# quede lo absorbe el control dinámico de tasa de AudioManager (±0.5%).
+#
+# Sin audio utilizable (sin PyAudio, stream cerrado o modo mudo en
+# fast-forward) se cae a un reloj de pared a los FPS nativos del core.
+class FramePacer:
+    def __init__(self, audio_manager, objetivo=0.5, max_frames_por_tick=2):
+        self.audio_manager = audio_manager
+        self.objetivo = objetivo                     # Llenado objetivo del buffer (fracción)
+        self.max_frames_por_tick = max_frames_por_tick  # Tope para no congelar la GUI si el core va lento
+        self._credito = 0.0                          # Frames acumulados del reloj de pared
+        self._ultimo = None                          # perf_counter del último tick
+        if audio_manager:
+            audio_manager.set_dynamic_rate_control(True)
+
+    # Devuelve cuántos frames hay que emular en este tick (0 si ninguno).
+    # fps: FPS nativos que reporta el core (timing.fps).
+    def frames_pendientes(self, fps):
+        fps = fps if fps and fps > 0 else 60.0
+        ahora = time.perf_counter()
+        transcurrido = 0.0 if self._ultimo is None else ahora - self._ultimo
+        self._ultimo = ahora
+
+        fill = self.audio_manager.buffer_fill() if self.audio_manager else None
+        if fill is None:
+            # Reloj de pared: acumular crédito de frames según el tiempo real.
+            # Tras un parón largo no se intenta recuperar todo de golpe.
+            self._credito = min(self._credito + transcurrido * fps, self.max_frames_por_tick)
+            return int(self._credito)
+
+        self._credito = 0.0
+        deficit = self.objetivo - fill
+        if deficit <= 0:
+            return 0
+        # Fracción del buffer que aporta un frame de audio
+        capacidad = self.audio_manager.buffer_capacity
+        sample_rate = self.audio_manager.sample_rate
+        if capacidad <= 0 or not sample_rate:
+            return 1
+        por_frame = (sample_rate / fps) / capacidad
+        return max(1, min(self.max_frames_por_tick, math.ceil(deficit / por_frame)))
+
+    # Descuenta del crédito del reloj de pared los frames realmente emulados.
+    def frames_ejecutados(self, n):
+        self._credito = max(0.0, self._credito - n)
+
+    # Desactiva el control dinámico de tasa del AudioManager.
+    def detener(self):
+        if self.audio_manager:
+            self.audio_manager.set_dynamic_rate_control(False)
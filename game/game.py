@@ -1,10 +1,12 @@
 import os
 import json
-import struct       # Para leer datos binarios de las ROMs (offsets, paletas, etc.)
+import struct       # Para decodificar los píxeles de los iconos (paletas, RGB565)
 import datetime
 
 from lista import Lista
 from api.screenscraper import migrar_cache_renombrado
+from game.library_index import LibraryIndex, listar_roms
+from game.rom_header import leer_cabecera, CabeceraRom
 
 # Intentar importar PIL (Pillow) para la extracción de iconos.
 # Si no está instalado, la funcionalidad de iconos se desactiva.
@@ -14,6 +16,14 @@ try:
 except ImportError:
     _PIL_DISPONIBLE = False
 
+# NumPy es opcional (el .exe lo excluye): con él los iconos se decodifican
+# con operaciones sobre arrays; sin él, con un bucle sobre las tablas de
+# posiciones precalculadas.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # Tamaño final de los iconos extraídos (se upscalean desde el original)
 ICON_SIZE = 192
 
@@ -36,6 +46,16 @@ _NOMBRES_PATH = None
 _ICONOS_DIR = None
 # Ruta al fichero de estadísticas de juego (se rellena en escanear_juegos)
 _STATS_PATH = None
+# Índice persistente de la biblioteca (games/library.db), abierto en escanear_juegos
+_INDICE = None
+
+# mtime de cada JSON de la biblioteca la última vez que se parseó. Los
+# escaneos solo vuelven a leer los que han cambiado en disco.
+_JSON_MTIMES = {}
+
+# Filas del índice con iconos extraídos en segundo plano que aún no se han
+# escrito (se vuelcan en lote con Game.volcar_indice)
+_FILAS_PENDIENTES = {}   # nombre_archivo → fila
 
 _MESES_ES = [
     "enero", "febrero", "marzo", "abril", "mayo", "junio",
@@ -75,6 +95,19 @@ def _guardar_stats(stats):
             json.dump(stats, f, ensure_ascii=False, indent=2)
 
 
+# True si el archivo cambió (o apareció/desapareció) desde la última vez que
+# se preguntó por él. La primera consulta de cada ruta siempre devuelve True.
+def _cambio_desde_ultima_carga(path):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    if path in _JSON_MTIMES and _JSON_MTIMES[path] == mtime:
+        return False
+    _JSON_MTIMES[path] = mtime
+    return True
+
+
 # Formatea segundos jugados: < 3600 → minutos, >= 3600 → horas con 1 decimal
 def formatear_tiempo(segundos):
     if segundos < 3600:
@@ -102,158 +135,119 @@ def _morton_xy(i):
     return x, y
 
 
-# Extrae el icono 32x32 de una ROM NDS desde su banner.
-# El banner contiene un bitmap de 4 bits por píxel (4bpp) organizado en tiles,
-# junto con una paleta de 16 colores en formato RGB555.
-def _extraer_icono_nds(ruta_rom, ruta_destino):
-    try:
-        with open(os.path.realpath(ruta_rom), 'rb') as f:
-            # Leer el offset del banner desde la cabecera del NDS (posición 0x68).
-            # f.seek() mueve el cursor del archivo a esa posición.
-            # struct.unpack('<I', ...) lee 4 bytes y los interpreta como un entero
-            # unsigned de 32 bits en little-endian (el orden de bytes que usa la DS).
-            f.seek(0x68)
-            banner_offset = struct.unpack('<I', f.read(4))[0]
-            if banner_offset == 0:
-                return None
-
-            # El bitmap del icono está en banner+0x20: 512 bytes (32x32 a 4bpp)
-            # La paleta son los 32 bytes siguientes (16 colores × 2 bytes cada uno)
-            f.seek(banner_offset + 0x20)
-            bitmap = f.read(0x200)       # 0x200 = 512 bytes del bitmap
-            palette_data = f.read(0x20)  # 0x20 = 32 bytes de la paleta
-
-        # Decodificar la paleta RGB555: cada color ocupa 2 bytes (unsigned short).
-        # Formato de cada color: 0BBBBBGGGGGRRRRR (5 bits por canal R, G, B).
-        # Se escalan de 5 bits (0-31) a 8 bits (0-248) multiplicando con << 3.
-        palette = []
-        for i in range(16):   # 16 colores en la paleta
-            # struct.unpack('<H', ...) lee 2 bytes como unsigned short little-endian
-            c = struct.unpack('<H', palette_data[i * 2:i * 2 + 2])[0]
-            r = (c & 0x1F) << 3              # Bits 0-4 = Rojo
-            g = ((c >> 5) & 0x1F) << 3       # Bits 5-9 = Verde
-            b = ((c >> 10) & 0x1F) << 3      # Bits 10-14 = Azul
-            a = 0 if i == 0 else 255         # Color 0 = transparente (alpha=0)
-            palette.append((r, g, b, a))
-
-        # Decodificar el bitmap del icono.
-        # El icono 32x32 está dividido en una cuadrícula de 4×4 tiles.
-        # Cada tile es un bloque de 8×8 píxeles.
-        # Dentro de cada tile, cada byte contiene 2 píxeles (4 bits = índice de paleta).
-        img = Image.new('RGBA', (32, 32))    # Crear imagen vacía 32x32 con transparencia
-        px = img.load()                       # px = acceso directo a los píxeles (px[x, y] = color)
-        for ty in range(4):                   # ty = fila de tiles (0-3, recorre las 4 filas de tiles)
-            for tx in range(4):               # tx = columna de tiles (0-3, recorre las 4 columnas)
-                # Calcular dónde empiezan los datos de este tile en el bitmap
-                tile_base = (ty * 4 + tx) * 32   # Cada tile ocupa 32 bytes (8×8÷2)
-                for row in range(8):              # row = fila dentro del tile (0-7)
-                    for col in range(0, 8, 2):    # col = columna, de 2 en 2 (cada byte = 2 píxeles)
-                        byte = bitmap[tile_base + row * 4 + col // 2]
-                        # Los 4 bits bajos del byte = primer píxel (izquierdo)
-                        px[tx * 8 + col, ty * 8 + row] = palette[byte & 0xF]
-                        # Los 4 bits altos del byte = segundo píxel (derecho)
-                        px[tx * 8 + col + 1, ty * 8 + row] = palette[(byte >> 4) & 0xF]
-
-        # Escalar el icono al tamaño final y guardarlo como PNG
-        img = img.resize((ICON_SIZE, ICON_SIZE), Image.Resampling.NEAREST)
-        img.save(ruta_destino)
-        return ruta_destino
-    except Exception as e:
-        print(f"Error extrayendo icono NDS: {e}")
-        return None
-
-
-# Extrae el icono 48x48 de una ROM 3DS desde su SMDH.
-# El icono está almacenado en formato RGB565 organizado en tiles 8x8
-# con orden Morton (Z-order curve) para recorrer los píxeles.
-def _extraer_icono_3ds(ruta_rom, ruta_destino):
+# Tabla de posiciones de un icono en tiles de 8x8: para cada píxel en el
+# orden en que está guardado en la ROM, su índice (y * ancho + x) en la
+# imagen final. 'orden_tile' da las (x, y) de los 64 píxeles de un tile.
+def _tabla_tiles(tiles_ancho, tiles_alto, orden_tile):
+    ancho = tiles_ancho * 8
+    tabla = []
+    for ty in range(tiles_alto):
+        for tx in range(tiles_ancho):
+            for x, y in orden_tile:
+                tabla.append((ty * 8 + y) * ancho + tx * 8 + x)
+    return tabla
+
+
+# NDS: tiles con los píxeles fila a fila. 3DS: tiles en orden Morton.
+# Se calculan una sola vez al importar el módulo.
+_POSICIONES_NDS = _tabla_tiles(4, 4, [(i % 8, i // 8) for i in range(64)])
+_POSICIONES_3DS = _tabla_tiles(6, 6, [_morton_xy(i) for i in range(64)])
+if numpy is not None:
+    _POSICIONES_NDS = numpy.array(_POSICIONES_NDS, dtype=numpy.intp)
+    _POSICIONES_3DS = numpy.array(_POSICIONES_3DS, dtype=numpy.intp)
+
+
+# Decodifica el icono NDS (bitmap 4bpp de 512 bytes + paleta RGB555 de 16
+# colores) a una imagen RGBA 32x32.
+def _decodificar_icono_nds(bitmap, palette_data):
+    if len(bitmap) < 0x200 or len(palette_data) < 0x20:
+        raise ValueError("banner NDS incompleto")
+
+    if numpy is not None:
+        # Paleta RGB555 (0BBBBBGGGGGRRRRR) → RGBA, escalando 5 bits a 8 con << 3.
+        # El color 0 es transparente.
+        c = numpy.frombuffer(palette_data, dtype='<u2', count=16)
+        paleta = numpy.empty((16, 4), dtype=numpy.uint8)
+        paleta[:, 0] = (c & 0x1F) << 3
+        paleta[:, 1] = ((c >> 5) & 0x1F) << 3
+        paleta[:, 2] = ((c >> 10) & 0x1F) << 3
+        paleta[:, 3] = 255
+        paleta[0, 3] = 0
+        # Cada byte son 2 píxeles: los 4 bits bajos el izquierdo, los altos el derecho
+        b = numpy.frombuffer(bitmap, dtype=numpy.uint8, count=0x200)
+        indices = numpy.empty(0x400, dtype=numpy.uint8)
+        indices[0::2] = b & 0xF
+        indices[1::2] = b >> 4
+        rgba = numpy.empty((0x400, 4), dtype=numpy.uint8)
+        rgba[_POSICIONES_NDS] = paleta[indices]
+        return Image.frombuffer('RGBA', (32, 32), rgba, 'raw', 'RGBA', 0, 1)
+
+    paleta = []
+    for i, (c,) in enumerate(struct.iter_unpack('<H', palette_data[:0x20])):
+        paleta.append(bytes((
+            (c & 0x1F) << 3, ((c >> 5) & 0x1F) << 3, ((c >> 10) & 0x1F) << 3,
+            0 if i == 0 else 255,
+        )))
+    rgba = bytearray(0x400 * 4)
+    for i, byte in enumerate(bitmap[:0x200]):
+        d = _POSICIONES_NDS[2 * i] * 4
+        rgba[d:d + 4] = paleta[byte & 0xF]
+        d = _POSICIONES_NDS[2 * i + 1] * 4
+        rgba[d:d + 4] = paleta[byte >> 4]
+    return Image.frombuffer('RGBA', (32, 32), bytes(rgba), 'raw', 'RGBA', 0, 1)
+
+
+# Decodifica el icono grande del SMDH (48x48 RGB565 en tiles Morton) a RGB.
+def _decodificar_icono_3ds(icon_data):
+    if len(icon_data) < 48 * 48 * 2:
+        raise ValueError("icono SMDH incompleto")
+
+    if numpy is not None:
+        # RGB565: bits 15-11 rojo, 10-5 verde, 4-0 azul (escalados a 8 bits)
+        c = numpy.frombuffer(icon_data, dtype='<u2', count=48 * 48)
+        rgb = numpy.empty((48 * 48, 3), dtype=numpy.uint8)
+        rgb[_POSICIONES_3DS, 0] = ((c >> 11) & 0x1F) << 3
+        rgb[_POSICIONES_3DS, 1] = ((c >> 5) & 0x3F) << 2
+        rgb[_POSICIONES_3DS, 2] = (c & 0x1F) << 3
+        return Image.frombuffer('RGB', (48, 48), rgb, 'raw', 'RGB', 0, 1)
+
+    rgb = bytearray(48 * 48 * 3)
+    for i, (c,) in enumerate(struct.iter_unpack('<H', icon_data[:48 * 48 * 2])):
+        d = _POSICIONES_3DS[i] * 3
+        rgb[d] = ((c >> 11) & 0x1F) << 3
+        rgb[d + 1] = ((c >> 5) & 0x3F) << 2
+        rgb[d + 2] = (c & 0x1F) << 3
+    return Image.frombuffer('RGB', (48, 48), bytes(rgb), 'raw', 'RGB', 0, 1)
+
+
+# Decodifica el icono de la cabecera (ver CabeceraRom.icono), lo escala a
+# ICON_SIZE y lo guarda como PNG en ruta_destino.
+#   NDS: 32x32, 4×4 tiles de 8×8 píxeles; cada byte = 2 píxeles (índices de
+#        una paleta de 16 colores RGB555).
+#   3DS: 48x48 RGB565, 6×6 tiles de 8×8 recorridos en orden Morton/Z-order
+#        (ver _morton_xy).
+def _guardar_icono(cabecera, extension, ruta_destino):
     try:
-        with open(os.path.realpath(ruta_rom), 'rb') as f:
-            # Detectar si la ROM es NCSD (dump de cartucho completo) o NCCH (partición directa).
-            # f.seek(0x100) mueve al offset donde está el magic number del formato.
-            # f.read(4) lee los 4 bytes del identificador.
-            f.seek(0x100)
-            magic = f.read(4)
-
-            if magic == b'NCSD':
-                # NCSD: leer offset de la primera partición (en media units = ×0x200)
-                f.seek(0x120)
-                p0_off = struct.unpack('<I', f.read(4))[0] * 0x200
-            elif magic == b'NCCH':
-                # NCCH directo: la partición empieza en el offset 0
-                p0_off = 0
-            else:
-                return None
-
-            # Calcular offset del ExeFS (sistema de archivos ejecutable) dentro del NCCH
-            f.seek(p0_off + 0x1A0)
-            exefs_off = p0_off + struct.unpack('<I', f.read(4))[0] * 0x200
-
-            # Buscar la entrada "icon" en la tabla de archivos del ExeFS.
-            # La tabla tiene hasta 10 entradas, cada una con:
-            #   - 8 bytes: nombre del archivo (rellenado con \x00)
-            #   - 4 bytes: offset relativo dentro del ExeFS
-            #   - 4 bytes: tamaño del archivo
-            # f.read(8) lee el nombre, struct.unpack('<II', ...) lee offset y tamaño.
-            # rstrip(b'\x00') elimina los bytes nulos del relleno del nombre.
-            f.seek(exefs_off)
-            icon_off = None
-            for _ in range(10):    # Máximo 10 entradas en el ExeFS
-                name = f.read(8).rstrip(b'\x00').decode('ascii', errors='ignore')
-                off, sz = struct.unpack('<II', f.read(8))   # off = offset, sz = size
-                if name == 'icon':
-                    # El offset es relativo al inicio de datos del ExeFS (+0x200 por la cabecera)
-                    icon_off = exefs_off + 0x200 + off
-                    break
-
-            if icon_off is None:
-                return None
-
-            # Verificar que el archivo encontrado es realmente un SMDH válido
-            f.seek(icon_off)
-            if f.read(4) != b'SMDH':
-                return None
-
-            # El icono grande (48x48) en formato RGB565 está en el offset 0x24C0 dentro del SMDH.
-            # Cada píxel ocupa 2 bytes → 48 × 48 × 2 = 4608 bytes.
-            f.seek(icon_off + 0x24C0)
-            icon_data = f.read(48 * 48 * 2)
-
-        # Decodificar los píxeles del icono 48x48.
-        # El icono está dividido en una cuadrícula de 6×6 tiles (cada tile = 8×8 píxeles).
-        # Dentro de cada tile, los 64 píxeles NO se recorren en orden normal (fila por fila),
-        # sino en orden Morton/Z-order (un patrón en zigzag que mejora la caché de la GPU).
-        # _morton_xy(i) convierte el índice secuencial (0-63) a las coordenadas (x,y) reales.
-        img = Image.new('RGB', (48, 48))     # Crear imagen vacía 48x48 (sin transparencia)
-        px = img.load()                       # px = acceso directo a los píxeles (px[x, y] = color)
-        pos = 0                               # pos = posición actual en el array de bytes del icono
-        for ty in range(6):                   # ty = fila de tiles (0-5, recorre las 6 filas)
-            for tx in range(6):               # tx = columna de tiles (0-5, recorre las 6 columnas)
-                for i in range(64):           # i = índice del píxel dentro del tile (0-63)
-                    mx, my = _morton_xy(i)    # (mx, my) = coordenadas dentro del tile 8x8
-                    # Leer 2 bytes como unsigned short e interpretar como RGB565:
-                    # Bits 15-11 = Rojo (5 bits), Bits 10-5 = Verde (6 bits), Bits 4-0 = Azul (5 bits)
-                    c = struct.unpack('<H', icon_data[pos:pos + 2])[0]
-                    r = ((c >> 11) & 0x1F) << 3    # Rojo: 5 bits → escalado a 8 bits con << 3
-                    g = ((c >> 5) & 0x3F) << 2     # Verde: 6 bits → escalado a 8 bits con << 2
-                    b = (c & 0x1F) << 3             # Azul: 5 bits → escalado a 8 bits con << 3
-                    # Posición final = (columna_tile × 8 + x_dentro_tile, fila_tile × 8 + y_dentro_tile)
-                    px[tx * 8 + mx, ty * 8 + my] = (r, g, b)
-                    pos += 2                        # Avanzar 2 bytes al siguiente píxel
-
-        # Escalar el icono de 48x48 al tamaño final (192x192) usando interpolación
-        # NEAREST (vecino más cercano) para mantener los píxeles nítidos sin difuminar.
+        if extension == '.nds':
+            img = _decodificar_icono_nds(cabecera.icono[:0x200], cabecera.icono[0x200:0x220])
+        else:
+            img = _decodificar_icono_3ds(cabecera.icono)
+        # Interpolación NEAREST (vecino más cercano) para mantener los
+        # píxeles nítidos sin difuminar
         img = img.resize((ICON_SIZE, ICON_SIZE), Image.Resampling.NEAREST)
         img.save(ruta_destino)
         return ruta_destino
     except Exception as e:
-        print(f"Error extrayendo icono 3DS: {e}")
+        print(f"Error extrayendo icono {extension[1:].upper()}: {e}")
         return None
 
 
 # Extrae el icono de la ROM y devuelve la ruta al PNG generado.
 # Usa caché: si el icono ya fue extraído previamente, reutiliza el archivo existente.
-def _extraer_icono(juego):
+# Si ya se tiene la cabecera leída (analizar_rom) se usa en vez de volver a
+# leer la ROM. Solo lee la ROM y escribe su PNG, así que se puede llamar
+# desde los hilos de IconExtractor.
+def extraer_icono(juego, cabecera=None):
     if not _PIL_DISPONIBLE or not _ICONOS_DIR:
         return None
 
@@ -265,105 +259,38 @@ def _extraer_icono(juego):
     if os.path.exists(ruta_destino):
         return ruta_destino
 
-    # Llamar al extractor correspondiente según la extensión de la ROM
-    if juego.extension == '.nds':
-        return _extraer_icono_nds(juego.ruta_juego, ruta_destino)
-    elif juego.extension == '.3ds':
-        return _extraer_icono_3ds(juego.ruta_juego, ruta_destino)
-    return None
+    if cabecera is None:
+        cabecera = leer_cabecera(juego.ruta_juego, juego.extension)
+    if cabecera is None or cabecera.icono is None:
+        return None
+    return _guardar_icono(cabecera, juego.extension, ruta_destino)
 
 
-# Extrae el título interno completo almacenado dentro del archivo ROM.
-# NDS: lee el título en inglés (UTF-16LE) del banner a partir del offset 0x240.
-# 3DS: lee el título largo en inglés (UTF-16LE) del SMDH.
-def extraer_titulo_rom(ruta_rom, extension):
+# Lee la cabecera de la ROM una sola vez y extrae de ella el icono.
+# Devuelve (ruta del icono o None, CabeceraRom o None). Igual que
+# extraer_icono, se puede llamar desde un hilo de trabajo.
+def analizar_rom(juego):
+    cabecera = leer_cabecera(juego.ruta_juego, juego.extension)
+    return extraer_icono(juego, cabecera), cabecera
+
+
+# Borra el icono cacheado de una ROM (p.ej. porque la ROM ha cambiado)
+def _borrar_icono(nombre_archivo):
+    if not _ICONOS_DIR:
+        return
+    ruta = os.path.join(_ICONOS_DIR, os.path.splitext(nombre_archivo)[0] + ".png")
     try:
-        with open(os.path.realpath(ruta_rom), 'rb') as f:
-            if extension == '.nds':
-                # El banner NDS tiene títulos en 6 idiomas a partir del offset 0x240:
-                # 0x240=JP, 0x340=EN, 0x440=FR, 0x540=DE, 0x640=IT, 0x740=ES
-                # Cada título ocupa 256 bytes en UTF-16LE (128 caracteres)
-                f.seek(0x68)
-                banner_offset = struct.unpack('<I', f.read(4))[0]
-                if banner_offset == 0:
-                    # Si no hay banner, usar el código corto de 12 bytes de la cabecera como fallback
-                    f.seek(0x000)
-                    raw = f.read(12)
-                    return raw.rstrip(b'\x00').decode('ascii', errors='replace').strip()
-
-                # Leer el título en inglés (índice 1) del banner
-                title_off = banner_offset + 0x240 + 1 * 0x100
-                f.seek(title_off)
-                raw = f.read(0x100)
-                # Decodificar UTF-16LE y limpiar caracteres nulos
-                titulo = raw.decode('utf-16-le', errors='replace').rstrip('\x00').strip()
-                return titulo or None
-
-            elif extension == '.3ds':
-                # --- Localizar el SMDH (icono+metadatos) dentro de la ROM 3DS ---
-                # El proceso es igual que en _extraer_icono_3ds:
-                # 1) Detectar formato NCSD (dump completo) o NCCH (partición directa)
-                # 2) Encontrar el ExeFS → buscar la entrada "icon" → leer el SMDH
-
-                # Leer el magic number en offset 0x100 para saber el formato de la ROM
-                f.seek(0x100)
-                magic = f.read(4)
-                if magic == b'NCSD':
-                    # NCSD (dump de cartucho): leer el offset de la primera partición NCCH.
-                    # El offset está en 0x120 en "media units" (1 media unit = 0x200 bytes).
-                    f.seek(0x120)
-                    p0_off = struct.unpack('<I', f.read(4))[0] * 0x200
-                elif magic == b'NCCH':
-                    # NCCH directo: la partición empieza al inicio del archivo
-                    p0_off = 0
-                else:
-                    return None
-
-                # Leer el offset del ExeFS desde la cabecera NCCH (offset relativo + 0x1A0).
-                # El valor leído está en media units, así que se multiplica por 0x200.
-                f.seek(p0_off + 0x1A0)
-                exefs_off = p0_off + struct.unpack('<I', f.read(4))[0] * 0x200
-
-                # Recorrer la tabla de archivos del ExeFS (hasta 10 entradas) buscando "icon".
-                # Cada entrada tiene: 8 bytes (nombre) + 4 bytes (offset) + 4 bytes (tamaño).
-                f.seek(exefs_off)
-                icon_off = None
-                for _ in range(10):
-                    # Leer nombre del archivo (8 bytes ASCII, rellenado con \x00)
-                    name = f.read(8).rstrip(b'\x00').decode('ascii', errors='ignore')
-                    # Leer offset relativo y tamaño (ambos unsigned int 32-bit little-endian)
-                    off, sz = struct.unpack('<II', f.read(8))
-                    if name == 'icon':
-                        # El contenido real empieza 0x200 bytes después del inicio del ExeFS
-                        # (la tabla de entradas ocupa los primeros 0x200 bytes)
-                        icon_off = exefs_off + 0x200 + off
-                        break
-                if icon_off is None:
-                    return None
-
-                # Verificar que el archivo "icon" es realmente un SMDH (magic = "SMDH")
-                f.seek(icon_off)
-                if f.read(4) != b'SMDH':
-                    return None
-
-                # --- Leer el título del juego desde el SMDH ---
-                # El SMDH contiene 16 entradas de idioma a partir del offset 0x08:
-                #   Índices: 0=JP, 1=EN, 2=FR, 3=DE, 4=IT, 5=ES, 6=CN_S, 7=KR, etc.
-                # Cada entrada ocupa 0x200 bytes distribuidos así:
-                #   0x000-0x07F: título corto (64 chars UTF-16LE = 0x80 bytes)
-                #   0x080-0x17F: título largo (128 chars UTF-16LE = 0x100 bytes)
-                #   0x180-0x1FF: publisher (64 chars UTF-16LE = 0x80 bytes)
-                # Usamos el índice 1 (inglés) para obtener el título
-                entry_off = icon_off + 0x08 + 1 * 0x200
-                # Leer el título largo (0x100 bytes = 128 caracteres UTF-16LE) desde offset 0x80
-                f.seek(entry_off + 0x80)
-                raw = f.read(0x100)
-                # Decodificar UTF-16LE y eliminar caracteres nulos sobrantes
-                titulo = raw.decode('utf-16-le', errors='replace').rstrip('\x00').strip()
-                return titulo or None
-    except Exception as e:
-        print(f"Error extrayendo título de ROM: {e}")
-        return None
+        os.remove(ruta)
+    except OSError:
+        pass
+
+
+# Extrae el título interno completo almacenado dentro del archivo ROM
+# (el de la cabecera en inglés, ver CabeceraRom.titulo). Para un Game de la
+# biblioteca es mejor juego.titulo_rom, que usa la cabecera ya indexada.
+def extraer_titulo_rom(ruta_rom, extension):
+    cabecera = leer_cabecera(ruta_rom, extension)
+    return cabecera.titulo if cabecera else None
 
 
 # Clase principal que representa un juego (ROM) en el emulador.
@@ -373,6 +300,8 @@ class Game:
     _nombres_custom = {}
     # Diccionario de estadísticas: nombre_archivo → {tiempo_jugado, ultima_vez}
     _stats = {}
+    # Juegos del último escaneo: nombre_archivo → Game (se reutilizan si la ROM no cambió)
+    _cache = {}
 
     # Constructor: recibe la ruta al archivo ROM y la carpeta de cores
     def __init__(self, ruta_juego, ruta_cores):
@@ -384,6 +313,9 @@ class Game:
         self.ruta_core = self._detectar_core(ruta_cores)                  # Ruta al core libretro correspondiente
         self.imagen = None                                                # Ruta a la carátula (portada del scraper)
         self.imagen_rom = None                                            # Icono extraído directamente de la ROM
+        self._firma = None                                                # (tamaño, mtime_ns) de la ROM al escanearla
+        self._cabecera = None                                             # CabeceraRom (se lee/carga al pedirla)
+        self._cabecera_leida = False
 
     # Devuelve el título personalizado si existe, o el título por defecto
     @property
@@ -410,6 +342,35 @@ class Game:
             Game._nombres_custom.pop(self.nombre_archivo, None)
         _guardar_nombres(Game._nombres_custom)
 
+    # Metadatos de la cabecera de la ROM (CabeceraRom o None). Salen del
+    # índice si ya se leyeron para esta versión de la ROM; si no, se lee la
+    # cabecera una vez y se guarda en el índice.
+    @property
+    def cabecera_rom(self):
+        if not self._cabecera_leida:
+            self._cabecera = _cabecera_indexada(self)
+            if self._cabecera is None:
+                self._cabecera = leer_cabecera(self.ruta_juego, self.extension)
+                _indexar_cabecera(self)
+            self._cabecera_leida = True
+        return self._cabecera
+
+    # La cabecera si ya se leyó o está en el índice, sin leer la ROM (o
+    # None). Para el hilo de la GUI cuando no puede esperar a leerla.
+    def cabecera_conocida(self):
+        if not self._cabecera_leida:
+            cabecera = _cabecera_indexada(self)
+            if cabecera is None:
+                return None
+            self._cabecera, self._cabecera_leida = cabecera, True
+        return self._cabecera
+
+    # Título interno de la ROM (el de la cabecera), o None
+    @property
+    def titulo_rom(self):
+        cabecera = self.cabecera_rom
+        return cabecera.titulo if cabecera else None
+
     # Devuelve el total de segundos jugados para este juego
     @property
     def tiempo_jugado(self):
@@ -521,33 +482,160 @@ class Game:
             _guardar_stats(Game._stats)
 
     # Escanea la carpeta de juegos y devuelve una lista de objetos Game.
-    # Inicializa las rutas globales, carga nombres personalizados y listas,
-    # y extrae los iconos de cada ROM encontrada.
+    # El escaneo es incremental: compara (tamaño, mtime) de cada ROM con el
+    # escaneo anterior y con el índice persistente (games/library.db), así
+    # que solo se crean Game nuevos y se extraen iconos para las ROMs nuevas
+    # o modificadas. nombres.json, stats.json y listas.json solo se vuelven
+    # a leer si cambiaron en disco.
+    #
+    # Con 'extractor' (IconExtractor) los iconos que faltan no se extraen
+    # aquí: esos juegos se devuelven con imagen_rom = None y se encolan; el
+    # icono llega después por Game.registrar_icono. Sin extractor se extraen
+    # en el momento, como antes.
     @staticmethod
-    def escanear_juegos(ruta_games, ruta_cores):
-        global _NOMBRES_PATH, _ICONOS_DIR, _STATS_PATH
+    def escanear_juegos(ruta_games, ruta_cores, extractor=None):
+        global _NOMBRES_PATH, _ICONOS_DIR, _STATS_PATH, _INDICE
         _NOMBRES_PATH = os.path.join(ruta_games, "nombres.json")
         _ICONOS_DIR = os.path.join(ruta_games, "icons")
         _STATS_PATH = os.path.join(ruta_games, "stats.json")
         os.makedirs(_ICONOS_DIR, exist_ok=True)
+
+        ruta_db = os.path.join(ruta_games, "library.db")
+        if _INDICE is None or _INDICE.ruta_db != ruta_db:
+            if _INDICE:
+                _INDICE.cerrar()
+            _INDICE = LibraryIndex(ruta_db)
+            Game._cache = {}
+            _FILAS_PENDIENTES.clear()
+
         # Cargar nombres personalizados, listas y estadísticas desde disco
-        Game._nombres_custom = _cargar_nombres(ruta_games)
-        Game._stats = _cargar_stats(ruta_games)
-        Lista.cargar(ruta_games)
+        if _cambio_desde_ultima_carga(_NOMBRES_PATH):
+            Game._nombres_custom = _cargar_nombres(ruta_games)
+        if _cambio_desde_ultima_carga(_STATS_PATH):
+            Game._stats = _cargar_stats(ruta_games)
+        if _cambio_desde_ultima_carga(os.path.join(ruta_games, "listas.json")):
+            Lista.cargar(ruta_games)
 
-        juegos = []
         if not os.path.isdir(ruta_games):
+            return []
+        roms = listar_roms(ruta_games, EXTENSIONES_VALIDAS)
+        if roms is None:
+            # Fallo puntual al listar (permisos, unidad de red, antivirus):
+            # se devuelve la biblioteca del escaneo anterior sin tocar el
+            # índice ni la caché, que si no se vaciarían enteros
+            juegos = [Game._cache[archivo] for archivo in sorted(Game._cache)]
+            for juego in juegos:
+                juego.imagen = juego.imagen_rom
             return juegos
+
+        juegos = []
+        filas_nuevas = []
         # Recorrer archivos ordenados alfabéticamente
-        for archivo in sorted(os.listdir(ruta_games)):
-            ext = os.path.splitext(archivo)[1].lower()
-            if ext in EXTENSIONES_VALIDAS:
-                ruta_completa = os.path.join(ruta_games, archivo)
-                juego = Game(ruta_completa, ruta_cores)
-                # Extraer el icono de la ROM (se cachea en disco)
-                icono = _extraer_icono(juego)
-                juego.imagen = icono          # Imagen mostrada (puede ser reemplazada por portada del scraper)
+        for archivo in sorted(roms):
+            firma = roms[archivo]
+            juego = Game._cache.get(archivo)
+            if juego is None or juego._firma != firma:
+                juego = Game(os.path.join(ruta_games, archivo), ruta_cores)
+                juego._firma = firma
+                fila = _INDICE.obtener(archivo)
+                if fila and fila[:2] == firma:
+                    icono = fila[2]
+                else:
+                    # ROM nueva o modificada: extraer el icono (se cachea en disco).
+                    # Si la ROM cambió, el icono cacheado puede ser de otra versión.
+                    if fila:
+                        _borrar_icono(archivo)
+                    icono = None
+                    if extractor is None:
+                        icono, cabecera = analizar_rom(juego)
+                        juego._cabecera, juego._cabecera_leida = cabecera, True
+                        if _PIL_DISPONIBLE:
+                            filas_nuevas.append(_fila_indice(juego, icono))
                 juego.imagen_rom = icono      # Icono original de la ROM (se conserva siempre)
-                juegos.append(juego)
+                Game._cache[archivo] = juego
+            # Icono aún sin extraer (ROM nueva, o extracción cancelada por un
+            # reescaneo anterior): encolarlo. El extractor ignora los que ya tiene.
+            if extractor is not None and _icono_pendiente(archivo, juego):
+                extractor.encolar(juego)
+            # Imagen mostrada (puede ser reemplazada por portada del scraper)
+            juego.imagen = juego.imagen_rom
+            juegos.append(juego)
+
+        _INDICE.guardar(filas_nuevas)
+        _INDICE.eliminar([n for n in _INDICE.nombres() if n not in roms])
+        for archivo in [n for n in Game._cache if n not in roms]:
+            del Game._cache[archivo]
         return juegos
 
+    # Guarda el icono (y la cabecera) extraídos en segundo plano para 'juego'
+    # (hilo de la GUI). Devuelve False si el juego ya no está en la
+    # biblioteca o la ROM cambió mientras se extraía (el resultado se descarta).
+    @staticmethod
+    def registrar_icono(juego, icono, cabecera=None):
+        if Game._cache.get(juego.nombre_archivo) is not juego:
+            return False
+        juego.imagen_rom = icono
+        if juego.imagen is None:
+            juego.imagen = icono
+        if not juego._cabecera_leida:
+            juego._cabecera, juego._cabecera_leida = cabecera, True
+        # Se indexa también si no hay icono, para no reintentarlo en cada escaneo
+        _FILAS_PENDIENTES[juego.nombre_archivo] = _fila_indice(juego, icono)
+        return True
+
+    # Escribe en el índice las filas de los iconos registrados (en una sola
+    # transacción; IconExtractor lo llama agrupando varios iconos)
+    @staticmethod
+    def volcar_indice():
+        if _INDICE and _FILAS_PENDIENTES:
+            _INDICE.guardar(list(_FILAS_PENDIENTES.values()))
+        _FILAS_PENDIENTES.clear()
+
+
+# True si la ROM necesita extraer su icono: sin PIL no se extrae nunca, y si
+# el índice (o un registro pendiente de volcar) ya tiene una fila con su
+# firma actual, ya se extrajo
+def _icono_pendiente(archivo, juego):
+    if not _PIL_DISPONIBLE or juego.imagen_rom is not None:
+        return False
+    fila = _INDICE.obtener(archivo)
+    if fila and fila[:2] == juego._firma:
+        return False
+    pendiente = _FILAS_PENDIENTES.get(archivo)
+    return not (pendiente and pendiente[1:3] == juego._firma)
+
+
+# Fila del índice para 'juego' con su icono y la cabecera que tenga leída
+def _fila_indice(juego, icono):
+    cabecera = juego._cabecera
+    return (juego.nombre_archivo, juego._firma[0], juego._firma[1], icono,
+            cabecera.a_json() if cabecera else None)
+
+
+# Cabecera guardada en el índice (o pendiente de volcar) para la versión
+# actual de la ROM, o None
+def _cabecera_indexada(juego):
+    fila = _FILAS_PENDIENTES.get(juego.nombre_archivo)
+    if fila:
+        fila = fila[1:]
+    elif _INDICE:
+        fila = _INDICE.obtener(juego.nombre_archivo)
+    if fila and fila[:2] == juego._firma and fila[3]:
+        return CabeceraRom.desde_json(fila[3])
+    return None
+
+
+# Añade la cabecera recién leída a la fila de la ROM. Si la ROM aún no está
+# indexada (su icono se está extrayendo) no se escribe nada: la fila
+# completa llega con Game.registrar_icono.
+def _indexar_cabecera(juego):
+    if juego._cabecera is None:
+        return
+    nombre = juego.nombre_archivo
+    if nombre in _FILAS_PENDIENTES:
+        if _FILAS_PENDIENTES[nombre][1:3] == juego._firma:
+            _FILAS_PENDIENTES[nombre] = _fila_indice(juego, _FILAS_PENDIENTES[nombre][3])
+        return
+    fila = _INDICE.obtener(nombre) if _INDICE else None
+    if fila and fila[:2] == juego._firma:
+        _INDICE.guardar([_fila_indice(juego, fila[2])])
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+
+# Versión del esquema. Si la base de datos tiene otra, se recrea: el índice
+# solo es una caché de lo que hay en disco y se reconstruye en el siguiente
+# escaneo. (La 1 se migra añadiendo la columna de metadatos.)
+_VERSION_ESQUEMA = 2
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS roms (
+    nombre    TEXT PRIMARY KEY,   -- nombre del archivo ROM (con extensión)
+    tamano    INTEGER NOT NULL,   -- st_size cuando se indexó
+    mtime_ns  INTEGER NOT NULL,   -- st_mtime_ns cuando se indexó
+    icono     TEXT,               -- ruta del icono extraído de la ROM (NULL = sin icono)
+    metadatos TEXT                -- cabecera de la ROM en JSON (CabeceraRom.a_json)
+)
+"""
+
+
+# Índice persistente de la biblioteca (games/library.db, SQLite).
+#
+# Guarda por cada ROM su tamaño y mtime junto con lo que cuesta obtener de
+# ella (el icono extraído y los metadatos de su cabecera). Game.escanear_juegos compara la firma
+# (tamano, mtime_ns) del directorio con la del índice y solo vuelve a
+# procesar las ROMs nuevas o modificadas. Las filas se mantienen también en
+# memoria (_filas), así que la base de datos solo se lee una vez al abrirla
+# y después solo se escriben los cambios.
+#
+# Se usa siempre desde el hilo de la GUI (sqlite3 no comparte conexiones
+# entre hilos por defecto).
+class LibraryIndex:
+    def __init__(self, ruta_db):
+        self.ruta_db = ruta_db
+        self._conn = None
+        self._filas = {}   # nombre → (tamano, mtime_ns, icono, metadatos)
+        self._abrir()
+
+    def _abrir(self):
+        try:
+            self._conn = sqlite3.connect(self.ruta_db)
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version == 1:
+                # Los iconos ya indexados siguen valiendo; los metadatos se
+                # rellenan la primera vez que se piden (Game.cabecera_rom)
+                self._conn.execute("ALTER TABLE roms ADD COLUMN metadatos TEXT")
+            elif version != _VERSION_ESQUEMA:
+                self._conn.execute("DROP TABLE IF EXISTS roms")
+            self._conn.execute(f"PRAGMA user_version = {_VERSION_ESQUEMA}")
+            self._conn.execute(_ESQUEMA)
+            self._conn.commit()
+            self._filas = {
+                nombre: (tamano, mtime_ns, icono, metadatos)
+                for nombre, tamano, mtime_ns, icono, metadatos
+                in self._conn.execute("SELECT nombre, tamano, mtime_ns, icono, metadatos FROM roms")
+            }
+        except sqlite3.Error as e:
+            # Sin índice en disco se sigue funcionando solo con la caché en memoria
+            print(f"[Biblioteca] No se pudo abrir el índice {self.ruta_db}: {e}")
+            self._conn = None
+            self._filas = {}
+
+    # Fila indexada de una ROM: (tamano, mtime_ns, icono, metadatos) o None
+    def obtener(self, nombre):
+        return self._filas.get(nombre)
+
+    def nombres(self):
+        return self._filas.keys()
+
+    # Inserta o actualiza varias filas
+    # [(nombre, tamano, mtime_ns, icono, metadatos), ...]
+    def guardar(self, filas):
+        if not filas:
+            return
+        for nombre, tamano, mtime_ns, icono, metadatos in filas:
+            self._filas[nombre] = (tamano, mtime_ns, icono, metadatos)
+        self._ejecutar_varios(
+            "INSERT OR REPLACE INTO roms (nombre, tamano, mtime_ns, icono, metadatos) "
+            "VALUES (?, ?, ?, ?, ?)",
+            filas,
+        )
+
+    # Elimina las filas de las ROMs que ya no están en la carpeta
+    def eliminar(self, nombres):
+        if not nombres:
+            return
+        for nombre in nombres:
+            self._filas.pop(nombre, None)
+        self._ejecutar_varios("DELETE FROM roms WHERE nombre = ?", [(n,) for n in nombres])
+
+    def _ejecutar_varios(self, sql, filas):
+        if not self._conn:
+            return
+        try:
+            with self._conn:   # una sola transacción por lote
+                self._conn.executemany(sql, filas)
+        except sqlite3.Error as e:
+            print(f"[Biblioteca] Error actualizando el índice: {e}")
+
+    def cerrar(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+
+# Firma de un archivo para detectar cambios: (tamaño, mtime en ns)
+def firma(stat_result):
+    return stat_result.st_size, stat_result.st_mtime_ns
+
+
+# Lista las ROMs de la carpeta con os.scandir, que reutiliza la información
+# del listado del directorio (en Windows el stat sale gratis del propio
+# listado). Devuelve {nombre: (tamano, mtime_ns)}, o None si no se pudo
+# leer la carpeta (no es lo mismo que una carpeta sin ROMs).
+def listar_roms(ruta_games, extensiones):
+    roms = {}
+    try:
+        with os.scandir(ruta_games) as it:
+            for entrada in it:
+                if os.path.splitext(entrada.name)[1].lower() not in extensiones:
+                    continue
+                try:
+                    if entrada.is_file():
+                        roms[entrada.name] = firma(entrada.stat())
+                except OSError:
+                    continue
+    except OSError as e:
+        print(f"[Biblioteca] No se pudo listar {ruta_games}: {e}")
+        return None
+    return roms
@@ -0,0 +1,185 @@
+import os
+import json
+import struct
+
+# Idiomas de los títulos del banner NDS, en orden (las versiones 2 y 3 del
+# banner añaden chino y coreano)
+IDIOMAS_NDS = ["ja", "en", "fr", "de", "it", "es", "zh", "ko"]
+
+# Idiomas de las 16 entradas de título del SMDH (las 4 últimas no se usan)
+IDIOMAS_3DS = ["ja", "en", "fr", "de", "it", "es", "zh_s", "ko", "nl", "pt", "ru", "zh_t"]
+
+# Tamaño del banner NDS hasta el final de los títulos de la versión 3
+_TAM_BANNER_NDS = 0xA40
+# Títulos que trae cada versión del banner NDS
+_TITULOS_POR_VERSION_NDS = {1: 6, 2: 7, 3: 8, 0x103: 8}
+
+# Tamaño del SMDH completo: 0x2008 de títulos y ajustes + icono pequeño
+# (24x24) + icono grande (48x48), ambos RGB565
+_TAM_SMDH = 0x36C0
+_OFFSET_ICONO_SMDH = 0x24C0
+
+
+# Lo que se lee de la cabecera de una ROM NDS o 3DS: títulos en todos los
+# idiomas, editor, código de producto y los bytes crudos del icono.
+#
+# Todo sale de la misma lectura (leer_cabecera), así que extraer el icono y
+# el título interno ya no recorren la ROM cada uno por su cuenta. El icono
+# no se serializa: en el índice solo se guardan los metadatos (a_json) y el
+# icono ya extraído queda como PNG en games/icons.
+class CabeceraRom:
+    def __init__(self, titulos=None, titulos_cortos=None, editor=None,
+                 codigo_producto=None, titulo_interno=None):
+        self.titulos = titulos or {}                  # idioma → título (largo)
+        self.titulos_cortos = titulos_cortos or {}    # idioma → título corto (solo 3DS)
+        self.editor = editor
+        self.codigo_producto = codigo_producto        # p. ej. "AMCE" (NDS) o "CTR-P-AXXE" (3DS)
+        self.titulo_interno = titulo_interno          # título ASCII de la cabecera (solo NDS)
+        # NDS: bitmap 4bpp (0x200) + paleta RGB555 (0x20); 3DS: icono 48x48 RGB565
+        self.icono = None
+
+    # Título preferido: inglés, si no el primero que haya, y si la ROM no
+    # tiene banner, el título corto de la cabecera
+    @property
+    def titulo(self):
+        titulo = self.titulos.get("en") or next(iter(self.titulos.values()), None)
+        return titulo or self.titulo_interno or None
+
+    def a_json(self):
+        return json.dumps({
+            "titulos": self.titulos,
+            "titulos_cortos": self.titulos_cortos,
+            "editor": self.editor,
+            "codigo_producto": self.codigo_producto,
+            "titulo_interno": self.titulo_interno,
+        }, ensure_ascii=False)
+
+    @staticmethod
+    def desde_json(texto):
+        try:
+            return CabeceraRom(**json.loads(texto))
+        except (ValueError, TypeError):
+            return None
+
+
+# Lee de una sola pasada la cabecera de la ROM. Devuelve un CabeceraRom o
+# None si la extensión no tiene cabecera conocida o el archivo no es válido.
+def leer_cabecera(ruta_rom, extension):
+    if extension not in ('.nds', '.3ds'):
+        return None
+    try:
+        with open(os.path.realpath(ruta_rom), 'rb') as f:
+            if extension == '.nds':
+                return _leer_cabecera_nds(f)
+            return _leer_cabecera_3ds(f)
+    except Exception as e:
+        print(f"Error leyendo la cabecera de {os.path.basename(ruta_rom)}: {e}")
+        return None
+
+
+# Cabecera NDS (0x200 bytes) + banner. En la cabecera están el título corto
+# (0x00, 12 bytes ASCII), el código de juego (0x0C, 4 bytes) y el offset
+# del banner (0x68). El banner tiene la versión (0x00), el bitmap del icono
+# (0x20), su paleta (0x220) y los títulos de 0x100 bytes en UTF-16LE a
+# partir de 0x240 (ver IDIOMAS_NDS).
+def _leer_cabecera_nds(f):
+    cabecera = f.read(0x200)
+    if len(cabecera) < 0x200:
+        return None
+    cab = CabeceraRom(
+        titulo_interno=_ascii(cabecera[0x00:0x0C]),
+        codigo_producto=_ascii(cabecera[0x0C:0x10]),
+    )
+    banner_offset = struct.unpack_from('<I', cabecera, 0x68)[0]
+    if banner_offset == 0:
+        return cab
+
+    f.seek(banner_offset)
+    banner = f.read(_TAM_BANNER_NDS)
+    if len(banner) < 0x240:
+        return cab
+    cab.icono = banner[0x20:0x240]
+
+    version = struct.unpack_from('<H', banner, 0)[0]
+    for i in range(_TITULOS_POR_VERSION_NDS.get(version, 6)):
+        titulo = _utf16(banner[0x240 + i * 0x100:0x340 + i * 0x100])
+        if titulo:
+            cab.titulos[IDIOMAS_NDS[i]] = titulo
+    # El banner NDS no tiene campo de editor: el título suele ser
+    # "Nombre\nSubtítulo\nEditor", así que se toma la última línea
+    lineas = (cab.titulo or "").splitlines()
+    if len(lineas) >= 2:
+        cab.editor = lineas[-1].strip() or None
+    return cab
+
+
+# NCSD (dump de cartucho) o NCCH (partición directa) → cabecera NCCH →
+# tabla del ExeFS → archivo "icon" (SMDH). Cada bloque se lee entero de una
+# vez en lugar de campo a campo.
+def _leer_cabecera_3ds(f):
+    # El magic está en 0x100 tanto en NCSD como en NCCH
+    cabecera = f.read(0x200)
+    if len(cabecera) < 0x200:
+        return None
+    magic = cabecera[0x100:0x104]
+    if magic == b'NCSD':
+        # Offset de la primera partición, en media units (0x200 bytes)
+        p0_off = struct.unpack_from('<I', cabecera, 0x120)[0] * 0x200
+        f.seek(p0_off)
+        ncch = f.read(0x200)
+        if len(ncch) < 0x200 or ncch[0x100:0x104] != b'NCCH':
+            return None
+    elif magic == b'NCCH':
+        p0_off = 0
+        ncch = cabecera
+    else:
+        return None
+
+    cab = CabeceraRom(codigo_producto=_ascii(ncch[0x150:0x160]))
+
+    # Tabla del ExeFS: hasta 10 entradas de 8 bytes de nombre + offset + tamaño.
+    # Los datos empiezan 0x200 bytes después (tras la tabla).
+    exefs_off = p0_off + struct.unpack_from('<I', ncch, 0x1A0)[0] * 0x200
+    f.seek(exefs_off)
+    tabla = f.read(0xA0)
+    icon_off = None
+    for i in range(len(tabla) // 16):
+        nombre, off, _ = struct.unpack_from('<8sII', tabla, i * 16)
+        if nombre.rstrip(b'\x00') == b'icon':
+            icon_off = exefs_off + 0x200 + off
+            break
+    if icon_off is None:
+        return cab
+
+    f.seek(icon_off)
+    smdh = f.read(_TAM_SMDH)
+    if smdh[:4] != b'SMDH':
+        return cab
+
+    # 16 entradas de 0x200 bytes desde 0x08: título corto (0x80), título
+    # largo (0x100) y editor (0x80), en UTF-16LE
+    editores = {}
+    for i, idioma in enumerate(IDIOMAS_3DS):
+        entrada = 0x08 + i * 0x200
+        corto = _utf16(smdh[entrada:entrada + 0x80])
+        largo = _utf16(smdh[entrada + 0x80:entrada + 0x180])
+        editor = _utf16(smdh[entrada + 0x180:entrada + 0x200])
+        if largo or corto:
+            cab.titulos[idioma] = largo or corto
+        if corto:
+            cab.titulos_cortos[idioma] = corto
+        if editor:
+            editores[idioma] = editor
+    cab.editor = editores.get("en") or next(iter(editores.values()), None)
+
+    if len(smdh) >= _TAM_SMDH:
+        cab.icono = smdh[_OFFSET_ICONO_SMDH:_TAM_SMDH]
+    return cab
+
+
+def _ascii(datos):
+    return datos.rstrip(b'\x00').decode('ascii', errors='replace').strip() or None
+
+
+def _utf16(datos):
+    return datos.decode('utf-16-le', errors='replace').split('\x00', 1)[0].strip()
@@ -0,0 +1,200 @@
+# ── Imports ──────────────────────────────────────────────────────────
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from functools import wraps
+
+# resource solo existe en Unix (RSS máximo del proceso)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from libretro.retro_core import RetroCore
+from audio.audio_manager import AudioManager
+
+
+# Benchmark headless de RetroCore: carga un core y una ROM sin ventana Qt
+# ni contexto GL y ejecuta N frames lo más rápido posible, con
+# skip_video_output=True y el audio mudo. Mide frames/s, el coste de cada
+# callback Python (environment, input_state, audio_sample_batch...) y la
+# memoria. Con el core de tools/stub_core sirve para detectar regresiones
+# en la capa de callbacks en cualquier Linux sin GPU.
+#
+# Uso:
+#   python -m libretro.benchmark CORE ROM [-n FRAMES] [--json]
+
+# Callbacks de RetroCore que se cronometran (los llaman los thunks de C)
+_CALLBACKS = ("environment", "video_refresh", "audio_sample_batch", "input_poll", "input_state")
+
+
+# AudioManager sin stream: el core ve un gestor de audio real en modo mudo,
+# así write_ptr() sale en la primera comprobación como en fast-forward.
+class _AudioMudo(AudioManager):
+    def init_stream(self, sample_rate):
+        self._sample_rate = sample_rate
+        self.set_muted(True)
+
+
+# Input sin Qt: ningún botón pulsado
+class _InputNulo:
+    def poll(self):
+        pass
+
+    def get_state(self, port, device, index, id_val):
+        return 0
+
+    def update_geometry(self, width, height, aspect_ratio):
+        pass
+
+
+# Sustituye core.<nombre> por un envoltorio que cuenta llamadas y tiempo.
+# Los thunks resuelven _current_core.<nombre> en cada llamada, así que el
+# atributo de instancia tiene prioridad sobre el método de la clase.
+def _cronometrar(core, nombre, stats):
+    original = getattr(core, nombre)
+    entrada = stats[nombre] = [0, 0.0]  # [llamadas, segundos]
+
+    @wraps(original)
+    def envoltorio(*args):
+        t0 = time.perf_counter()
+        try:
+            return original(*args)
+        finally:
+            entrada[0] += 1
+            entrada[1] += time.perf_counter() - t0
+
+    setattr(core, nombre, envoltorio)
+
+
+# RSS máximo del proceso en MiB (None si la plataforma no lo expone)
+def _rss_max_mib():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo da en KiB, macOS en bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+# Carga core + ROM y hace tres pasadas sobre el mismo core:
+#   1. 'frames' frames sin instrumentar → frames/s y percentiles de retro_run
+#   2. 'muestra' frames con los callbacks cronometrados → coste por callback
+#   3. 'muestra' frames con tracemalloc → memoria Python asignada por frame
+# Se separan porque el cronometraje y tracemalloc distorsionan los fps.
+def ejecutar_benchmark(core_path, rom_path, frames=3000, warmup=60, muestra=600):
+    muestra = max(1, min(frames, muestra))
+    core = RetroCore(core_path, _AudioMudo(), _InputNulo())
+    core.headless = True
+    core.skip_video_output = True
+    try:
+        if not core.load_game(rom_path):
+            raise RuntimeError(f"El core no pudo cargar {rom_path}")
+
+        # Calentamiento: el core inicializa cachés en los primeros frames
+        for _ in range(warmup):
+            core.run()
+
+        # 1. Velocidad
+        core.timings.reiniciar()
+        t0 = time.perf_counter()
+        for _ in range(frames):
+            core.run()
+        total = time.perf_counter() - t0
+        run_p50, run_p95, run_p99 = core.timings.percentiles("run")
+
+        # 2. Coste de cada callback
+        stats = {}
+        for nombre in _CALLBACKS:
+            _cronometrar(core, nombre, stats)
+        t0 = time.perf_counter()
+        for _ in range(muestra):
+            core.run()
+        total_cb = time.perf_counter() - t0
+        for nombre in _CALLBACKS:
+            delattr(core, nombre)
+
+        # 3. Memoria
+        tracemalloc.start()
+        mem_inicio, _ = tracemalloc.get_traced_memory()
+        for _ in range(muestra):
+            core.run()
+        mem_fin, mem_pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        core.unload()
+
+    en_callbacks = sum(seg for _, seg in stats.values())
+    return {
+        "core": os.path.basename(core_path),
+        "rom": os.path.basename(rom_path),
+        "frames": frames,
+        "segundos": total,
+        "fps": frames / total if total > 0 else 0.0,
+        "ms_por_frame": total / frames * 1000,
+        "retro_run_ms": {"p50": run_p50, "p95": run_p95, "p99": run_p99},
+        # Fracción del tiempo de la pasada 2 que se va en código Python de los callbacks
+        "fraccion_callbacks": en_callbacks / total_cb if total_cb > 0 else 0.0,
+        "callbacks": {
+            nombre: {
+                "llamadas": n,
+                "por_frame": n / muestra,
+                "us_por_llamada": seg / n * 1e6 if n else 0.0,
+                "ms_por_frame": seg / muestra * 1000,
+            }
+            for nombre, (n, seg) in stats.items()
+        },
+        "memoria": {
+            "python_por_frame_b": (mem_fin - mem_inicio) / muestra,
+            "python_pico_kib": mem_pico / 1024,
+            "rss_max_mib": _rss_max_mib(),
+        },
+    }
+
+
+def _imprimir(res):
+    print(f"\n{res['core']} · {res['rom']} · {res['frames']} frames")
+    print(f"  {res['fps']:.1f} fps  ({res['ms_por_frame']:.3f} ms/frame, {res['segundos']:.2f} s)")
+    run = res["retro_run_ms"]
+    print(f"  retro_run p50/p95/p99: {run['p50']:.3f} / {run['p95']:.3f} / {run['p99']:.3f} ms")
+    print(f"  tiempo en callbacks Python: {res['fraccion_callbacks'] * 100:.1f}%")
+    print(f"  {'callback':<20}{'llamadas/frame':>16}{'µs/llamada':>12}{'ms/frame':>10}")
+    for nombre, c in res["callbacks"].items():
+        print(f"  {nombre:<20}{c['por_frame']:>16.1f}{c['us_por_llamada']:>12.2f}{c['ms_por_frame']:>10.3f}")
+    mem = res["memoria"]
+    rss = f"{mem['rss_max_mib']:.1f} MiB" if mem["rss_max_mib"] is not None else "n/d"
+    print(f"  memoria Python retenida: {mem['python_por_frame_b']:.1f} B/frame "
+          f"(pico {mem['python_pico_kib']:.1f} KiB) · RSS máx {rss}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m libretro.benchmark",
+        description="Benchmark headless de RetroCore (sin ventana ni GPU).",
+    )
+    parser.add_argument("core", help="ruta al core libretro (.dll/.so)")
+    parser.add_argument("rom", help="ruta a la ROM")
+    parser.add_argument("-n", "--frames", type=int, default=3000, help="frames a ejecutar (3000)")
+    parser.add_argument("--warmup", type=int, default=60, help="frames de calentamiento sin medir (60)")
+    parser.add_argument("--muestra", type=int, default=600,
+                        help="frames de las pasadas de callbacks y memoria (600)")
+    parser.add_argument("--json", action="store_true", help="imprime el resultado como JSON")
+    args = parser.parse_args(argv)
+
+    if args.json:
+        # Los print() de RetroCore van a stderr para que stdout sea JSON válido
+        with contextlib.redirect_stdout(sys.stderr):
+            res = ejecutar_benchmark(args.core, args.rom, args.frames, args.warmup, args.muestra)
+        print(json.dumps(res, indent=2))
+        return 0
+
+    res = ejecutar_benchmark(args.core, args.rom, args.frames, args.warmup, args.muestra)
+    _imprimir(res)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import array
+import csv
+import json
+
+# Métricas registradas por frame (todas en segundos):
+#   run    → retro_run completo (incluye todo lo demás)
+#   upload → subida del frame SW a la textura (PBO o directa)
+#   blit   → blit del FBO del core al FBO de Qt (0 con el hilo de emulación,
+#            donde el blit ocurre en paintGL fuera de retro_run)
+#   audio  → escritura en el buffer de AudioManager
+#   input  → input_poll del core
+METRICAS = ("run", "upload", "blit", "audio", "input")
+
+# Frames que guarda el anillo (~20 s a 60 fps)
+CAPACIDAD_DEFAULT = 1200
+
+# Percentiles que se muestran en el overlay
+PERCENTILES = (50, 95, 99)
+
+
+# Anillo de tamaño fijo con los tiempos de cada frame emulado, para saber
+# si un tirón viene del core, de PyOpenGL o de PyAudio.
+#
+# Los arrays se reservan al crear la instancia; durante la emulación solo se
+# suman floats y se escribe una posición por métrica en cada frame, sin
+# crear objetos. RetroCore acumula con sumar() desde sus callbacks mientras
+# dura retro_run y cierra la fila con cerrar_frame().
+class FrameTimings:
+    def __init__(self, capacidad=CAPACIDAD_DEFAULT):
+        self.capacidad = capacidad
+        self._muestras = {m: array.array('d', bytes(8 * capacidad)) for m in METRICAS}
+        self._actual = dict.fromkeys(METRICAS, 0.0)   # acumulado del frame en curso
+        self._indice = 0       # posición donde se escribirá el próximo frame
+        self.total = 0         # frames registrados desde el último reinicio
+
+    # Suma 'segundos' a la métrica del frame en curso
+    def sumar(self, metrica, segundos):
+        self._actual[metrica] += segundos
+
+    # Guarda el frame en curso con su tiempo total de retro_run y empieza otro
+    def cerrar_frame(self, run):
+        i = self._indice
+        actual = self._actual
+        actual["run"] = run
+        for m in METRICAS:
+            self._muestras[m][i] = actual[m]
+            actual[m] = 0.0
+        self._indice = (i + 1) % self.capacidad
+        self.total += 1
+
+    def reiniciar(self):
+        self._indice = 0
+        self.total = 0
+        for m in METRICAS:
+            self._actual[m] = 0.0
+
+    def __len__(self):
+        return min(self.total, self.capacidad)
+
+    # Muestras de una métrica en orden cronológico (la más antigua primero)
+    def _serie(self, metrica):
+        datos = self._muestras[metrica]
+        if self.total <= self.capacidad:
+            return datos[:self.total].tolist()
+        return datos[self._indice:].tolist() + datos[:self._indice].tolist()
+
+    # Percentiles (método del rango más cercano) de una métrica, en ms.
+    # Devuelve None si todavía no hay muestras.
+    def percentiles(self, metrica, ps=PERCENTILES):
+        valores = sorted(self._serie(metrica))
+        if not valores:
+            return None
+        n = len(valores)
+        return tuple(valores[min(n - 1, max(0, -(-p * n // 100) - 1))] * 1000 for p in ps)
+
+    # {métrica: (p50, p95, p99)} en ms para todas las métricas
+    def resumen(self):
+        return {m: self.percentiles(m) for m in METRICAS}
+
+    # Filas en orden cronológico: {"frame": n, "run_ms": ..., ...}
+    def filas(self):
+        series = {m: self._serie(m) for m in METRICAS}
+        primero = self.total - len(self)
+        return [
+            {"frame": primero + i, **{f"{m}_ms": round(series[m][i] * 1000, 4) for m in METRICAS}}
+            for i in range(len(self))
+        ]
+
+    def exportar_csv(self, ruta):
+        with open(ruta, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["frame"] + [f"{m}_ms" for m in METRICAS])
+            writer.writeheader()
+            writer.writerows(self.filas())
+
+    # JSON con el resumen de percentiles y todas las muestras del anillo
+    def exportar_json(self, ruta):
+        resumen = {
+            m: dict(zip((f"p{p}" for p in PERCENTILES), valores)) if valores else None
+            for m, valores in self.resumen().items()
+        }
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump({"resumen_ms": resumen, "frames": self.filas()}, f, indent=2)
@@ -0,0 +1,174 @@
+import ctypes
+# Opcional: sin PyOpenGL solo se usa RetroCore en modo headless, que no sube frames
+try:
+    from OpenGL.GL import *                        # Funciones de OpenGL para renderizado gráfico
+except ImportError:
+    pass
+
+# Número de PBOs en rotación: mientras el driver copia uno a la textura,
+# el core escribe el frame siguiente en otro sin esperar a la GPU.
+NUM_BUFFERS = 3
+
+# Tiempo máximo (ns) que se espera al fence de un slot antes de reutilizarlo
+_FENCE_TIMEOUT_NS = 50_000_000
+
+
+# Convierte lo que devuelve PyOpenGL al mapear un buffer (int o c_void_p)
+# en una dirección numérica utilizable por ctypes.memmove.
+def _direccion(ptr):
+    if ptr is None or isinstance(ptr, int):
+        return ptr or 0
+    return ctypes.cast(ptr, ctypes.c_void_p).value or 0
+
+
+# Subida de frames por software a una textura a través de Pixel Buffer
+# Objects (GL_PIXEL_UNPACK_BUFFER). En vez de un glTexSubImage2D síncrono
+# desde memoria del cliente (el driver copia el frame entero antes de
+# volver), el frame se copia con memmove a un PBO y glTexSubImage2D lee
+# desde el PBO, de forma asíncrona respecto a la GPU.
+#
+# Dos modos:
+#   - Persistente (GL 4.4 / ARB_buffer_storage): un único buffer con
+#     NUM_BUFFERS slots mapeado una sola vez; cada slot tiene un fence para
+#     no escribir encima de una copia que la GPU todavía no ha terminado.
+#   - Clásico: NUM_BUFFERS PBOs que se mapean con GL_MAP_INVALIDATE_BUFFER_BIT
+#     cada frame (el driver entrega memoria nueva sin sincronizar).
+#
+# Todos los recursos pertenecen al contexto GL activo al crearlos (el del
+# widget o el del EmulationThread); liberar() debe llamarse con él activo.
+class PboUploader:
+    def __init__(self):
+        self.disponible = True       # False si el driver no soporta PBOs (se usa la subida directa)
+        self._persistente = None     # None = sin decidir; se detecta en la primera subida
+        self._buffers = []           # IDs de los PBOs (uno solo en modo persistente)
+        self._fences = []            # GLsync por slot (modo persistente)
+        self._mapa = 0               # Dirección del mapeo persistente
+        self._tam_slot = 0           # Bytes por slot (tamaño de un frame con su pitch)
+        self._slot = 0               # Próximo slot a usar
+        self._row_length = None      # GL_UNPACK_ROW_LENGTH ya fijado en el contexto (None = sin fijar)
+
+    # Sube el frame apuntado por data_addr a la textura tex_id.
+    # Devuelve False si no se pudo usar la ruta PBO (el llamador sube directo).
+    def subir(self, tex_id, data_addr, width, height, pitch, gl_format, gl_type, bpp):
+        if not self.disponible:
+            return False
+        # La última fila no tiene por qué incluir el padding del pitch
+        tam = pitch * (height - 1) + width * bpp
+        try:
+            if tam != self._tam_slot:
+                self._crear(tam)
+            if self._persistente:
+                destino = self._preparar_slot_persistente()
+                offset = self._slot * self._tam_slot
+            else:
+                destino = self._preparar_slot_clasico()
+                offset = 0
+            ctypes.memmove(destino, data_addr, tam)
+            if not self._persistente:
+                glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+
+            glBindTexture(GL_TEXTURE_2D, tex_id)
+            # Los cores SW no tocan GL, así que el estado de unpack se queda
+            # fijado entre frames y solo se vuelve a enviar si cambia el pitch.
+            row_length = pitch // bpp
+            if row_length != self._row_length:
+                glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+                glPixelStorei(GL_UNPACK_ROW_LENGTH, row_length)
+                self._row_length = row_length
+            # Con un PBO enlazado, el último argumento es un offset dentro del buffer
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, gl_format, gl_type,
+                            ctypes.c_void_p(offset))
+
+            if self._persistente:
+                self._fences[self._slot] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+            self._slot = (self._slot + 1) % NUM_BUFFERS
+            return True
+        except Exception as e:
+            print(f"[PBO] Desactivado, se usa subida directa: {e}")
+            try:
+                glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+            except Exception:
+                pass
+            self.liberar()
+            self.disponible = False
+            return False
+
+    # (Re)crea los PBOs para frames de 'tam' bytes
+    def _crear(self, tam):
+        self.liberar()
+        if self._persistente is None:
+            self._persistente = self._soporta_persistente()
+            print(f"[PBO] Modo {'persistente' if self._persistente else 'clásico'} "
+                  f"con {NUM_BUFFERS} buffers")
+        self._tam_slot = tam
+        self._slot = 0
+        if self._persistente:
+            flags = GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | GL_MAP_COHERENT_BIT
+            buf = int(glGenBuffers(1))
+            self._buffers = [buf]
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, buf)
+            glBufferStorage(GL_PIXEL_UNPACK_BUFFER, tam * NUM_BUFFERS, None, flags)
+            self._mapa = _direccion(glMapBufferRange(GL_PIXEL_UNPACK_BUFFER, 0, tam * NUM_BUFFERS, flags))
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+            if not self._mapa:
+                raise RuntimeError("glMapBufferRange persistente devolvió NULL")
+            self._fences = [None] * NUM_BUFFERS
+        else:
+            self._buffers = [int(b) for b in glGenBuffers(NUM_BUFFERS)]
+            for buf in self._buffers:
+                glBindBuffer(GL_PIXEL_UNPACK_BUFFER, buf)
+                glBufferData(GL_PIXEL_UNPACK_BUFFER, tam, None, GL_STREAM_DRAW)
+            glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+
+    # El mapeo persistente necesita glBufferStorage (GL 4.4 o ARB_buffer_storage)
+    @staticmethod
+    def _soporta_persistente():
+        try:
+            return bool(glBufferStorage) and bool(glFenceSync)
+        except Exception:
+            return False
+
+    # Espera (si hace falta) a que la GPU haya terminado de leer el slot
+    # actual y devuelve su dirección dentro del mapeo persistente.
+    def _preparar_slot_persistente(self):
+        fence = self._fences[self._slot]
+        if fence is not None:
+            glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, _FENCE_TIMEOUT_NS)
+            glDeleteSync(fence)
+            self._fences[self._slot] = None
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, self._buffers[0])
+        return self._mapa + self._slot * self._tam_slot
+
+    # Enlaza el PBO del slot actual y lo mapea invalidando su contenido
+    # anterior, para que el driver no tenga que esperar a la GPU.
+    def _preparar_slot_clasico(self):
+        glBindBuffer(GL_PIXEL_UNPACK_BUFFER, self._buffers[self._slot])
+        ptr = _direccion(glMapBufferRange(
+            GL_PIXEL_UNPACK_BUFFER, 0, self._tam_slot,
+            GL_MAP_WRITE_BIT | GL_MAP_INVALIDATE_BUFFER_BIT,
+        ))
+        if not ptr:
+            raise RuntimeError("glMapBufferRange devolvió NULL")
+        return ptr
+
+    # Libera PBOs y fences. El contexto GL que los creó debe estar activo.
+    def liberar(self):
+        try:
+            for fence in self._fences:
+                if fence is not None:
+                    glDeleteSync(fence)
+            if self._buffers:
+                if self._persistente and self._mapa:
+                    glBindBuffer(GL_PIXEL_UNPACK_BUFFER, self._buffers[0])
+                    glUnmapBuffer(GL_PIXEL_UNPACK_BUFFER)
+                    glBindBuffer(GL_PIXEL_UNPACK_BUFFER, 0)
+                glDeleteBuffers(len(self._buffers), self._buffers)
+        except Exception as e:
+            print(f"[PBO] Aviso: Error liberando buffers: {e}")
+        self._buffers = []
+        self._fences = []
+        self._mapa = 0
+        self._tam_slot = 0
+        self._slot = 0
+        self._row_length = None
@@ -1,15 +1,62 @@
 import ctypes       # Permite interactuar con librerías en C/C++ (.dll/.so) desde Python
+import mmap
 import os
 import sys
+import time
 from libretro.retro_definitions import *       # Constantes y estructuras C de la API Libretro
-from OpenGL.GL import *                        # Funciones de OpenGL para renderizado gráfico
-from OpenGL.GL.framebufferobjects import *     # Soporte para Framebuffer Objects (FBO) de OpenGL
+# PyOpenGL solo hace falta para presentar frames. Sin él RetroCore sigue
+# funcionando en modo headless (headless + skip_video_output, p. ej. el
+# benchmark con el core de tools/stub_core en un Linux sin GPU): ahí nunca
+# se llama a gl*, y los enums de _SW_UPLOAD_FORMATS se definen a mano.
+try:
+    from OpenGL.GL import *                        # Funciones de OpenGL para renderizado gráfico
+    from OpenGL.GL.framebufferobjects import *     # Soporte para Framebuffer Objects (FBO) de OpenGL
+except ImportError:
+    GL_RGB, GL_BGRA, GL_UNSIGNED_BYTE = 0x1907, 0x80E1, 0x1401
+    GL_UNSIGNED_SHORT_5_6_5, GL_UNSIGNED_SHORT_1_5_5_5_REV = 0x8363, 0x8366
+from libretro.pbo_uploader import PboUploader  # Subida de frames SW por Pixel Buffer Objects
+from libretro.frame_timings import FrameTimings  # Anillo de tiempos por frame (overlay/exportación)
 
 # Variables globales para acceder a la instancia desde los callbacks de C
 # Variable global que mantiene una referencia a la instancia actual del núcleo (RetroCore).
 # Esto es necesario porque los callbacks de C son funciones estáticas/globales y no tienen acceso a 'self'.
 _current_core = None
 
+# Descriptor de subida por formato de píxel libretro: (gl_format, gl_type, bytes por píxel).
+# Se resuelve una vez por SET_PIXEL_FORMAT en vez de en cada video_refresh.
+_SW_UPLOAD_FORMATS = {
+    RETRO_PIXEL_FORMAT_RGB565: (GL_RGB, GL_UNSIGNED_SHORT_5_6_5, 2),
+    # 0RGB1555: 1 bit vacio (A), R, G, B.
+    # GL_UNSIGNED_SHORT_1_5_5_5_REV + GL_BGRA mapea correctamente A(15) R(14-10) G(9-5) B(4-0)
+    RETRO_PIXEL_FORMAT_0RGB1555: (GL_BGRA, GL_UNSIGNED_SHORT_1_5_5_5_REV, 2),
+    # XRGB8888: Byte order B G R X en Little Endian.
+    # GL_BGRA + GL_UNSIGNED_BYTE lee Byte0=B, Byte1=G, Byte2=R, Byte3=A(X)
+    RETRO_PIXEL_FORMAT_XRGB8888: (GL_BGRA, GL_UNSIGNED_BYTE, 4),
+}
+_SW_UPLOAD_DEFAULT = (GL_BGRA, GL_UNSIGNED_BYTE, 4)
+
+# Valores de 'data' en video_refresh que no son un puntero a píxeles:
+# NULL (frame duplicado) y RETRO_HW_FRAME_BUFFER_VALID (-1, render por HW),
+# que según la plataforma llega como -1 o como unsigned de 32/64 bits.
+_NO_SW_FRAME = frozenset((0, -1, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF))
+
+# Dirección y tamaño de un buffer para pasarlo a la API de serialización
+# sin copiarlo. bytes se pasa tal cual (ctypes usa su memoria interna);
+# bytearray, memoryview escribible y arrays ctypes se envuelven con
+# from_buffer, que comparte la memoria del objeto original.
+def _direccion_buffer(buf):
+    if isinstance(buf, bytes):
+        return buf, len(buf)
+    vista = memoryview(buf).cast("B")
+    if not vista.nbytes:
+        return None, 0
+    if vista.readonly:
+        # memoryview de bytes u otro buffer de solo lectura: única copia inevitable
+        datos = vista.tobytes()
+        return datos, len(datos)
+    return ctypes.addressof(ctypes.c_char.from_buffer(vista)), vista.nbytes
+
+
 # Callback utilizado por el contexto de renderizado por hardware.
 # Devuelve el ID del framebuffer OpenGL (FBO) que el núcleo debe usar para renderizar.
 def get_current_framebuffer_callback():
@@ -145,10 +192,20 @@ class RetroCore:
         self.bottom_left_origin = True            # Origen de coordenadas del core (abajo-izquierda)
         self.last_win_size = (-1, -1)             # Último tamaño de ventana conocido
         self.pixel_format = RETRO_PIXEL_FORMAT_0RGB1555   # Formato de píxel actual
+        self._upload_desc = _SW_UPLOAD_FORMATS[self.pixel_format]  # (gl_format, gl_type, bpp) de pixel_format
+        self._blit_logged = False                 # True tras loguear el primer blit (diagnóstico)
+        self._blit_state_ready = False            # True cuando el estado GL fijo del blit ya está aplicado (cores SW)
         self.fbo_width = 0                        # Ancho actual del FBO
         self.fbo_height = 0                       # Alto actual del FBO
         self.target_fbo = None                    # FBO destino (para integración con Qt)
         self.skip_video_output = False            # Si True, video_refresh sale sin subir textura ni blitear (fast-forward headless)
+        self.headless = False                     # Sin contexto GL (benchmark): no crea FBO y rechaza el render por HW
+        self.defer_blit = False                   # Si True, video_refresh no blitea; el frame se presenta luego con blit_frame() (hilo de emulación)
+        self.frame_desc = None                    # Último frame listo para presentar: (ancho, alto, invertir_y)
+        self.fps = 0.0                            # FPS nativos que reporta el core (timing.fps)
+        self.pbo_uploader = PboUploader()         # Subida asíncrona de frames SW (PBOs)
+        self.timings = FrameTimings()             # Tiempos por frame: retro_run, upload, blit, audio, input
+        self.rewind = None                        # RewindBuffer activo (None = rebobinado desactivado)
         self.save_path = None                     # Ruta del archivo de guardado (SRAM)
         self._option_refs = {}                    # Referencias a opciones para evitar limpieza del GC
         self.core_options = {}                    # Opciones de configuración del core
@@ -156,11 +213,22 @@ class RetroCore:
         self.available_options = {}               # Opciones disponibles del core {key: {desc, values[], default}}
         self._pending_sample_rate = 0             # sample rate pendiente de aplicar (SET_SYSTEM_AV_INFO)
         self._current_sample_rate = 0             # sample rate actualmente inicializado
+        self._rom_mmap = None                     # Mapeo en memoria de la ROM (need_fullpath=False)
+        self._rom_buf = None                      # Vista ctypes de la ROM cuya dirección recibe el core
 
         # --- Carga de la librería y configuración ---
         # ctypes.CDLL carga la DLL del core como si fuera una librería C estándar
         self.lib = ctypes.CDLL(lib_path)
 
+        # Firmas de la API de serialización, fijadas una sola vez (el
+        # rebobinado las llama cada pocos frames)
+        self.lib.retro_serialize_size.argtypes = []
+        self.lib.retro_serialize_size.restype = ctypes.c_size_t
+        self.lib.retro_serialize.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        self.lib.retro_serialize.restype = ctypes.c_bool
+        self.lib.retro_unserialize.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        self.lib.retro_unserialize.restype = ctypes.c_bool
+
         # Diccionario de opciones del core (variables).
         # IMPORTANTE: debe estar poblado ANTES de retro_init() para que cuando
         # el core llame GET_VARIABLE durante su inicialización (ej: Citra al crear
@@ -322,6 +390,38 @@ class RetroCore:
                 f.write(data)
             print(f"SRAM guardada en {self.save_path}")
 
+    # Mapea la ROM en memoria y devuelve (dirección, tamaño) para RetroGameInfo.
+    # ACCESS_COPY da un mapeo privado y escribible (necesario para obtener la
+    # dirección con from_buffer) sin copiar nada: el SO carga las páginas
+    # bajo demanda y solo duplica las que el core llegue a modificar. El
+    # mapeo se mantiene vivo hasta unload(), porque el core puede seguir
+    # leyendo de él después de retro_load_game. Si mmap falla (archivo vacío
+    # o sistema de ficheros sin soporte) se lee el archivo a un bytearray.
+    def _mapear_rom(self, rom_path):
+        self._liberar_rom()
+        with open(rom_path, "rb") as f:
+            try:
+                self._rom_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                datos = self._rom_mmap
+            except (OSError, ValueError) as e:
+                print(f"[ROM] mmap no disponible ({e}), se lee en memoria")
+                datos = bytearray(f.read())
+        if not len(datos):
+            return None, 0
+        self._rom_buf = (ctypes.c_char * len(datos)).from_buffer(datos)
+        return ctypes.addressof(self._rom_buf), len(datos)
+
+    # Suelta la vista ctypes y cierra el mapeo de la ROM (en este orden: un
+    # mmap con vistas exportadas no se puede cerrar)
+    def _liberar_rom(self):
+        self._rom_buf = None
+        if self._rom_mmap is not None:
+            try:
+                self._rom_mmap.close()
+            except BufferError as e:
+                print(f"[ROM] Aviso: no se pudo cerrar el mapeo: {e}")
+            self._rom_mmap = None
+
     # Carga un archivo de juego (ROM) en el núcleo.
     # Lee los datos del archivo, configura la memoria y establece los parámetros iniciales del sistema.
     def load_game(self, rom_path):
@@ -349,20 +449,16 @@ class RetroCore:
         game_info.path = full_path
         game_info.meta = None
         
-        rom_data = None # Mantener referencia para que el GC no libere los datos
-        
         # Si el core necesita la ruta completa (need_fullpath=True), no es necesario
         # pasar los datos en memoria; el core abrirá el archivo por su cuenta.
-        # Si no, hay que leer el archivo y pasarlo como buffer.
+        # Si no, la ROM se mapea en memoria y se le pasa la dirección del mapeo.
         if sys_info.need_fullpath:
             game_info.data = None
             game_info.size = 0
         else:
-            with open(rom_path, "rb") as f:
-                rom_data = f.read()
-            # Crear un buffer C con los datos de la ROM y convertirlo a puntero genérico
-            game_info.data = ctypes.cast(ctypes.create_string_buffer(rom_data), ctypes.c_void_p)
-            game_info.size = len(rom_data)
+            addr, size = self._mapear_rom(rom_path)
+            game_info.data = addr
+            game_info.size = size
         
         # Configurar tipos de la función y llamar a retro_load_game
         self.lib.retro_load_game.argtypes = [ctypes.POINTER(RetroGameInfo)]
@@ -370,6 +466,7 @@ class RetroCore:
         
         if not self.lib.retro_load_game(ctypes.byref(game_info)):
             print("Fallo al cargar el juego")
+            self._liberar_rom()
             return False
             
         print("Juego cargado exitosamente.")
@@ -387,6 +484,7 @@ class RetroCore:
         self.base_width = av_info.geometry.base_width
         self.base_height = av_info.geometry.base_height
         self.aspect_ratio = av_info.geometry.aspect_ratio
+        self.fps = av_info.timing.fps
 
         # Actualizar el gestor de entrada con las nuevas dimensiones (para calcular coordenadas táctiles)
         self.input_manager.update_geometry(self.base_width, self.base_height, self.aspect_ratio)
@@ -399,7 +497,7 @@ class RetroCore:
         # ya al tamaño correcto (p.ej. upscaled 512×768 para DS 2x).
         # Si se recrea aquí forzando las dimensiones base, el core renderiza fuera
         # del FBO demasiado pequeño y la imagen aparece cortada.
-        if self.fbo_id == 0:
+        if self.fbo_id == 0 and not self.headless:
             self.init_framebuffer(self.base_width, self.base_height)
         print(f"[FBO] Usando FBO id={self.fbo_id} {self.fbo_width}x{self.fbo_height} "
               f"(base {self.base_width}x{self.base_height})")
@@ -476,40 +574,77 @@ class RetroCore:
             self._pending_sample_rate = 0
             self._current_sample_rate = sr
             self.audio_manager.init_stream(sr)
+        # Rebobinado: mientras se mantiene la tecla se carga el estado anterior
+        # antes de cada frame; si no, se captura tras el frame (cada N frames).
+        rewind = self.rewind
+        rebobinando = rewind is not None and rewind.rebobinando
+        if rebobinando:
+            rewind.retroceder(self)
+        t0 = time.perf_counter()
         self.lib.retro_run()
+        self.timings.cerrar_frame(time.perf_counter() - t0)
+        if rewind is not None and not rebobinando:
+            rewind.frame_emulado(self)
 
-    # Serializa el estado completo del juego (savestate) a un buffer en memoria.
-    # Devuelve bytes con el estado, o None si falla o no está soportado.
+    # Tamaño en bytes del savestate del core (0 si no soporta serializar)
+    def state_size(self):
+        try:
+            return self.lib.retro_serialize_size()
+        except Exception:
+            return 0
+
+    # Serializa el estado directamente en un buffer del llamador (bytearray,
+    # memoryview escribible o array ctypes) de al menos 'size' bytes, sin
+    # copias intermedias. Con size=None se usa state_size().
+    def save_state_into(self, buf, size=None):
+        if size is None:
+            size = self.state_size()
+        if not size:
+            return False
+        ptr, capacidad = _direccion_buffer(buf)
+        if capacidad < size:
+            print(f"[Savestate] Buffer demasiado pequeño ({capacidad} < {size} bytes)")
+            return False
+        return bool(self.lib.retro_serialize(ptr, size))
+
+    # Restaura el estado desde los primeros 'size' bytes de buf (bytes,
+    # bytearray, memoryview o array ctypes) sin copiarlo. Con size=None se
+    # usa el buffer entero.
+    def load_state_from(self, buf, size=None):
+        ptr, capacidad = _direccion_buffer(buf)
+        if size is None:
+            size = capacidad
+        if not size or capacidad < size:
+            return False
+        return bool(self.lib.retro_unserialize(ptr, size))
+
+    # Serializa el estado completo del juego (savestate) a memoria.
+    # Devuelve un bytearray nuevo con el estado (una sola reserva, sin copia
+    # posterior), o None si falla o no está soportado. Para capturas
+    # repetidas conviene reutilizar un buffer propio con save_state_into().
     def save_state(self):
         try:
-            self.lib.retro_serialize_size.restype = ctypes.c_size_t
-            size = self.lib.retro_serialize_size()
+            size = self.state_size()
             if size == 0:
                 print("[Savestate] retro_serialize_size devolvió 0, no soportado")
                 return None
-            buf = ctypes.create_string_buffer(size)
-            self.lib.retro_serialize.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
-            self.lib.retro_serialize.restype = ctypes.c_bool
-            ok = self.lib.retro_serialize(buf, size)
-            if ok:
+            buf = bytearray(size)
+            if self.save_state_into(buf, size):
                 print(f"[Savestate] Estado guardado ({size} bytes)")
-                return bytes(buf)
-            else:
-                print("[Savestate] retro_serialize falló")
-                return None
+                return buf
+            print("[Savestate] retro_serialize falló")
+            return None
         except Exception as e:
             print(f"[Savestate] Error al serializar: {e}")
             return None
 
-    # Restaura el estado del juego desde un buffer previamente guardado con save_state().
+    # Restaura el estado del juego desde un buffer previamente guardado con
+    # save_state() (o leído de un slot). El core lee directamente del buffer.
     def load_state(self, data):
         if not data:
             return False
         try:
-            buf = ctypes.create_string_buffer(data, len(data))
-            self.lib.retro_unserialize.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
-            self.lib.retro_unserialize.restype = ctypes.c_bool
-            ok = self.lib.retro_unserialize(buf, len(data))
+            ok = self.load_state_from(data)
             if ok:
                 print(f"[Savestate] Estado restaurado ({len(data)} bytes)")
             else:
@@ -551,9 +686,11 @@ class RetroCore:
         # Descargar el juego y desinicializar el core (en orden inverso a la carga)
         self.lib.retro_unload_game()
         self.lib.retro_deinit()
+        self._liberar_rom()
 
-        # Liberar recursos OpenGL (FBO, textura, RBO)
+        # Liberar recursos OpenGL (PBOs, FBO, textura, RBO)
         # El contexto GL debe estar activo (makeCurrent) antes de llamar a esto.
+        self.pbo_uploader.liberar()
         try:
             if self.fbo_id:
                 glDeleteFramebuffers(1, [self.fbo_id])
@@ -596,8 +733,9 @@ class RetroCore:
         self.last_win_size = (-1, -1)
         self._pending_sample_rate = 0
         self._current_sample_rate = 0
-        if hasattr(self, '_blit_logged'):
-            del self._blit_logged
+        self.frame_desc = None
+        self._blit_logged = False
+        self._blit_state_ready = False
 
         # Limpiar referencia global para que los callbacks no intenten acceder a este core
         if _current_core is self:
@@ -622,27 +760,11 @@ class RetroCore:
             return
 
         # Manejar renderizado por Software (Desmume, etc) vs Hardware (Citra)
-        # Si data es un puntero válido (no NULL y no RETRO_HW_FRAME_BUFFER_VALID/-1), es software.
-        is_software = False
-        data_addr = 0
-        if data: 
-            # Detección robusta de dirección de memoria
-            if isinstance(data, int):
-                data_addr = data
-            elif hasattr(data, 'value'):
-                data_addr = data.value
-            else:
-                try:
-                    data_addr = int(data)
-                except:
-                    pass
-        
-        # RETRO_HW_FRAME_BUFFER_VALID suele ser -1 (hardware rendering).
-        # También verificamos 0 y valores de puntero inválido comunes.
-        # Citra (HW) enviará -1 (u oscilará como unsigned). Desmume (SW) enviará una dirección RAM válida.
-        if data_addr not in (0, -1, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
-            is_software = True
-        
+        # 'data' llega como int (c_void_p) o None. Citra (HW) envía
+        # RETRO_HW_FRAME_BUFFER_VALID; Desmume (SW) una dirección RAM válida.
+        data_addr = data or 0
+        is_software = data_addr not in _NO_SW_FRAME
+
         # Si es modo Software, necesitamos subir la textura a OpenGL
         if is_software:
             # Inicializar FBO si no existe o si el tamaño cambió
@@ -652,82 +774,25 @@ class RetroCore:
                 self.fbo_height = height
                 # Actualizar geometría base si cambió
                 self.input_manager.update_geometry(width, height, self.aspect_ratio)
-            
-            # Determinar el formato de píxel y bytes por píxel según lo que el core indicó.
-            # Cada formato requiere una combinación específica de gl_format y gl_type.
-            gl_format = GL_BGRA
-            gl_type = GL_UNSIGNED_BYTE
-            bpp = 4    # Bytes por píxel
-            
-            if self.pixel_format == RETRO_PIXEL_FORMAT_RGB565:
-                 gl_format = GL_RGB
-                 gl_type = GL_UNSIGNED_SHORT_5_6_5
-                 bpp = 2
-            elif self.pixel_format == RETRO_PIXEL_FORMAT_0RGB1555:
-                 # 0RGB1555: 1 bit vacio (A), R, G, B.
-                 # GL_UNSIGNED_SHORT_1_5_5_5_REV + GL_BGRA mapea correctamente A(15) R(14-10) G(9-5) B(4-0)
-                 gl_format = GL_BGRA
-                 gl_type = GL_UNSIGNED_SHORT_1_5_5_5_REV
-                 bpp = 2
-            elif self.pixel_format == RETRO_PIXEL_FORMAT_XRGB8888:
-                 # XRGB8888: Byte order B G R X en Little Endian.
-                 # GL_BGRA + GL_UNSIGNED_BYTE lee Byte0=B, Byte1=G, Byte2=R, Byte3=A(X)
-                 gl_format = GL_BGRA
-                 gl_type = GL_UNSIGNED_BYTE
-                 bpp = 4
-
-            # Vincular la textura del FBO para subir los píxeles
-            glBindTexture(GL_TEXTURE_2D, self.tex_id)
-            
-            # Alineación de 1 byte para evitar problemas con filas que no son múltiplo de 4
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
-            
-            # El pitch (stride) es la cantidad de bytes entre el inicio de una fila y la siguiente.
-            # Puede ser mayor que width*bpp si hay padding. GL_UNPACK_ROW_LENGTH lo indica.
-            if pitch > 0:
-                glPixelStorei(GL_UNPACK_ROW_LENGTH, pitch // bpp)
-            
-            # Subir los datos de la imagen de la RAM a la textura de OpenGL
-            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, gl_format, gl_type, ctypes.c_void_p(data_addr))
-            
-            # Restaurar valores por defecto de alineación
-            glPixelStorei(GL_UNPACK_ROW_LENGTH, 0)
-            glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
-            glBindTexture(GL_TEXTURE_2D, 0)
+
+            # Formato GL y bytes por píxel precalculados en SET_PIXEL_FORMAT
+            gl_format, gl_type, bpp = self._upload_desc
+
+            # Subir los píxeles a la textura del FBO. Primero por PBO (asíncrono);
+            # si el driver no lo soporta, subida directa desde la RAM del core.
+            # El tiempo de CPU de la subida se registra en timings ("upload").
+            t0 = time.perf_counter()
+            if pitch <= 0:
+                pitch = width * bpp
+            if not self.pbo_uploader.subir(self.tex_id, data_addr, width, height,
+                                           pitch, gl_format, gl_type, bpp):
+                self._subir_frame_directo(data_addr, width, height, pitch, gl_format, gl_type, bpp)
+            self.timings.sumar("upload", time.perf_counter() - t0)
 
         # Si no tenemos FBO (ni por HW init ni por SW init), salimos
         if self.fbo_id == 0: 
             return
         
-        # Limpiar errores GL pendientes del core antes de hacer blit
-        while glGetError() != GL_NO_ERROR:
-            pass
-
-        # Blit del FBO a pantalla
-        glDisable(GL_SCISSOR_TEST)
-        
-        # Obtener el FBO actual (importante para integración con Qt/SDL donde el buffer por defecto no es 0)
-        prev_fbo = 0
-        if self.target_fbo is not None:
-             prev_fbo = self.target_fbo
-        else:    
-             prev_fbo = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
-        
-        # Debug
-        # print(f"Blit: ID {self.fbo_id} -> {prev_fbo} | Size {width}x{height}")
-        
-        # Configurar el blit: vincular FBO fuente (lectura) y destino (escritura)
-        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo_id)
-        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, prev_fbo)
-        
-        # Limpiar el framebuffer destino con negro antes del blit
-        # (así las barras de letterbox/pillarbox quedan negras)
-        glClearColor(0,0,0,1)
-        glClear(GL_COLOR_BUFFER_BIT)
-        
-        # Coordenadas del rectángulo destino (calculadas en update_video)
-        dst_x, dst_y, dst_w, dst_h = self.view_rect
-        
         # Calcular coordenadas de origen (flip vertical)
         # HW Render: Depende de bottom_left_origin (True = Normal, False = Flipped/Top-Left)
         # SW Render: Datos cargados Bottom-Up o Top-Down?
@@ -749,12 +814,83 @@ class RetroCore:
             blit_h = height
 
         # Log solo en el primer frame para diagnóstico
-        if self.fbo_id and not hasattr(self, '_blit_logged'):
+        if not self._blit_logged:
             self._blit_logged = True
             print(f"[BLIT] is_sw={is_software} callback=({width}x{height}) "
                   f"fbo=({self.fbo_width}x{self.fbo_height}) "
                   f"src=({blit_w}x{blit_h}) dst={self.view_rect}")
 
+        self.frame_desc = (blit_w, blit_h, must_flip_y)
+
+        # Con el hilo de emulación el frame se queda en el FBO del core y el
+        # widget lo presenta desde su propio contexto (blit_frame en paintGL).
+        if self.defer_blit:
+            return
+
+        # FBO destino: el de Qt (set_target_fbo en cada paintGL). Solo se
+        # consulta a GL si el frontend no lo ha indicado.
+        if self.target_fbo is not None:
+            prev_fbo = self.target_fbo
+        else:
+            prev_fbo = glGetIntegerv(GL_DRAW_FRAMEBUFFER_BINDING)
+
+        t0 = time.perf_counter()
+        self.blit_frame(self.fbo_id, prev_fbo)
+        self.timings.sumar("blit", time.perf_counter() - t0)
+
+    # Subida síncrona clásica desde memoria del cliente (sin PBO).
+    def _subir_frame_directo(self, data_addr, width, height, pitch, gl_format, gl_type, bpp):
+        # Vincular la textura del FBO para subir los píxeles
+        glBindTexture(GL_TEXTURE_2D, self.tex_id)
+
+        # Alineación de 1 byte para evitar problemas con filas que no son múltiplo de 4
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+
+        # El pitch (stride) es la cantidad de bytes entre el inicio de una fila y la siguiente.
+        # Puede ser mayor que width*bpp si hay padding. GL_UNPACK_ROW_LENGTH lo indica.
+        glPixelStorei(GL_UNPACK_ROW_LENGTH, pitch // bpp)
+
+        # Subir los datos de la imagen de la RAM a la textura de OpenGL
+        glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, width, height, gl_format, gl_type, ctypes.c_void_p(data_addr))
+
+        # Restaurar valores por defecto de alineación
+        glPixelStorei(GL_UNPACK_ROW_LENGTH, 0)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 4)
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    # Copia el último frame (frame_desc) desde read_fbo a draw_fbo aplicando
+    # el letterboxing de view_rect. Lo usa video_refresh en el modo normal y
+    # OpenGLWidget.paintGL en el modo con hilo de emulación, donde read_fbo es
+    # un FBO del contexto del widget que envuelve la textura compartida tex_id
+    # (los FBOs no se comparten entre contextos, las texturas sí).
+    def blit_frame(self, read_fbo, draw_fbo):
+        if not self.frame_desc:
+            return
+        blit_w, blit_h, must_flip_y = self.frame_desc
+
+        # Un core HW comparte el estado GL con nosotros: puede dejar errores
+        # pendientes (PyOpenGL los lanzaría como excepción en nuestra
+        # siguiente llamada), el scissor activo o otro color de borrado.
+        # Un core SW no toca GL, así que ese estado se fija una sola vez.
+        if self.context_reset_cb or not self._blit_state_ready:
+            # Limpiar errores GL pendientes del core antes de hacer blit
+            while glGetError() != GL_NO_ERROR:
+                pass
+            glDisable(GL_SCISSOR_TEST)
+            glClearColor(0,0,0,1)
+            self._blit_state_ready = True
+
+        # Configurar el blit: vincular FBO fuente (lectura) y destino (escritura)
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, read_fbo)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, draw_fbo)
+
+        # Limpiar el framebuffer destino con negro antes del blit
+        # (así las barras de letterbox/pillarbox quedan negras)
+        glClear(GL_COLOR_BUFFER_BIT)
+        
+        # Coordenadas del rectángulo destino (calculadas en update_video)
+        dst_x, dst_y, dst_w, dst_h = self.view_rect
+
         # Coordenadas Y de origen para el blit
         src_y0 = 0
         src_y1 = blit_h
@@ -773,6 +909,23 @@ class RetroCore:
         # Desvincular el framebuffer de lectura
         glBindFramebuffer(GL_READ_FRAMEBUFFER, 0)
 
+    # Lee el último frame del FBO del core (para la miniatura de un savestate).
+    # Devuelve (ancho, alto, rgba, invertir_y) o None. El contexto GL del core
+    # debe estar activo (hilo de emulación o makeCurrent del widget).
+    def leer_miniatura(self):
+        if self.headless or not self.fbo_id or not self.frame_desc:
+            return None
+        ancho, alto, invertir_y = self.frame_desc
+        try:
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo_id)
+            glPixelStorei(GL_PACK_ALIGNMENT, 1)
+            rgba = glReadPixels(0, 0, ancho, alto, GL_RGBA, GL_UNSIGNED_BYTE)
+            glBindFramebuffer(GL_READ_FRAMEBUFFER, 0)
+        except Exception as e:
+            print(f"[Savestate] No se pudo leer la miniatura: {e}")
+            return None
+        return (ancho, alto, bytes(rgba), invertir_y)
+
     # Callback principal para la comunicación bidireccional entre el núcleo y el frontend (este script).
     # Maneja comandos para configuración, directorios, renderizado, logs y capacidades del sistema.
     def environment(self, cmd, data):
@@ -792,6 +945,7 @@ class RetroCore:
         elif cmd == RETRO_ENVIRONMENT_SET_PIXEL_FORMAT:
             p_fmt = ctypes.cast(data, ctypes.POINTER(ctypes.c_int))
             self.pixel_format = p_fmt[0]
+            self._upload_desc = _SW_UPLOAD_FORMATS.get(self.pixel_format, _SW_UPLOAD_DEFAULT)
             print(f"Environment: Set Pixel Format -> {p_fmt[0]}")
             return True
 
@@ -837,6 +991,10 @@ class RetroCore:
         # El core solicita configurar renderizado por hardware (OpenGL).
         # Se asignan los callbacks de get_framebuffer y get_proc_address.
         elif cmd == RETRO_ENVIRONMENT_SET_HW_RENDER:
+            # Sin contexto GL no podemos ofrecer render por hardware
+            if self.headless:
+                print("Environment: Set HW Render (Rechazado, modo headless)")
+                return False
             hw = ctypes.cast(data, ctypes.POINTER(RetroHWRenderCallback)).contents
             # Asignar las funciones que el core usará para obtener el FBO y resolver funciones GL
             hw.get_current_framebuffer = c_hw_get_current_framebuffer_t(get_current_framebuffer_callback)
@@ -865,13 +1023,16 @@ class RetroCore:
             self.base_width = new_w
             self.base_height = new_h
             self.aspect_ratio = new_ar
+            if av.timing.fps > 0:
+                self.fps = av.timing.fps
             self.input_manager.update_geometry(new_w, new_h, new_ar)
             self.last_win_size = (-1, -1)  # forzar recalculo del viewport
             # Recrear FBO con las dimensiones y flags depth/stencil actualizados.
             # Esto es seguro: estamos en el hilo GL (llamado desde paintGL → retro_run),
             # y el core llamaá su propio context_reset_cb DESPUÉS de este callback,
             # por lo que necesita el FBO válido ya disponible en get_current_framebuffer().
-            self.init_framebuffer(new_w, new_h)
+            if not self.headless:
+                self.init_framebuffer(new_w, new_h)
             # Diferir reinicio de audio (PyAudio crea hilos; hacerlo aquí es inseguro).
             if new_sr > 0 and int(new_sr) != self._current_sample_rate:
                 self._pending_sample_rate = int(new_sr)
@@ -1011,11 +1172,12 @@ class RetroCore:
 
     # Recibe un bloque de muestras de audio desde el núcleo y las envía al gestor de audio para su reproducción.
     def audio_sample_batch(self, data, frames):
-        # Cada frame tiene 2 canales (estéreo) * 2 bytes (16 bits) = 4 bytes por frame
-        size = frames * 4
-        # Extraer los bytes de audio del puntero C y enviarlos al stream de PyAudio
-        buf = ctypes.string_at(data, size)
-        self.audio_manager.write(buf)
+        # Cada frame tiene 2 canales (estéreo) * 2 bytes (16 bits) = 4 bytes por frame.
+        # AudioManager copia directamente del puntero C a su buffer circular
+        # (memmove) sin bloquear: el callback de PortAudio lo reproduce aparte.
+        t0 = time.perf_counter()
+        self.audio_manager.write_ptr(data, frames)
+        self.timings.sumar("audio", time.perf_counter() - t0)
         return frames
 
     # Recibe una única muestra de audio estéreo (izquierda/derecha).
@@ -1026,7 +1188,9 @@ class RetroCore:
     # Solicita al gestor de entrada que actualice el estado de los dispositivos (teclado, mouse, etc.).
     # Se llama una vez por frame antes de consultar los estados específicos.
     def input_poll(self):
+        t0 = time.perf_counter()
         self.input_manager.poll()
+        self.timings.sumar("input", time.perf_counter() - t0)
 
     # Consulta el estado de un botón, eje o coordenada específica de un dispositivo de entrada.
     # Devuelve 1 si está presionado, 0 si no, o el valor del eje/coordenada.
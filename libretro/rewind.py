@@ -0,0 +1,163 @@
+import collections
+import ctypes
+import zlib
+
+# NumPy es opcional (el .exe lo excluye): con él el XOR se hace en sitio
+# sobre los buffers preasignados; sin él se usa aritmética de enteros
+# grandes de Python (también en C, pero creando temporales).
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Valores por defecto (configurables desde ConfigWindow)
+DEFAULT_BUDGET_MB = 128
+DEFAULT_INTERVAL = 10
+
+# Nivel de zlib: los deltas son casi todo ceros, así que el nivel más
+# rápido ya comprime muchísimo y no frena el frame que hace la captura.
+_ZLIB_LEVEL = 1
+
+# Buffers en crudo del tamaño del estado: cabeza, captura nueva y delta
+_NUM_BUFFERS = 3
+
+# Margen mínimo para deltas, en estados completos: si tras los buffers en
+# crudo no queda al menos esto, cada delta se descartaría nada más guardarlo
+_MIN_ESTADOS_DELTAS = 1
+
+
+# Rebobinado: guarda un savestate cada 'intervalo' frames en un anillo de
+# memoria acotado y permite volver atrás paso a paso mientras se mantiene
+# pulsada la tecla de rebobinar.
+#
+# Solo se guarda en crudo el último estado (_cabeza). El anillo contiene
+# deltas comprimidos: delta_k = estado_k XOR estado_(k-1). Para retroceder
+# un paso basta con hacer XOR de la cabeza con el último delta. Como entre
+# dos capturas cercanas cambia poca memoria, el delta es casi todo ceros y
+# zlib lo reduce a una fracción del estado completo.
+#
+# Los tres buffers en crudo se reservan una vez por tamaño de estado y se
+# reutilizan; cuando el anillo supera presupuesto_bytes se descartan
+# los deltas más antiguos. Si el estado es tan grande que los buffers en
+# crudo no dejan sitio para deltas (estados de 3DS con poca memoria
+# configurada), el rebobinado se desactiva avisando en lugar de pasarse del
+# presupuesto sin guardar nada.
+#
+# RetroCore llama a frame_emulado() tras cada retro_run y a retroceder()
+# antes de retro_run mientras rebobinando es True, así funciona igual con
+# el hilo de emulación que con el QTimer de GameWindow.
+class RewindBuffer:
+    def __init__(self, presupuesto_mb=DEFAULT_BUDGET_MB, intervalo=DEFAULT_INTERVAL):
+        self.presupuesto_bytes = int(presupuesto_mb * 1024 * 1024)
+        self.intervalo = max(1, int(intervalo))
+        self.rebobinando = False     # lo activa/desactiva la tecla de rebobinar (hilo GUI)
+        self._deltas = collections.deque()  # deltas comprimidos, el más reciente a la derecha
+        self._bytes = 0              # bytes ocupados por los deltas comprimidos
+        self._tam = 0                # tamaño del estado con el que se reservaron los buffers
+        self._cabeza = None          # último estado capturado (ctypes, en crudo)
+        self._nuevo = None           # buffer donde se serializa la captura siguiente
+        self._delta = None           # buffer para el delta en crudo
+        self._hay_cabeza = False
+        self._contador = 0           # frames desde la última captura
+        self._soportado = True       # False si el core no serializa o el estado no cabe (se deja de intentar)
+
+    # Número de pasos disponibles hacia atrás
+    def __len__(self):
+        return len(self._deltas)
+
+    # Memoria total usada: deltas comprimidos + los buffers en crudo
+    @property
+    def memoria_bytes(self):
+        return self._bytes + _NUM_BUFFERS * self._tam
+
+    def vaciar(self):
+        self._deltas.clear()
+        self._bytes = 0
+        self._hay_cabeza = False
+        self._contador = 0
+
+    # Llamado tras cada frame emulado: captura un estado cada 'intervalo' frames
+    def frame_emulado(self, core):
+        if not self._soportado:
+            return
+        self._contador += 1
+        if self._contador < self.intervalo:
+            return
+        self._contador = 0
+        self._capturar(core)
+
+    def _capturar(self, core):
+        tam = core.state_size()
+        if tam <= 0:
+            self._soportado = False
+            print("[Rewind] El core no soporta savestates; rebobinado desactivado")
+            return
+        if tam != self._tam:
+            if not self._cabe(tam):
+                return
+            self._reservar(tam)
+        if not core.save_state_into(self._nuevo, tam):
+            return
+        if self._hay_cabeza:
+            self._xor(self._nuevo, self._cabeza, self._delta)
+            comprimido = zlib.compress(self._delta, _ZLIB_LEVEL)
+            self._deltas.append(comprimido)
+            self._bytes += len(comprimido)
+            self._recortar()
+        # El estado recién capturado pasa a ser la cabeza (intercambio sin copiar)
+        self._cabeza, self._nuevo = self._nuevo, self._cabeza
+        self._hay_cabeza = True
+
+    # Llamado antes de retro_run mientras se rebobina: retrocede un paso y
+    # carga ese estado en el core. Sin más pasos se queda en el más antiguo.
+    def retroceder(self, core):
+        if not self._hay_cabeza:
+            return
+        if self._deltas:
+            comprimido = self._deltas.pop()
+            self._bytes -= len(comprimido)
+            ctypes.memmove(self._delta, zlib.decompress(comprimido), self._tam)
+            self._xor(self._cabeza, self._delta, self._cabeza)
+        core.load_state_from(self._cabeza, self._tam)
+        self._contador = 0
+
+    # Comprueba que con estados de 'tam' bytes el presupuesto deja sitio
+    # para deltas; si no, desactiva el rebobinado y libera los buffers
+    def _cabe(self, tam):
+        necesario = (_NUM_BUFFERS + _MIN_ESTADOS_DELTAS) * tam
+        if necesario <= self.presupuesto_bytes:
+            return True
+        self._soportado = False
+        self.vaciar()
+        self._tam = 0
+        self._cabeza = self._nuevo = self._delta = None
+        print(f"[Rewind] El estado ocupa {tam / (1024 * 1024):.1f} MB y la memoria de rebobinado "
+              f"({self.presupuesto_bytes // (1024 * 1024)} MB) no alcanza; hacen falta al menos "
+              f"{-(-necesario // (1024 * 1024))} MB. Rebobinado desactivado")
+        return False
+
+    # (Re)reserva los buffers en crudo para estados de 'tam' bytes. Un cambio
+    # de tamaño invalida los deltas existentes.
+    def _reservar(self, tam):
+        self.vaciar()
+        self._tam = tam
+        self._cabeza = ctypes.create_string_buffer(tam)
+        self._nuevo = ctypes.create_string_buffer(tam)
+        self._delta = ctypes.create_string_buffer(tam)
+
+    # Descarta los deltas más antiguos hasta entrar en el presupuesto
+    def _recortar(self):
+        limite = max(0, self.presupuesto_bytes - _NUM_BUFFERS * self._tam)
+        while self._deltas and self._bytes > limite:
+            self._bytes -= len(self._deltas.popleft())
+
+    # destino = a XOR b (tres buffers ctypes de self._tam bytes; destino
+    # puede ser uno de los operandos)
+    def _xor(self, a, b, destino):
+        if numpy is not None:
+            va = numpy.frombuffer(a, dtype=numpy.uint8, count=self._tam)
+            vb = numpy.frombuffer(b, dtype=numpy.uint8, count=self._tam)
+            numpy.bitwise_xor(va, vb, out=numpy.frombuffer(destino, dtype=numpy.uint8, count=self._tam))
+            return
+        x = int.from_bytes(a.raw, "little") ^ int.from_bytes(b.raw, "little")
+        ctypes.memmove(destino, x.to_bytes(self._tam, "little"), self._tam)
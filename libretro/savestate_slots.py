@@ -0,0 +1,112 @@
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# PIL (Pillow) es opcional: sin él los slots funcionan igual pero sin miniatura
+try:
+    from PIL import Image
+    _PIL_DISPONIBLE = True
+except ImportError:
+    _PIL_DISPONIBLE = False
+
+# Número de slots por ROM (1..NUM_SLOTS)
+NUM_SLOTS = 8
+
+# Nivel de zlib para los estados en disco. Se comprime en el hilo de
+# trabajo (zlib libera el GIL), así que se puede permitir algo más que
+# el nivel mínimo del rebobinado sin frenar la emulación.
+_ZLIB_LEVEL = 3
+
+# Lado máximo de la miniatura guardada junto a cada estado
+MINIATURA_MAX = 256
+
+
+# Slots numerados de savestates de una ROM, guardados en saves/ como
+# "<rom>.state<N>" (estado comprimido con zlib) y "<rom>.state<N>.png"
+# (miniatura del último frame).
+#
+# Solo la serialización (retro_serialize) y la lectura del FBO ocurren en el
+# hilo de emulación; comprimir, escribir, leer y descomprimir se hacen en un
+# único hilo de trabajo, que además serializa las operaciones sobre disco
+# (un cargar() justo después de un guardar() del mismo slot lee lo nuevo).
+# Cada archivo se escribe en un .tmp y se renombra con os.replace, así un
+# cierre a mitad de escritura nunca deja un slot corrupto.
+class SaveStateSlots:
+    def __init__(self, rom_path, directorio="saves"):
+        rom_name = os.path.splitext(os.path.basename(rom_path))[0]
+        self._base = os.path.abspath(os.path.join(directorio, rom_name))
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="savestate")
+
+    def ruta_estado(self, slot):
+        return f"{self._base}.state{slot}"
+
+    def ruta_miniatura(self, slot):
+        return f"{self._base}.state{slot}.png"
+
+    def ocupado(self, slot):
+        return os.path.exists(self.ruta_estado(slot))
+
+    # Encola la escritura del slot. 'datos' es el estado serializado (bytes)
+    # y 'miniatura' lo que devuelve RetroCore.leer_miniatura() (o None).
+    # Devuelve un Future con True/False.
+    def guardar(self, slot, datos, miniatura=None):
+        return self._worker.submit(self._escribir, slot, datos, miniatura)
+
+    # Encola la lectura del slot. Devuelve un Future con los bytes del
+    # estado descomprimido, o None si el slot está vacío o es ilegible.
+    def cargar(self, slot):
+        return self._worker.submit(self._leer, slot)
+
+    # Espera a que terminen las escrituras pendientes y para el hilo
+    def cerrar(self):
+        self._worker.shutdown(wait=True)
+
+    def _escribir(self, slot, datos, miniatura):
+        ruta = self.ruta_estado(slot)
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            _escribir_atomico(ruta, zlib.compress(datos, _ZLIB_LEVEL))
+        except Exception as e:
+            print(f"[Savestate] Error guardando slot {slot}: {e}")
+            return False
+        print(f"[Savestate] Slot {slot} guardado ({len(datos)} bytes)")
+        if miniatura and _PIL_DISPONIBLE:
+            try:
+                self._escribir_miniatura(slot, *miniatura)
+            except Exception as e:
+                print(f"[Savestate] Error guardando miniatura del slot {slot}: {e}")
+        return True
+
+    # glReadPixels entrega las filas de abajo arriba; si el core ya dibuja
+    # invertido (invertir_y) las filas llegan en el orden de la imagen.
+    def _escribir_miniatura(self, slot, ancho, alto, rgba, invertir_y):
+        orientacion = 1 if invertir_y else -1
+        img = Image.frombuffer("RGBA", (ancho, alto), rgba, "raw", "RGBA", 0, orientacion)
+        img = img.convert("RGB")
+        img.thumbnail((MINIATURA_MAX, MINIATURA_MAX))
+        ruta = self.ruta_miniatura(slot)
+        tmp = ruta + ".tmp"
+        img.save(tmp, "PNG")
+        os.replace(tmp, ruta)
+
+    def _leer(self, slot):
+        ruta = self.ruta_estado(slot)
+        if not os.path.exists(ruta):
+            print(f"[Savestate] Slot {slot} vacío")
+            return None
+        try:
+            with open(ruta, "rb") as f:
+                return zlib.decompress(f.read())
+        except Exception as e:
+            print(f"[Savestate] Error leyendo slot {slot}: {e}")
+            return None
+
+
+# Escribe 'datos' en un temporal junto a 'ruta' y lo renombra encima
+def _escribir_atomico(ruta, datos):
+    tmp = ruta + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(datos)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, ruta)
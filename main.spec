@@ -59,11 +59,27 @@ a = Analysis(
         # Módulos propios que se importan dinámicamente o por string
         'retro_core',
         'retro_definitions',
+        'libretro.pbo_uploader',
+        'libretro.frame_timings',
+        'libretro.rewind',
+        'libretro.savestate_slots',
         'audio_manager',
+        'audio.frame_pacer',
+        'audio.audio_ring',
         'input_manager',
         'juego',
+        'game.library_index',
+        'game.rom_header',
+        'api.rom_hashes',
+        'api.http_pool',
+        'api.rate_limiter',
+        'api.scraper_store',
         'lista',
         'ui.openGLWidget',
+        'ui.emulationThread',
+        'ui.thumbnailCache',
+        'ui.iconExtractor',
+        'ui.scrapingService',
         'ui.mainWindow.mainWindow',
         'ui.mainWindow.mainWindowUI',
         'ui.gameWindow.gameWindow',
@@ -73,6 +89,7 @@ a = Analysis(
         'ui.sidebar.sidebar',
         'ui.sidebar.sidebarUI',
         'ui.editableLabel.editableLabel',
+        'ui.libraryGrid.libraryGrid',
         'ui.configWindow.configWindow',
         'ui.configWindow.configWindowUI',
         'ui.gameSideBar.gameSideBar',
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Los tests importan los paquetes de la app (api, libretro...) desde la raíz
+# del repositorio, igual que main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
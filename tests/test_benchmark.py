@@ -0,0 +1,48 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from libretro.benchmark import ejecutar_benchmark
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STUB_C = os.path.join(_RAIZ, "tools", "stub_core", "stub_core.c")
+
+
+# Compila tools/stub_core/stub_core.c con gcc en un directorio temporal
+@pytest.fixture(scope="module")
+def stub_core(tmp_path_factory):
+    gcc = shutil.which("gcc")
+    if gcc is None:
+        pytest.skip("gcc no está instalado")
+    extension = ".dll" if sys.platform == "win32" else ".so"
+    salida = str(tmp_path_factory.mktemp("stub_core") / f"stub_core{extension}")
+    opciones = [] if sys.platform == "win32" else ["-fPIC"]
+    subprocess.run([gcc, "-O2", "-shared", *opciones, "-o", salida, _STUB_C], check=True)
+    return salida
+
+
+# El benchmark no debe necesitar PyOpenGL ni Qt: se importa en un proceso
+# limpio, sin nada cargado por otros tests
+def test_importa_sin_dependencias_graficas():
+    subprocess.run([sys.executable, "-c", "import libretro.benchmark"], cwd=_RAIZ, check=True)
+
+
+def test_benchmark_con_stub_core(stub_core, tmp_path):
+    rom = tmp_path / "rom.bin"
+    rom.write_bytes(bytes(4096))
+
+    res = ejecutar_benchmark(stub_core, str(rom), frames=120, warmup=5, muestra=30)
+
+    assert res["frames"] == 120
+    assert res["fps"] > 0
+    # Por frame el stub hace 1 video_refresh, 1 audio_sample_batch,
+    # 1 input_poll y 18 input_state (16 botones + x/y del puntero)
+    callbacks = res["callbacks"]
+    assert callbacks["video_refresh"]["por_frame"] == 1
+    assert callbacks["audio_sample_batch"]["por_frame"] == 1
+    assert callbacks["input_poll"]["por_frame"] == 1
+    assert callbacks["input_state"]["por_frame"] == 18
+    assert callbacks["environment"]["llamadas"] >= 30
@@ -0,0 +1,25 @@
+from game import game as modulo_game
+from game.game import Game
+from game.library_index import listar_roms
+
+
+def test_listar_roms_distingue_error_de_carpeta_vacia(tmp_path):
+    assert listar_roms(str(tmp_path), {".nds"}) == {}
+    assert listar_roms(str(tmp_path / "no_existe"), {".nds"}) is None
+
+
+# Un fallo puntual al listar games/ no debe vaciar la biblioteca
+def test_escaneo_conserva_la_biblioteca_si_no_se_puede_listar(tmp_path, monkeypatch):
+    ruta_games = str(tmp_path)
+    (tmp_path / "Zelda.nds").write_bytes(b"\0" * 512)
+    juegos = Game.escanear_juegos(ruta_games, str(tmp_path / "cores"))
+    assert [j.nombre_archivo for j in juegos] == ["Zelda.nds"]
+
+    monkeypatch.setattr(modulo_game, "listar_roms", lambda *args: None)
+    borrados = []
+    monkeypatch.setattr(modulo_game._INDICE, "eliminar", borrados.extend)
+    juegos_fallo = Game.escanear_juegos(ruta_games, str(tmp_path / "cores"))
+    assert juegos_fallo == juegos
+    assert "Zelda.nds" in Game._cache and not borrados
+    modulo_game._INDICE.cerrar()
+    modulo_game._INDICE = None
@@ -0,0 +1,48 @@
+import ctypes
+
+from libretro.rewind import RewindBuffer
+
+
+# Core falso: su "estado" es un contador repetido en un buffer de 'tam' bytes
+class _CoreFalso:
+    def __init__(self, tam):
+        self.tam = tam
+        self.valor = 0
+
+    def state_size(self):
+        return self.tam
+
+    def save_state_into(self, buf, size):
+        ctypes.memmove(buf, bytes([self.valor % 256]) * size, size)
+        return True
+
+    def load_state_from(self, buf, size):
+        self.valor = buf.raw[0]
+        return True
+
+
+def _emular(rewind, core, frames):
+    for _ in range(frames):
+        core.valor += 1
+        rewind.frame_emulado(core)
+
+
+def test_rebobina_al_estado_anterior():
+    core = _CoreFalso(4096)
+    rewind = RewindBuffer(presupuesto_mb=1, intervalo=1)
+    _emular(rewind, core, 5)
+    assert len(rewind) == 4
+    rewind.retroceder(core)
+    assert core.valor == 4
+    assert rewind.memoria_bytes <= rewind.presupuesto_bytes
+
+
+# Con un estado que llena el presupuesto solo con los buffers en crudo, el
+# rebobinado se desactiva en vez de descartar cada delta al guardarlo
+def test_estado_demasiado_grande_desactiva(capsys):
+    core = _CoreFalso(512 * 1024)
+    rewind = RewindBuffer(presupuesto_mb=1, intervalo=1)
+    _emular(rewind, core, 5)
+    assert len(rewind) == 0
+    assert rewind.memoria_bytes == 0
+    assert "Rebobinado desactivado" in capsys.readouterr().out
@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from api import screenscraper
+from api.screenscraper import (
+    CACHE_DIR_NAME, cargar_info_cache, guardar_info_cache, migrar_almacen, obtener_ruta_portada,
+    obtener_rutas_galeria, preparar_almacen, usar_almacen_unificado,
+)
+from api.scraper_store import STORE_DIR_NAME
+
+
+# Caché en el formato de carpetas: "Mario.Kart" con manifiesto y galería,
+# "Zelda" con una portada de antes de medias.json (sin entrada en él)
+@pytest.fixture
+def ruta_games(tmp_path):
+    cache = tmp_path / CACHE_DIR_NAME
+    mario = cache / "Mario.Kart"
+    mario.mkdir(parents=True)
+    (mario / "info.json").write_text(json.dumps({"titulo": "Mario Kart DS"}), encoding="utf-8")
+    (mario / "cover.png").write_bytes(b"portada")
+    (mario / "ss_wor.png").write_bytes(b"captura")
+    (mario / "medias.json").write_text(json.dumps({
+        "cover.png": {"url": "http://x/cover", "etag": "e1", "tamano": 7},
+        "ss_wor.png": {"url": "http://x/ss", "etag": None, "tamano": 7},
+    }), encoding="utf-8")
+    zelda = cache / "Zelda"
+    zelda.mkdir()
+    (zelda / "info.json").write_text(json.dumps({"titulo": "Zelda"}), encoding="utf-8")
+    (zelda / "cover.jpg").write_bytes(b"jpg")
+    (cache / ".hashes").mkdir()
+    yield str(tmp_path)
+    usar_almacen_unificado(False)
+
+
+def _leer(ruta):
+    with open(ruta, "rb") as archivo:
+        return archivo.read()
+
+
+def test_migra_a_un_archivo_y_vuelve_a_carpetas(ruta_games):
+    cache = os.path.join(ruta_games, CACHE_DIR_NAME)
+
+    # Mientras no se migra se sigue leyendo de las carpetas
+    assert preparar_almacen(ruta_games, True)
+    assert cargar_info_cache(ruta_games, "Mario.Kart.nds") == {"titulo": "Mario Kart DS"}
+
+    avances = []
+    carpetas = migrar_almacen(ruta_games, True, lambda hechos, total: avances.append((hechos, total)))
+    assert avances == [(1, 2), (2, 2)]
+    portada = obtener_ruta_portada(ruta_games, "Mario.Kart.nds")
+    assert STORE_DIR_NAME in portada and _leer(portada) == b"portada"
+    assert len(obtener_rutas_galeria(ruta_games, "Mario.Kart.nds")) == 1
+    assert _leer(obtener_ruta_portada(ruta_games, "Zelda.nds")) == b"jpg"
+
+    # Las carpetas siguen ahí hasta que se borran a propósito
+    assert os.path.isdir(os.path.join(cache, "Mario.Kart"))
+    carpetas.borrar()
+    assert sorted(os.listdir(cache)) == [".hashes", STORE_DIR_NAME]
+
+    # Al volver a carpetas se exporta todo de nuevo
+    usar_almacen_unificado(False)
+    assert preparar_almacen(ruta_games, False)
+    migrar_almacen(ruta_games, False).borrar()
+    assert not os.path.exists(os.path.join(cache, STORE_DIR_NAME))
+    assert _leer(os.path.join(cache, "Mario.Kart", "cover.png")) == b"portada"
+    assert _leer(os.path.join(cache, "Zelda", "cover.jpg")) == b"jpg"
+    with open(os.path.join(cache, "Mario.Kart", "medias.json"), encoding="utf-8") as archivo:
+        assert json.load(archivo)["cover.png"]["etag"] == "e1"
+    assert cargar_info_cache(ruta_games, "Zelda.nds") == {"titulo": "Zelda"}
+    assert not preparar_almacen(ruta_games, False)
+
+
+# Lo que el scraper escribe en el formato de origen mientras se copia no se pierde
+def test_escrituras_durante_la_migracion(ruta_games):
+    preparar_almacen(ruta_games, True)
+
+    def al_avanzar(hechos, total):
+        if hechos == total:
+            guardar_info_cache(ruta_games, "Mario.Kart.nds", {"titulo": "Mario Kart DS (EU)"})
+
+    migrar_almacen(ruta_games, True, al_avanzar)
+    assert screenscraper._almacen_unificado
+    assert cargar_info_cache(ruta_games, "Mario.Kart.nds") == {"titulo": "Mario Kart DS (EU)"}
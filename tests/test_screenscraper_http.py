@@ -0,0 +1,140 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api.screenscraper import ScreenScraperAPI
+
+
+# Stand-in local de la API de ScreenScraper. Cada test fija en el servidor
+# qué responder ('status', 'cuerpo') y si cerrar la conexión tras responder
+# sin avisar al cliente ('cerrar_sin_avisar', como un keep-alive caducado).
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.conexiones += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        servidor = self.server
+        with servidor.lock:
+            servidor.peticiones.append(self.path)
+        cuerpo = json.dumps(servidor.cuerpo).encode("utf-8")
+        self.send_response(servidor.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+        if servidor.cerrar_sin_avisar:
+            self.close_connection = True
+
+
+def _respuesta(ssuser=None):
+    respuesta = {"jeux": [{"id": "1", "noms": [{"region": "wor", "text": "Juego"}]}]}
+    if ssuser:
+        respuesta["ssuser"] = ssuser
+    return {"response": respuesta}
+
+
+@pytest.fixture
+def servidor():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+    srv.daemon_threads = True
+    srv.lock = threading.Lock()
+    srv.conexiones = 0
+    srv.peticiones = []
+    srv.status = 200
+    srv.cuerpo = _respuesta()
+    srv.cerrar_sin_avisar = False
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def api(servidor):
+    api = ScreenScraperAPI("dev", "pass", base_url=f"http://127.0.0.1:{servidor.server_port}/api2")
+    # Sin esperas del limitador entre peticiones (la cuota por defecto es 1/s)
+    api.limitador.ajustar(hilos_max=4, por_minuto=60000)
+    yield api
+    api._http.cerrar()
+
+
+def test_reutiliza_la_conexion_keep_alive(servidor, api):
+    for _ in range(3):
+        assert api.buscar_por_nombre("Juego", ".nds")["titulo"] == "Juego"
+    assert len(servidor.peticiones) == 3
+    assert servidor.conexiones == 1
+
+
+# El servidor cierra cada conexión tras responder: la siguiente petición
+# falla en la conexión reutilizada y se repite una vez con una nueva
+def test_reintenta_una_vez_con_conexion_caducada(servidor, api):
+    servidor.cerrar_sin_avisar = True
+    assert api.buscar_por_nombre("Juego", ".nds") is not None
+    assert api.buscar_por_nombre("Juego", ".nds") is not None
+    assert len(servidor.peticiones) == 2
+    assert servidor.conexiones == 2
+
+
+def test_aplica_la_cuota_de_ssuser(servidor, api, monkeypatch):
+    llamadas = []
+    ajustar = api.limitador.ajustar
+    monkeypatch.setattr(api.limitador, "ajustar",
+                        lambda *a, **k: (llamadas.append(a), ajustar(*a, **k)))
+    servidor.cuerpo = _respuesta({"maxthreads": "3", "maxrequestspermin": "120"})
+
+    api.buscar_por_nombre("Juego", ".nds")
+
+    assert llamadas == [(3, 120)]
+    assert api.limitador.hilos_max == 3
+
+
+@pytest.mark.parametrize("status", [429, 430])
+def test_pausa_el_limitador_al_superar_la_cuota(servidor, api, monkeypatch, status):
+    pausas = []
+    monkeypatch.setattr(api.limitador, "pausar", pausas.append)
+    servidor.status = status
+
+    assert api.buscar_por_nombre("Juego", ".nds") is None
+    assert len(pausas) == 1 and pausas[0] > 0
+
+
+# Las medias son llamadas a la API (mediaJeu.php): respetan los hilos de la
+# cuenta aunque el pool de descargas tenga más
+def test_las_medias_pasan_por_el_limitador(servidor, api, tmp_path, monkeypatch):
+    api.limitador.ajustar(hilos_max=1)
+    lock = threading.Lock()
+    en_curso = maximo = 0
+    adquirir, liberar = api.limitador.adquirir, api.limitador.liberar
+
+    def adquirir_espia():
+        nonlocal en_curso, maximo
+        adquirir()
+        with lock:
+            en_curso += 1
+            maximo = max(maximo, en_curso)
+
+    def liberar_espia():
+        nonlocal en_curso
+        with lock:
+            en_curso -= 1
+        liberar()
+
+    monkeypatch.setattr(api.limitador, "adquirir", adquirir_espia)
+    monkeypatch.setattr(api.limitador, "liberar", liberar_espia)
+    servidor.cuerpo = {"imagen": "x" * 200}
+    url = f"http://127.0.0.1:{servidor.server_port}/api2/mediaJeu.php"
+    trabajos = [(f"ss_{i}.png", f"{url}?media={i}") for i in range(4)]
+
+    assert api.descargar_medias(str(tmp_path), "Juego.nds", trabajos) == {n for n, _ in trabajos}
+    assert len(servidor.peticiones) == 4
+    assert maximo == 1
@@ -0,0 +1,200 @@
+/*
+ * stub_core.c - Core libretro mínimo para probar la capa de callbacks de
+ * RetroCore sin emulador real (ver libretro/benchmark.py).
+ *
+ * No emula nada: en cada retro_run() ejercita los mismos callbacks que un
+ * core de DS con render por software:
+ *   - environment: GET_VARIABLE_UPDATE y GET_VARIABLE
+ *   - input_poll + input_state (16 botones del joypad y el puntero)
+ *   - audio_sample_batch con 1 frame de audio a 32768 Hz / 60 fps
+ *   - video_refresh con un framebuffer RGB565 de 256x384 (dos pantallas)
+ * y modifica 64 KiB de "RAM" para que los savestates cambien entre frames.
+ *
+ * Compilar:
+ *   Linux:   gcc -O2 -shared -fPIC -o stub_core.so stub_core.c
+ *   Windows: gcc -O2 -shared -o stub_core.dll stub_core.c
+ */
+#include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+#include <string.h>
+
+#if defined(_WIN32)
+#define RETRO_API __declspec(dllexport)
+#else
+#define RETRO_API __attribute__((visibility("default")))
+#endif
+
+/* ── Subconjunto de libretro.h ─────────────────────────────────────── */
+
+#define RETRO_API_VERSION 1
+#define RETRO_DEVICE_JOYPAD 1
+#define RETRO_DEVICE_POINTER 6
+#define RETRO_DEVICE_ID_POINTER_X 0
+#define RETRO_DEVICE_ID_POINTER_Y 1
+#define RETRO_ENVIRONMENT_SET_PIXEL_FORMAT 10
+#define RETRO_ENVIRONMENT_GET_VARIABLE 15
+#define RETRO_ENVIRONMENT_GET_VARIABLE_UPDATE 17
+#define RETRO_PIXEL_FORMAT_RGB565 2
+
+struct retro_game_info { const char *path; const void *data; size_t size; const char *meta; };
+struct retro_system_info {
+    const char *library_name; const char *library_version;
+    const char *valid_extensions; bool need_fullpath; bool block_extract;
+};
+struct retro_game_geometry {
+    unsigned base_width, base_height, max_width, max_height; float aspect_ratio;
+};
+struct retro_system_timing { double fps; double sample_rate; };
+struct retro_system_av_info { struct retro_game_geometry geometry; struct retro_system_timing timing; };
+struct retro_variable { const char *key; const char *value; };
+
+typedef bool (*retro_environment_t)(unsigned cmd, void *data);
+typedef void (*retro_video_refresh_t)(const void *data, unsigned width, unsigned height, size_t pitch);
+typedef void (*retro_audio_sample_t)(int16_t left, int16_t right);
+typedef size_t (*retro_audio_sample_batch_t)(const int16_t *data, size_t frames);
+typedef void (*retro_input_poll_t)(void);
+typedef int16_t (*retro_input_state_t)(unsigned port, unsigned device, unsigned index, unsigned id);
+
+/* ── Estado del core ───────────────────────────────────────────────── */
+
+#define WIDTH 256
+#define HEIGHT 384
+#define SAMPLE_RATE 32768.0
+#define FPS 60.0
+#define AUDIO_FRAMES 546          /* 32768 / 60 */
+#define RAM_SIZE (64 * 1024)
+
+static retro_environment_t environ_cb;
+static retro_video_refresh_t video_cb;
+static retro_audio_sample_batch_t audio_batch_cb;
+static retro_input_poll_t input_poll_cb;
+static retro_input_state_t input_state_cb;
+
+static uint16_t framebuffer[WIDTH * HEIGHT];
+static int16_t audio[AUDIO_FRAMES * 2];
+static uint8_t ram[RAM_SIZE];
+static uint32_t frame_count;
+static uint32_t rom_checksum;
+static uint32_t input_mix;
+
+RETRO_API void retro_set_environment(retro_environment_t cb) { environ_cb = cb; }
+RETRO_API void retro_set_video_refresh(retro_video_refresh_t cb) { video_cb = cb; }
+RETRO_API void retro_set_audio_sample(retro_audio_sample_t cb) { (void)cb; }
+RETRO_API void retro_set_audio_sample_batch(retro_audio_sample_batch_t cb) { audio_batch_cb = cb; }
+RETRO_API void retro_set_input_poll(retro_input_poll_t cb) { input_poll_cb = cb; }
+RETRO_API void retro_set_input_state(retro_input_state_t cb) { input_state_cb = cb; }
+
+RETRO_API unsigned retro_api_version(void) { return RETRO_API_VERSION; }
+
+RETRO_API void retro_init(void)
+{
+    frame_count = 0;
+    memset(ram, 0, sizeof(ram));
+}
+
+RETRO_API void retro_deinit(void) {}
+
+RETRO_API void retro_get_system_info(struct retro_system_info *info)
+{
+    memset(info, 0, sizeof(*info));
+    info->library_name = "Stub";
+    info->library_version = "1.0";
+    info->valid_extensions = "nds|bin";
+    info->need_fullpath = false;
+}
+
+RETRO_API void retro_get_system_av_info(struct retro_system_av_info *info)
+{
+    info->geometry.base_width = WIDTH;
+    info->geometry.base_height = HEIGHT;
+    info->geometry.max_width = WIDTH;
+    info->geometry.max_height = HEIGHT;
+    info->geometry.aspect_ratio = (float)WIDTH / HEIGHT;
+    info->timing.fps = FPS;
+    info->timing.sample_rate = SAMPLE_RATE;
+}
+
+RETRO_API void retro_set_controller_port_device(unsigned port, unsigned device) { (void)port; (void)device; }
+RETRO_API void retro_reset(void) { frame_count = 0; }
+
+RETRO_API bool retro_load_game(const struct retro_game_info *game)
+{
+    unsigned fmt = RETRO_PIXEL_FORMAT_RGB565;
+    size_t i;
+    if (!environ_cb(RETRO_ENVIRONMENT_SET_PIXEL_FORMAT, &fmt))
+        return false;
+    rom_checksum = 0;
+    if (game && game->data)
+        for (i = 0; i < game->size; i++)
+            rom_checksum = rom_checksum * 31 + ((const uint8_t *)game->data)[i];
+    return true;
+}
+
+RETRO_API bool retro_load_game_special(unsigned type, const struct retro_game_info *info, size_t num)
+{
+    (void)type; (void)info; (void)num;
+    return false;
+}
+
+RETRO_API void retro_unload_game(void) {}
+
+RETRO_API void retro_run(void)
+{
+    bool updated = false;
+    struct retro_variable var = { "stub_option", NULL };
+    unsigned id, i;
+
+    environ_cb(RETRO_ENVIRONMENT_GET_VARIABLE_UPDATE, &updated);
+    if (updated)
+        environ_cb(RETRO_ENVIRONMENT_GET_VARIABLE, &var);
+
+    input_poll_cb();
+    for (id = 0; id < 16; id++)
+        input_mix += (uint32_t)input_state_cb(0, RETRO_DEVICE_JOYPAD, 0, id) << id;
+    input_mix += (uint32_t)input_state_cb(0, RETRO_DEVICE_POINTER, 0, RETRO_DEVICE_ID_POINTER_X);
+    input_mix += (uint32_t)input_state_cb(0, RETRO_DEVICE_POINTER, 0, RETRO_DEVICE_ID_POINTER_Y);
+
+    /* Onda cuadrada a ~440 Hz */
+    for (i = 0; i < AUDIO_FRAMES; i++) {
+        int16_t s = (((frame_count * AUDIO_FRAMES + i) / 37) & 1) ? 4000 : -4000;
+        audio[i * 2] = s;
+        audio[i * 2 + 1] = s;
+    }
+    audio_batch_cb(audio, AUDIO_FRAMES);
+
+    /* Una franja de RAM cambia cada frame (como la de un juego real) */
+    for (i = 0; i < 256; i++)
+        ram[(frame_count * 256 + i) % RAM_SIZE] ^= (uint8_t)(frame_count + i + input_mix);
+
+    framebuffer[(frame_count * 7) % (WIDTH * HEIGHT)] = (uint16_t)frame_count;
+    video_cb(framebuffer, WIDTH, HEIGHT, WIDTH * sizeof(uint16_t));
+
+    frame_count++;
+}
+
+RETRO_API size_t retro_serialize_size(void) { return sizeof(frame_count) + sizeof(ram); }
+
+RETRO_API bool retro_serialize(void *data, size_t size)
+{
+    if (size < retro_serialize_size())
+        return false;
+    memcpy(data, &frame_count, sizeof(frame_count));
+    memcpy((uint8_t *)data + sizeof(frame_count), ram, sizeof(ram));
+    return true;
+}
+
+RETRO_API bool retro_unserialize(const void *data, size_t size)
+{
+    if (size < retro_serialize_size())
+        return false;
+    memcpy(&frame_count, data, sizeof(frame_count));
+    memcpy(ram, (const uint8_t *)data + sizeof(frame_count), sizeof(ram));
+    return true;
+}
+
+RETRO_API void retro_cheat_reset(void) {}
+RETRO_API void retro_cheat_set(unsigned index, bool enabled, const char *code) { (void)index; (void)enabled; (void)code; }
+RETRO_API unsigned retro_get_region(void) { return 0; }
+RETRO_API void *retro_get_memory_data(unsigned id) { (void)id; return NULL; }
+RETRO_API size_t retro_get_memory_size(unsigned id) { (void)id; return 0; }
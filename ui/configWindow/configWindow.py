@@ -13,6 +13,19 @@ _CITRA_RES_VALUES = [
     "6x", "7x", "8x", "9x", "10x",
 ]
 
+# Profundidad del buffer de audio (ms) para cada opción del combo de latencia
+_AUDIO_LATENCY_VALUES = [32, 48, 64, 96, 128]
+_AUDIO_LATENCY_DEFAULT_INDEX = 2  # 64 ms
+
+# Rebobinado: memoria máxima del anillo (MB) y frames entre capturas
+_REWIND_MEMORY_VALUES = [64, 128, 256, 512]
+_REWIND_MEMORY_DEFAULT_INDEX = 1  # 128 MB
+_REWIND_INTERVAL_VALUES = [1, 2, 5, 10, 30]
+_REWIND_INTERVAL_DEFAULT_INDEX = 3  # cada 10 frames
+
+# Hilos del extractor de iconos (0 = automático, ver IconExtractor)
+_ICON_WORKERS_VALUES = [0, 1, 2, 4, 8]
+
 # Valores que el core melonDS acepta para "melonds_render_mode"
 _DS_RENDERER_VALUES = ["software", "opengl"]
 
@@ -27,6 +40,7 @@ class ConfigWindow(QWidget):
 
     volumen_cambiado = pyqtSignal(int)
     resolucion_cambiada = pyqtSignal()  # cualquier cambio gráfico
+    galeria_diferida_cambiada = pyqtSignal(bool)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -35,9 +49,17 @@ class ConfigWindow(QWidget):
         self.ui = None
         self._config_path = None
         self._volume = 100
+        self._audio_latency_index = _AUDIO_LATENCY_DEFAULT_INDEX
         self._ds_renderer_index = 0    # 0=software, 1=opengl
         self._ds_resolution_index = 0  # 0..7 → 1x..8x
         self._citra_resolution_index = 0  # 0..9 → 1x..10x
+        self._emulation_thread = False    # retro_run en un hilo propio (ver EmulationThread)
+        self._rewind = False              # rebobinado activado (ver RewindBuffer)
+        self._rewind_memory_index = _REWIND_MEMORY_DEFAULT_INDEX
+        self._rewind_interval_index = _REWIND_INTERVAL_DEFAULT_INDEX
+        self._icon_workers_index = 0
+        self._galeria_diferida = True     # galería bajo demanda (ver GameDetailPage)
+        self._cache_unificada = False     # caché de ScreenScraper en SQLite (api/scraper_store.py)
 
         # --- Configuración de la UI ---
         self.ui = ConfigWindowUI()
@@ -45,9 +67,17 @@ class ConfigWindow(QWidget):
 
         # Conectar señales
         self.ui.volumeSlider.valueChanged.connect(self._on_volume_changed)
+        self.ui.audioLatencyCombo.currentIndexChanged.connect(self._on_audio_latency_changed)
         self.ui.dsRendererCombo.currentIndexChanged.connect(self._on_ds_renderer_changed)
         self.ui.dsResolutionCombo.currentIndexChanged.connect(self._on_ds_resolution_changed)
         self.ui.citraResolutionCombo.currentIndexChanged.connect(self._on_citra_resolution_changed)
+        self.ui.emulationThreadCheck.toggled.connect(self._on_emulation_thread_changed)
+        self.ui.rewindCheck.toggled.connect(self._on_rewind_changed)
+        self.ui.rewindMemoryCombo.currentIndexChanged.connect(self._on_rewind_memory_changed)
+        self.ui.rewindIntervalCombo.currentIndexChanged.connect(self._on_rewind_interval_changed)
+        self.ui.iconWorkersCombo.currentIndexChanged.connect(self._on_icon_workers_changed)
+        self.ui.lazyGalleryCheck.toggled.connect(self._on_galeria_diferida_changed)
+        self.ui.unifiedCacheCheck.toggled.connect(self._on_cache_unificada_changed)
 
         # Mostrar/ocultar resolución DS según renderizador
         self._actualizar_visibilidad_ds_res()
@@ -61,9 +91,17 @@ class ConfigWindow(QWidget):
         # Aplicar valores cargados a los widgets
         self.ui.volumeSlider.setValue(self._volume)
         self.ui.volumeValueLabel.setText(f"{self._volume}%")
+        self.ui.audioLatencyCombo.setCurrentIndex(self._audio_latency_index)
         self.ui.dsRendererCombo.setCurrentIndex(self._ds_renderer_index)
         self.ui.dsResolutionCombo.setCurrentIndex(self._ds_resolution_index)
         self.ui.citraResolutionCombo.setCurrentIndex(self._citra_resolution_index)
+        self.ui.emulationThreadCheck.setChecked(self._emulation_thread)
+        self.ui.rewindCheck.setChecked(self._rewind)
+        self.ui.rewindMemoryCombo.setCurrentIndex(self._rewind_memory_index)
+        self.ui.rewindIntervalCombo.setCurrentIndex(self._rewind_interval_index)
+        self.ui.iconWorkersCombo.setCurrentIndex(self._icon_workers_index)
+        self.ui.lazyGalleryCheck.setChecked(self._galeria_diferida)
+        self.ui.unifiedCacheCheck.setChecked(self._cache_unificada)
         self._actualizar_visibilidad_ds_res()
 
     # ── Propiedades ──
@@ -72,6 +110,11 @@ class ConfigWindow(QWidget):
     def volume(self):
         return self._volume
 
+    # Profundidad del buffer de audio en milisegundos
+    @property
+    def audio_latency_ms(self):
+        return _AUDIO_LATENCY_VALUES[self._audio_latency_index]
+
     # Devuelve 'software' u 'opengl' según la selección actual
     @property
     def ds_renderer_value(self):
@@ -87,6 +130,36 @@ class ConfigWindow(QWidget):
     def citra_resolution_value(self):
         return _CITRA_RES_VALUES[self._citra_resolution_index]
 
+    # True si los juegos deben ejecutarse en un hilo de emulación dedicado
+    @property
+    def emulation_thread(self):
+        return self._emulation_thread
+
+    # (memoria máxima en MB, frames entre capturas) del rebobinado, o None si está desactivado
+    @property
+    def rewind_config(self):
+        if not self._rewind:
+            return None
+        return (_REWIND_MEMORY_VALUES[self._rewind_memory_index],
+                _REWIND_INTERVAL_VALUES[self._rewind_interval_index])
+
+    # Hilos para extraer iconos de ROMs (0 = automático)
+    @property
+    def icon_workers(self):
+        return _ICON_WORKERS_VALUES[self._icon_workers_index]
+
+    # True = al scrapear solo se descarga la portada; la galería se baja al
+    # abrir el detalle del juego
+    @property
+    def galeria_diferida(self):
+        return self._galeria_diferida
+
+    # True = caché de ScreenScraper en un solo archivo SQLite. Solo se lee
+    # al arrancar: cambiarlo no toma efecto hasta reiniciar.
+    @property
+    def cache_unificada(self):
+        return self._cache_unificada
+
     # ── Slots ──
     # Los slots son métodos que Qt conecta a señales (patrón Observer).
     # Cada vez que el usuario modifica un widget, el slot correspondiente
@@ -99,6 +172,13 @@ class ConfigWindow(QWidget):
         self.volumen_cambiado.emit(value)
         self._guardar_config()
 
+    # No emite señal: el buffer de audio se dimensiona al lanzar el siguiente juego
+    def _on_audio_latency_changed(self, index):
+        if index < 0:
+            return
+        self._audio_latency_index = index
+        self._guardar_config()
+
     def _on_ds_renderer_changed(self, index):
         if index < 0:
             return
@@ -121,6 +201,44 @@ class ConfigWindow(QWidget):
         self.resolucion_cambiada.emit()
         self._guardar_config()
 
+    # No emite señal: el modo de ejecución se aplica al lanzar el siguiente juego
+    def _on_emulation_thread_changed(self, checked):
+        self._emulation_thread = bool(checked)
+        self._guardar_config()
+
+    # Los ajustes de rebobinado tampoco emiten señal: se aplican al lanzar el siguiente juego
+    def _on_rewind_changed(self, checked):
+        self._rewind = bool(checked)
+        self._guardar_config()
+
+    def _on_rewind_memory_changed(self, index):
+        if index < 0:
+            return
+        self._rewind_memory_index = index
+        self._guardar_config()
+
+    def _on_rewind_interval_changed(self, index):
+        if index < 0:
+            return
+        self._rewind_interval_index = index
+        self._guardar_config()
+
+    # Se aplica en el siguiente escaneo de la biblioteca
+    def _on_icon_workers_changed(self, index):
+        if index < 0:
+            return
+        self._icon_workers_index = index
+        self._guardar_config()
+
+    def _on_galeria_diferida_changed(self, checked):
+        self._galeria_diferida = bool(checked)
+        self._guardar_config()
+        self.galeria_diferida_cambiada.emit(self._galeria_diferida)
+
+    def _on_cache_unificada_changed(self, checked):
+        self._cache_unificada = bool(checked)
+        self._guardar_config()
+
     # Muestra la resolución DS solo si el renderizador es OpenGL.
     # En modo software, melonDS no soporta resolución superior a 1x.
     def _actualizar_visibilidad_ds_res(self):
@@ -137,12 +255,27 @@ class ConfigWindow(QWidget):
                 with open(self._config_path, "r", encoding="utf-8") as f:
                     cfg = json.load(f)
                 self._volume = cfg.get("volume", 100)
+                self._audio_latency_index = max(0, min(
+                    cfg.get("audio_latency_index", _AUDIO_LATENCY_DEFAULT_INDEX),
+                    len(_AUDIO_LATENCY_VALUES) - 1))
                 self._ds_renderer_index = max(0, min(
                     cfg.get("ds_renderer_index", 0), len(_DS_RENDERER_VALUES) - 1))
                 self._ds_resolution_index = max(0, min(
                     cfg.get("ds_resolution_index", 0), len(_DS_RES_VALUES) - 1))
                 self._citra_resolution_index = max(0, min(
                     cfg.get("citra_resolution_index", 0), len(_CITRA_RES_VALUES) - 1))
+                self._emulation_thread = bool(cfg.get("emulation_thread", False))
+                self._rewind = bool(cfg.get("rewind", False))
+                self._rewind_memory_index = max(0, min(
+                    cfg.get("rewind_memory_index", _REWIND_MEMORY_DEFAULT_INDEX),
+                    len(_REWIND_MEMORY_VALUES) - 1))
+                self._rewind_interval_index = max(0, min(
+                    cfg.get("rewind_interval_index", _REWIND_INTERVAL_DEFAULT_INDEX),
+                    len(_REWIND_INTERVAL_VALUES) - 1))
+                self._icon_workers_index = max(0, min(
+                    cfg.get("icon_workers_index", 0), len(_ICON_WORKERS_VALUES) - 1))
+                self._galeria_diferida = bool(cfg.get("galeria_diferida", True))
+                self._cache_unificada = bool(cfg.get("cache_unificada", False))
             except Exception:
                 pass
 
@@ -157,9 +290,17 @@ class ConfigWindow(QWidget):
                     with open(self._config_path, "r", encoding="utf-8") as f:
                         cfg = json.load(f)
                 cfg["volume"] = self._volume
+                cfg["audio_latency_index"] = self._audio_latency_index
                 cfg["ds_renderer_index"] = self._ds_renderer_index
                 cfg["ds_resolution_index"] = self._ds_resolution_index
                 cfg["citra_resolution_index"] = self._citra_resolution_index
+                cfg["emulation_thread"] = self._emulation_thread
+                cfg["rewind"] = self._rewind
+                cfg["rewind_memory_index"] = self._rewind_memory_index
+                cfg["rewind_interval_index"] = self._rewind_interval_index
+                cfg["icon_workers_index"] = self._icon_workers_index
+                cfg["galeria_diferida"] = self._galeria_diferida
+                cfg["cache_unificada"] = self._cache_unificada
                 with open(self._config_path, "w", encoding="utf-8") as f:
                     json.dump(cfg, f, indent=2)
             except Exception:
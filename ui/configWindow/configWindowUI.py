@@ -1,7 +1,7 @@
 # ── Imports ──────────────────────────────────────────────────────
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QSlider, QComboBox
+    QLabel, QSlider, QComboBox, QCheckBox
 )
 from PyQt6.QtCore import Qt
 
@@ -14,10 +14,18 @@ class ConfigWindowUI:
         # --- Declaración de todas las variables de instancia ---
         self.volumeSlider = None
         self.volumeValueLabel = None
+        self.audioLatencyCombo = None
         self.dsRendererCombo = None
         self.dsResolutionCombo = None
         self.dsResolutionRow = None
         self.citraResolutionCombo = None
+        self.emulationThreadCheck = None
+        self.rewindCheck = None
+        self.rewindMemoryCombo = None
+        self.rewindIntervalCombo = None
+        self.iconWorkersCombo = None
+        self.lazyGalleryCheck = None
+        self.unifiedCacheCheck = None
 
     # Construye todos los widgets y los organiza en el layout.
     # parent: el QWidget que contiene esta UI (ConfigWindow).
@@ -59,6 +67,19 @@ class ConfigWindowUI:
 
         configLayout.addLayout(volumeRow)
 
+        # Latencia de audio (profundidad del buffer; se aplica al lanzar el siguiente juego)
+        latencyRow = QHBoxLayout()
+        latencyRow.setSpacing(15)
+        latencyLabel = QLabel("Latencia")
+        latencyLabel.setObjectName("configLabel")
+        latencyRow.addWidget(latencyLabel)
+
+        self.audioLatencyCombo = QComboBox()
+        self.audioLatencyCombo.setObjectName("configCombo")
+        self.audioLatencyCombo.addItems(["32 ms", "48 ms", "64 ms", "96 ms", "128 ms"])
+        latencyRow.addWidget(self.audioLatencyCombo, 1)
+        configLayout.addLayout(latencyRow)
+
         # ── Sección Gráficos – DS (melonDS) ──
         tituloDS = QLabel("Gráficos – DS")
         tituloDS.setObjectName("configSectionTitle")
@@ -115,4 +136,82 @@ class ConfigWindowUI:
         citraResRow.addWidget(self.citraResolutionCombo, 1)
         configLayout.addLayout(citraResRow)
 
+        # ── Sección Rendimiento ──
+        tituloRend = QLabel("Rendimiento")
+        tituloRend.setObjectName("configSectionTitle")
+        configLayout.addWidget(tituloRend)
+
+        # Hilo de emulación dedicado (se aplica al lanzar el siguiente juego)
+        self.emulationThreadCheck = QCheckBox("Hilo de emulación dedicado (experimental)")
+        self.emulationThreadCheck.setObjectName("configCheckBox")
+        configLayout.addWidget(self.emulationThreadCheck)
+
+        # ── Sección Rebobinado ──
+        tituloRewind = QLabel("Rebobinado")
+        tituloRewind.setObjectName("configSectionTitle")
+        configLayout.addWidget(tituloRewind)
+
+        # Se aplica al lanzar el siguiente juego; se rebobina manteniendo Retroceso
+        self.rewindCheck = QCheckBox("Activar rebobinado (mantener Retroceso)")
+        self.rewindCheck.setObjectName("configCheckBox")
+        configLayout.addWidget(self.rewindCheck)
+
+        # Memoria máxima del anillo de savestates
+        rewindMemoryRow = QHBoxLayout()
+        rewindMemoryRow.setSpacing(15)
+        rewindMemoryLabel = QLabel("Memoria máxima")
+        rewindMemoryLabel.setObjectName("configLabel")
+        rewindMemoryRow.addWidget(rewindMemoryLabel)
+
+        self.rewindMemoryCombo = QComboBox()
+        self.rewindMemoryCombo.setObjectName("configCombo")
+        self.rewindMemoryCombo.addItems(["64 MB", "128 MB", "256 MB", "512 MB"])
+        rewindMemoryRow.addWidget(self.rewindMemoryCombo, 1)
+        configLayout.addLayout(rewindMemoryRow)
+
+        # Cada cuántos frames se guarda un estado
+        rewindIntervalRow = QHBoxLayout()
+        rewindIntervalRow.setSpacing(15)
+        rewindIntervalLabel = QLabel("Intervalo")
+        rewindIntervalLabel.setObjectName("configLabel")
+        rewindIntervalRow.addWidget(rewindIntervalLabel)
+
+        self.rewindIntervalCombo = QComboBox()
+        self.rewindIntervalCombo.setObjectName("configCombo")
+        self.rewindIntervalCombo.addItems([
+            "Cada frame", "Cada 2 frames", "Cada 5 frames", "Cada 10 frames", "Cada 30 frames",
+        ])
+        rewindIntervalRow.addWidget(self.rewindIntervalCombo, 1)
+        configLayout.addLayout(rewindIntervalRow)
+
+        # ── Sección Biblioteca ──
+        tituloBiblioteca = QLabel("Biblioteca")
+        tituloBiblioteca.setObjectName("configSectionTitle")
+        configLayout.addWidget(tituloBiblioteca)
+
+        # Hilos que extraen los iconos de las ROMs nuevas (se aplica en el siguiente escaneo)
+        iconWorkersRow = QHBoxLayout()
+        iconWorkersRow.setSpacing(15)
+        iconWorkersLabel = QLabel("Hilos para extraer iconos")
+        iconWorkersLabel.setObjectName("configLabel")
+        iconWorkersRow.addWidget(iconWorkersLabel)
+
+        self.iconWorkersCombo = QComboBox()
+        self.iconWorkersCombo.setObjectName("configCombo")
+        self.iconWorkersCombo.addItems(["Automático", "1", "2", "4", "8"])
+        iconWorkersRow.addWidget(self.iconWorkersCombo, 1)
+        configLayout.addLayout(iconWorkersRow)
+
+        # Al scrapear solo se guarda la info y la portada; la galería se
+        # descarga al abrir la página del juego
+        self.lazyGalleryCheck = QCheckBox("Descargar la galería solo al abrir cada juego")
+        self.lazyGalleryCheck.setObjectName("configCheckBox")
+        configLayout.addWidget(self.lazyGalleryCheck)
+
+        # Caché de ScreenScraper en un único archivo SQLite en lugar de una
+        # carpeta por juego. Se aplica (y migra la caché) al reiniciar.
+        self.unifiedCacheCheck = QCheckBox("Guardar la caché de ScreenScraper en un solo archivo (al reiniciar)")
+        self.unifiedCacheCheck.setObjectName("configCheckBox")
+        configLayout.addWidget(self.unifiedCacheCheck)
+
         configLayout.addStretch()
@@ -0,0 +1,154 @@
+# ── Imports ──────────────────────────────────────────────────────────
+import time
+import queue
+import threading
+from concurrent.futures import Future
+# QThread: hilo de Qt con su propio run(); las señales emitidas desde él
+# llegan al hilo de la GUI como conexiones en cola (QueuedConnection).
+from PyQt6.QtCore import QThread, pyqtSignal
+# QOpenGLContext + QOffscreenSurface: contexto GL propio del hilo, compartido
+# con el del widget para que la textura del FBO del core sea visible en ambos.
+from PyQt6.QtGui import QOpenGLContext, QOffscreenSurface
+from OpenGL.GL import glFinish
+from libretro.retro_core import RetroCore
+
+
+# Hilo dedicado de emulación: ejecuta retro_run fuera del bucle de eventos
+# de Qt, marcando el ritmo con los FPS que reporta el core (timing.fps).
+# Así el reflow del grid, los popups o las señales del scraper no pueden
+# retrasar un frame emulado.
+#
+# El core vive entero en este hilo (carga, frames y descarga) con un
+# contexto GL propio compartido con el del OpenGLWidget. El core renderiza
+# en su FBO sin blitear (defer_blit) y el widget presenta el último frame en
+# paintGL leyendo la textura compartida. frame_lock evita que el widget lea
+# la textura mientras retro_run la está escribiendo.
+class EmulationThread(QThread):
+
+    cargado = pyqtSignal(bool)   # emite True/False al terminar load_game
+    frame_listo = pyqtSignal()   # emite tras cada ciclo de emulación
+
+    def __init__(self, share_context, core_path, rom_path, audio_mgr, input_mgr,
+                 core_options=None, parent=None):
+        super().__init__(parent)
+        self.core = None                         # RetroCore creado dentro del hilo
+        self.frame_lock = threading.Lock()       # protege la textura del frame actual
+        self.frame_count = 0                     # frames emulados (para el contador de FPS)
+        self.extra_frames = 0                    # frames extra por ciclo en fast-forward
+        self._fast_forward = False
+        self._running = True
+        self._commands = queue.SimpleQueue()     # (fn, Future) a ejecutar entre frames
+        self._core_path = core_path
+        self._rom_path = rom_path
+        self._audio_mgr = audio_mgr
+        self._input_mgr = input_mgr
+        self._core_options = dict(core_options or {})
+        self._share_context = share_context
+
+        # QOffscreenSurface debe crearse en el hilo de la GUI (en algunas
+        # plataformas es una ventana oculta); el contexto se crea en run().
+        self._surface = QOffscreenSurface()
+        self._surface.setFormat(share_context.format())
+        self._surface.create()
+
+    # Activa/desactiva fast-forward: el hilo deja de esperar entre ciclos
+    # y ejecuta extra_frames frames sin presentar por cada frame visible.
+    def set_fast_forward(self, enabled):
+        self._fast_forward = bool(enabled)
+
+    # Encola fn(core) para ejecutarse en el hilo de emulación entre dos
+    # retro_run. Devuelve un Future con el resultado (p.ej. save_state).
+    def ejecutar_entre_frames(self, fn):
+        futuro = Future()
+        self._commands.put((fn, futuro))
+        return futuro
+
+    # Pide al hilo que termine; el core se descarga dentro de run().
+    def stop(self):
+        self._running = False
+
+    def run(self):
+        ctx = QOpenGLContext()
+        ctx.setFormat(self._share_context.format())
+        ctx.setShareContext(self._share_context)
+        if not ctx.create() or not ctx.makeCurrent(self._surface):
+            print("[EmuThread] No se pudo crear el contexto GL compartido")
+            self.cargado.emit(False)
+            return
+
+        ok = False
+        try:
+            self.core = RetroCore(self._core_path, self._audio_mgr, self._input_mgr)
+            for key, val in self._core_options.items():
+                self.core.set_option(key, val)
+            self.core.defer_blit = True
+            ok = self.core.load_game(self._rom_path)
+        except Exception as e:
+            print(f"[EmuThread] Error cargando el core: {e}")
+        self.cargado.emit(ok)
+
+        if ok:
+            self._bucle()
+
+        if self.core:
+            self.core.unload()
+        self._cancelar_comandos()
+        ctx.doneCurrent()
+
+    # Bucle principal: un ciclo por periodo de 1/fps. Si un ciclo se
+    # retrasa mucho (p.ej. compilación de shaders en Citra) se resincroniza
+    # en vez de encadenar frames a toda velocidad para recuperar.
+    def _bucle(self):
+        # El reloj de pared del hilo y el de la tarjeta de sonido derivan un
+        # poco; el control dinámico de tasa mantiene el buffer de audio centrado.
+        if self._audio_mgr:
+            self._audio_mgr.set_dynamic_rate_control(True)
+        siguiente = time.perf_counter()
+        while self._running:
+            self._ejecutar_comandos()
+
+            extra = self.extra_frames if self._fast_forward else 0
+            with self.frame_lock:
+                for _ in range(extra):
+                    self.core.skip_video_output = True
+                    try:
+                        self.core.run()
+                    finally:
+                        self.core.skip_video_output = False
+                self.core.run()
+                # Asegura que la textura está completa antes de soltar el lock
+                # y de que el contexto del widget la lea.
+                glFinish()
+            self.frame_count += 1 + extra
+            self.frame_listo.emit()
+
+            fps = self.core.fps if self.core.fps > 0 else 60.0
+            periodo = 1.0 / fps
+            siguiente += periodo
+            restante = siguiente - time.perf_counter()
+            if restante > 0:
+                time.sleep(restante)
+            elif restante < -4 * periodo:
+                siguiente = time.perf_counter()
+
+    def _ejecutar_comandos(self):
+        while True:
+            try:
+                fn, futuro = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                futuro.set_result(fn(self.core))
+            except Exception as e:
+                print(f"[EmuThread] Error ejecutando comando: {e}")
+                futuro.set_exception(e)
+
+    # Marca como cancelados los comandos que ya no llegarán a ejecutarse
+    # para que nadie se quede esperando su resultado.
+    def _cancelar_comandos(self):
+        while True:
+            try:
+                _, futuro = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            futuro.cancel()
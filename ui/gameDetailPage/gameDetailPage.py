@@ -1,105 +1,32 @@
 # ── Imports ──────────────────────────────────────────────────────
-import os
 from PyQt6.QtWidgets import QWidget, QMenu, QVBoxLayout
-# QThread: clase de Qt para ejecutar código en un hilo separado sin bloquear la UI
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import pyqtSignal
 
 from ui.gameDetailPage.gameDetailPageUI import GameDetailPageUI
 from api.screenscraper import (
-    ScreenScraperAPI, cargar_info_cache, guardar_info_cache,
-    obtener_cache_dir, obtener_ruta_portada, obtener_rutas_galeria,
+    cargar_info_cache, obtener_ruta_media, obtener_ruta_portada, obtener_rutas_galeria,
 )
-from game.game import extraer_titulo_rom, formatear_tiempo, formatear_ultima_vez
+from game.game import formatear_tiempo, formatear_ultima_vez
 from lista import Lista, SIN_LISTA
 
 
-# Hilo de trabajo (Worker) para llamar a la API de ScreenScraper sin bloquear la UI.
-# QThread ejecuta run() en un hilo separado; al terminar emite señales.
-# Esto es necesario porque las peticiones HTTP son bloqueantes y congelarían
-# la interfaz si se hicieran en el hilo principal (patrón Worker Thread).
-class _ScraperWorker(QThread):
-    # Señales para comunicar el resultado al hilo principal
-    terminado = pyqtSignal(dict)  # Emite la info del juego
-    error = pyqtSignal(str)       # Emite un mensaje de error
-
-    def __init__(self, api, nombre_busqueda, extension, ruta_games, nombre_archivo, ruta_rom):
-        super().__init__()
-        self.api = api
-        self.nombre_busqueda = nombre_busqueda
-        self.extension = extension
-        self.ruta_games = ruta_games
-        self.nombre_archivo = nombre_archivo
-        self.ruta_rom = ruta_rom
-
-    # Ejecución del hilo: primero intenta buscar por hash (más fiable),
-    # si no encuentra, busca por nombre (fallback).
-    def run(self):
-        # 1º: Buscar por hash del fichero ROM (identificación exacta)
-        print(f"[ScreenScraper] Intentando identificar por hash: '{self.nombre_archivo}'")
-        info = self.api.buscar_por_hash(self.ruta_rom, self.extension)
-
-        # 2º: Fallback a búsqueda por nombre
-        if not info:
-            print(f"[ScreenScraper] Hash no encontrado, buscando por nombre: '{self.nombre_busqueda}'")
-            info = self.api.buscar_por_nombre(self.nombre_busqueda, self.extension)
-
-        if not info:
-            self.error.emit("No se encontró información del juego en ScreenScraper")
-            return
-
-        cache_dir = obtener_cache_dir(self.ruta_games, self.nombre_archivo)
-        os.makedirs(cache_dir, exist_ok=True)
-
-        # Descargar portada
-        medias = info.get("medias", {})
-        portada_url = medias.get("portada_url")
-        if portada_url:
-            ext = ".png" if ".png" in portada_url.lower() else ".jpg"
-            cover_path = os.path.join(cache_dir, f"cover{ext}")
-            if ScreenScraperAPI.descargar_imagen(portada_url, cover_path):
-                info["cover_local"] = os.path.basename(cover_path)
-
-        # Descargar imágenes de galería (máx. 20)
-        imagenes_locales = []
-        for i, img in enumerate(medias.get("imagenes", [])[:20]):
-            url = img.get("url", "")
-            if not url:
-                continue
-            tipo = img.get("type", f"img{i}")
-            region = img.get("region", "")
-            ext = ".png" if ".png" in url.lower() else ".jpg"
-            safe = "".join(c for c in f"{tipo}_{region}"
-                           if c.isalnum() or c in "_-") + ext
-            path = os.path.join(cache_dir, safe)
-            if not os.path.exists(path):
-                if ScreenScraperAPI.descargar_imagen(url, path):
-                    imagenes_locales.append(safe)
-            else:
-                imagenes_locales.append(safe)
-
-        info["imagenes_locales"] = imagenes_locales
-
-        # Quitar URLs crudas antes de cachear
-        info.pop("medias", None)
-        guardar_info_cache(self.ruta_games, self.nombre_archivo, info)
-        self.terminado.emit(info)
-
-
 # Página de detalle: muestra información obtenida de ScreenScraper
 # (portada, descripción, géneros, galería) y permite lanzar el juego.
 class GameDetailPage(QWidget):
 
     jugar_signal = pyqtSignal(object)        # Emite el objeto Game al pulsar Jugar
     volver_signal = pyqtSignal()             # Emite al pulsar Volver
-    portada_actualizada = pyqtSignal(object) # Emite el juego cuando se descarga su portada
 
-    def __init__(self, api, ruta_games, parent=None):
+    # 'scraper' es el ScrapingService compartido con MainWindow
+    def __init__(self, scraper, ruta_games, parent=None):
         super().__init__(parent)
-        self.api = api
+        self.scraper = scraper
         self.ruta_games = ruta_games
         self._juego_actual = None
-        self._worker = None
-        self._workers_bg = []  # workers en background para juegos nuevos
+        self._galeria_pendiente = {}    # ruta → (nombre, url) de las imágenes sin descargar
+        self.scraper.juego_scrapeado.connect(self._on_api_ok)
+        self.scraper.juego_fallido.connect(self._on_api_error)
+        self.scraper.media_lista.connect(self._on_media_lista)
 
         self.ui = GameDetailPageUI()
         self.ui.setupUi(self)
@@ -107,25 +34,22 @@ class GameDetailPage(QWidget):
         self.ui.btn_volver.clicked.connect(self.volver_signal.emit)
         self.ui.btn_jugar.clicked.connect(self._on_jugar)
         self.ui.btn_menu.clicked.connect(self._on_menu)
+        # Galería diferida: al desplazarla se piden las imágenes que entran
+        barra = self.ui.gallery_scroll.horizontalScrollBar()
+        barra.valueChanged.connect(self._pedir_galeria_visible)
+        barra.rangeChanged.connect(self._pedir_galeria_visible)
 
     # ── Público ──
 
     # Carga la información del juego. Si hay caché local, la usa directamente.
-    # Si no, lanza un QThread para llamar a la API de ScreenScraper en segundo plano.
+    # Si no, lo pone el primero en la cola del ScrapingService; el resultado
+    # llega por juego_scrapeado / juego_fallido.
     def mostrar_juego(self, juego):
         self._juego_actual = juego
 
-        # Cancelar worker anterior si existe
-        if self._worker and self._worker.isRunning():
-            print("[ScreenScraper] Worker anterior aún corriendo, esperando…")
-            self._worker.quit()
-            self._worker.wait(3000)
-
         info = cargar_info_cache(self.ruta_games, juego.nombre_archivo)
         if info:
-            from api.screenscraper import obtener_cache_dir, CACHE_INFO_FILE
-            cache_path = os.path.join(obtener_cache_dir(self.ruta_games, juego.nombre_archivo), CACHE_INFO_FILE)
-            print(f"[ScreenScraper] Caché encontrada para '{juego.nombre_archivo}' → {cache_path}")
+            print(f"[ScreenScraper] Caché encontrada para '{juego.nombre_archivo}'")
             print(f"[ScreenScraper]   titulo={info.get('titulo', '?')!r}, generos={info.get('generos', [])}, desc={bool(info.get('descripcion'))}")
             self._mostrar_info(info, juego)
         else:
@@ -141,57 +65,28 @@ class GameDetailPage(QWidget):
             self.ui.developpeur_label.setText("")
             self.ui.jugadores_label.setText("")
             self.ui.set_cover(juego.imagen)
+            self._galeria_pendiente = {}
             self.ui.set_galeria([])
             self.ui.mostrar_cargando(True)
 
-            titulo_rom = extraer_titulo_rom(juego.ruta_juego, juego.extension)
-            nombre_busqueda = titulo_rom if titulo_rom else juego.titulo
-            print(f"[ScreenScraper] Buscando juego: '{nombre_busqueda}' (título ROM: {titulo_rom!r})")
-
-            self._worker = _ScraperWorker(
-                self.api, nombre_busqueda, juego.extension,
-                self.ruta_games, juego.nombre_archivo, juego.ruta_juego,
-            )
-            self._worker.terminado.connect(
-                lambda info_dict: self._on_api_ok(info_dict, juego))
-            self._worker.error.connect(self._on_api_error)
-            self._worker.start()
-
-    # Llama a la API en background para un juego recién detectado (sin modificar la UI).
-    # Úsalo cuando se detecta un juego nuevo sin caché; el click en la carta sigue
-    # usando mostrar_juego() por si el usuario borró la carpeta de caché.
-    def scrape_en_background(self, juego):
-        titulo_rom = extraer_titulo_rom(juego.ruta_juego, juego.extension)
-        nombre_busqueda = titulo_rom if titulo_rom else juego.titulo
-        worker = _ScraperWorker(
-            self.api, nombre_busqueda, juego.extension,
-            self.ruta_games, juego.nombre_archivo, juego.ruta_juego,
-        )
-        worker.terminado.connect(lambda info, j=juego: self._on_bg_ok(info, j))
-        worker.error.connect(
-            lambda msg, j=juego: print(f"[ScreenScraper] Error background '{j.nombre_archivo}': {msg}")
-        )
-        worker.finished.connect(lambda w=worker: self._workers_bg.remove(w) if w in self._workers_bg else None)
-        self._workers_bg.append(worker)
-        worker.start()
-
-    def _on_bg_ok(self, info, juego):
-        portada = obtener_ruta_portada(self.ruta_games, juego.nombre_archivo)
-        if portada:
-            juego.imagen = portada
-            self.portada_actualizada.emit(juego)
+            self.scraper.encolar(juego, prioritario=True)
 
     # ── Callbacks de la API ──
 
-    def _on_api_ok(self, info, juego):
+    # El servicio avisa de todos los juegos que termina; solo interesa el
+    # que se está mostrando (por nombre: el escaneo puede recrear el Game)
+    def _es_actual(self, juego):
+        return self._juego_actual is not None and juego.nombre_archivo == self._juego_actual.nombre_archivo
+
+    def _on_api_ok(self, juego, info):
+        if not self._es_actual(juego):
+            return
         self.ui.mostrar_cargando(False)
-        self._mostrar_info(info, juego)
-        portada = obtener_ruta_portada(self.ruta_games, juego.nombre_archivo)
-        if portada:
-            juego.imagen = portada
-            self.portada_actualizada.emit(juego)
+        self._mostrar_info(info, self._juego_actual)
 
-    def _on_api_error(self, msg):
+    def _on_api_error(self, juego, msg):
+        if not self._es_actual(juego):
+            return
         self.ui.mostrar_cargando(False)
         self.ui.descripcion_label.setText(msg)
 
@@ -208,7 +103,31 @@ class GameDetailPage(QWidget):
         portada = obtener_ruta_portada(self.ruta_games, juego.nombre_archivo)
         self.ui.set_cover(portada)
         rutas = obtener_rutas_galeria(self.ruta_games, juego.nombre_archivo)
-        self.ui.set_galeria(rutas)
+        # Imágenes de la galería que se scrapearon sin descargar (se
+        # comparan con el listado cacheado, sin tocar el disco)
+        descargadas = set(rutas)
+        self._galeria_pendiente = {}
+        for media in info.get("galeria", []):
+            ruta = obtener_ruta_media(self.ruta_games, juego.nombre_archivo, media["nombre"])
+            if ruta not in descargadas:
+                self._galeria_pendiente[ruta] = (media["nombre"], media["url"])
+        self.ui.set_galeria(rutas, list(self._galeria_pendiente))
+        self._pedir_galeria_visible()
+
+    # Pide al servicio las imágenes pendientes que se están viendo; las que
+    # quedan fuera de la vista no se descargan hasta que se desplaza la galería
+    def _pedir_galeria_visible(self, *_):
+        if not self._galeria_pendiente or not self._juego_actual:
+            return
+        for ruta in self.ui.placeholders_visibles():
+            nombre, url = self._galeria_pendiente[ruta]
+            self.scraper.pedir_media(self._juego_actual.nombre_archivo, nombre, url)
+
+    def _on_media_lista(self, nombre_archivo, ruta):
+        if self._juego_actual is None or nombre_archivo != self._juego_actual.nombre_archivo:
+            return
+        if self._galeria_pendiente.pop(ruta, None):
+            self.ui.colocar_imagen_galeria(ruta)
 
     # ── Acciones ──
 
@@ -1,11 +1,11 @@
 # ── Imports ──────────────────────────────────────────────────────
-import os
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QScrollArea, QFrame, QSizePolicy
 )
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QPixmap
+from ui.thumbnailCache import obtener_cache
 
 
 # Define el layout de la página de detalle de un juego.
@@ -29,6 +29,7 @@ class GameDetailPageUI:
         self.gallery_scroll = None
         self.gallery_container = None
         self.gallery_layout = None
+        self._placeholders = {}     # ruta → QLabel de una imagen de la galería aún sin descargar
         self.loading_label = None
         self.playtime_label = None
         self.last_played_label = None
@@ -211,12 +212,8 @@ class GameDetailPageUI:
 
     # Establece la imagen de portada, escalada proporcionalmente
     def set_cover(self, ruta):
-        if ruta and os.path.exists(ruta):
-            pixmap = QPixmap(ruta).scaled(
-                280, 380,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation,
-            )
+        pixmap = obtener_cache().cargar(ruta, 280, 380)
+        if not pixmap.isNull():
             self.cover_label.setPixmap(pixmap)
         else:
             self.cover_label.setPixmap(QPixmap())
@@ -259,32 +256,78 @@ class GameDetailPageUI:
 
     # Carga las miniaturas de la galería horizontal.
     # Primero limpia las imágenes anteriores con deleteLater() (liberación segura en Qt).
-    def set_galeria(self, rutas_imagenes):
+    # 'pendientes' son rutas de imágenes aún sin descargar (galería diferida):
+    # se muestra un hueco "Cargando…" que colocar_imagen_galeria() rellena.
+    def set_galeria(self, rutas_imagenes, pendientes=()):
         # Eliminar widgets previos del layout
         while self.gallery_layout.count():
             item = self.gallery_layout.takeAt(0)
             if item.widget():
                 item.widget().deleteLater()
+        self._placeholders = {}
 
-        if not rutas_imagenes:
+        if not rutas_imagenes and not pendientes:
             lbl = QLabel("No hay imágenes disponibles")
             lbl.setObjectName("detailNoImages")
             self.gallery_layout.addWidget(lbl)
             return
 
         for ruta in rutas_imagenes:
-            if not os.path.exists(ruta):
+            pixmap = obtener_cache().cargar(ruta, 300, 230)
+            if pixmap.isNull():
                 continue
             lbl = QLabel()
             lbl.setObjectName("detailGalleryImage")
-            pixmap = QPixmap(ruta).scaled(
-                300, 230,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation,
-            )
             lbl.setPixmap(pixmap)
             lbl.setFixedSize(pixmap.size())
             self.gallery_layout.addWidget(lbl)
 
+        for ruta in pendientes:
+            lbl = QLabel("Cargando…")
+            lbl.setObjectName("detailGalleryPlaceholder")
+            lbl.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            lbl.setFixedSize(300, 230)
+            self.gallery_layout.addWidget(lbl)
+            self._placeholders[ruta] = lbl
+
+    # Sustituye el hueco de una imagen pendiente por la imagen ya descargada
+    # (o por "Sin imagen" si la descarga falló)
+    def colocar_imagen_galeria(self, ruta):
+        lbl = self._placeholders.pop(ruta, None)
+        if lbl is None:
+            return
+        pixmap = obtener_cache().cargar(ruta, 300, 230)
+        if pixmap.isNull():
+            lbl.setText("Sin imagen")
+            return
+        lbl.setText("")
+        lbl.setObjectName("detailGalleryImage")
+        lbl.style().unpolish(lbl)
+        lbl.style().polish(lbl)
+        lbl.setPixmap(pixmap)
+        lbl.setFixedSize(pixmap.size())
+
+    # Rutas de las imágenes pendientes que se ven en la galería (o están a
+    # menos de 'margen' px de verse). La posición de cada hueco se calcula
+    # con los anchos fijos de las etiquetas anteriores, así vale también
+    # antes de que el layout se haya aplicado (página aún sin mostrar).
+    def placeholders_visibles(self, margen=320):
+        if not self._placeholders:
+            return []
+        inicio = self.gallery_scroll.horizontalScrollBar().value() - margen
+        fin = inicio + self.gallery_scroll.viewport().width() + 2 * margen
+        pendientes = {lbl: ruta for ruta, lbl in self._placeholders.items()}
+        visibles = []
+        x = 0
+        for i in range(self.gallery_layout.count()):
+            lbl = self.gallery_layout.itemAt(i).widget()
+            if lbl is None:
+                continue
+            ancho = lbl.width()
+            if lbl in pendientes and x < fin and x + ancho > inicio:
+                visibles.append(pendientes[lbl])
+            x += ancho + self.gallery_layout.spacing()
+        return visibles
+
     def mostrar_cargando(self, visible):
         self.loading_label.setVisible(visible)
@@ -4,6 +4,7 @@ import os
 import re
 from PyQt6.QtWidgets import QFrame, QVBoxLayout, QHBoxLayout, QCheckBox, QLabel, QPushButton, QWidget
 from PyQt6.QtCore import pyqtSignal, Qt
+from PyQt6.QtGui import QPixmap
 from ui.gameSideBar.gameSideBarUI import GameSideBarUI
 
 
@@ -21,6 +22,11 @@ class GameSideBar(QFrame):
     cheats_cambiados = pyqtSignal(list)  # emite la lista completa de cheats al cambiar
     fast_forward_cambiado = pyqtSignal(bool)  # emite True/False al activar fast-forward
     fast_forward_speed_cambiada = pyqtSignal(int)  # emite frames extra por tick al cambiar velocidad
+    estadisticas_cambiadas = pyqtSignal(bool)  # emite True/False al mostrar/ocultar el overlay de tiempos
+    exportar_tiempos_clicked = pyqtSignal()
+    guardar_estado_clicked = pyqtSignal()
+    cargar_estado_clicked = pyqtSignal()
+    slot_estado_cambiado = pyqtSignal(int)  # emite el número de slot seleccionado
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -46,6 +52,11 @@ class GameSideBar(QFrame):
         self.ui.cheatAddButton.clicked.connect(self._on_add_cheat)
         self.ui.fastForwardButton.toggled.connect(self.fast_forward_cambiado.emit)
         self.ui.fastForwardSpeedCombo.currentIndexChanged.connect(self._on_ff_speed_changed)
+        self.ui.statsCheck.toggled.connect(self.estadisticas_cambiadas.emit)
+        self.ui.statsExportButton.clicked.connect(self.exportar_tiempos_clicked.emit)
+        self.ui.stateSaveButton.clicked.connect(self.guardar_estado_clicked.emit)
+        self.ui.stateLoadButton.clicked.connect(self.cargar_estado_clicked.emit)
+        self.ui.stateSlotCombo.currentIndexChanged.connect(self._on_state_slot_changed)
 
         self._actualizar_visibilidad_ds_res()
 
@@ -231,6 +242,35 @@ class GameSideBar(QFrame):
             self._rebuild_cheat_list()
             self.cheats_cambiados.emit(list(self._cheats))
 
+    # ── Estados guardados ──
+
+    # Slot seleccionado en el combo (1..NUM_SLOTS)
+    @property
+    def slot_estado(self):
+        data = self.ui.stateSlotCombo.currentData()
+        return int(data) if data is not None else 1
+
+    def set_slot_estado(self, slot):
+        index = self.ui.stateSlotCombo.findData(slot)
+        if index >= 0:
+            self.ui.stateSlotCombo.setCurrentIndex(index)
+
+    # Muestra la miniatura del slot (ruta a un PNG) o "Vacío" si no existe.
+    # ocupado indica si hay estado guardado (habilita el botón Cargar).
+    def mostrar_estado(self, ruta_miniatura, ocupado):
+        self.ui.stateLoadButton.setEnabled(ocupado)
+        pixmap = QPixmap(ruta_miniatura) if ruta_miniatura and os.path.exists(ruta_miniatura) else QPixmap()
+        if pixmap.isNull():
+            self.ui.stateThumbLabel.setPixmap(QPixmap())
+            self.ui.stateThumbLabel.setText("Guardado" if ocupado else "Vacío")
+            return
+        label = self.ui.stateThumbLabel
+        label.setPixmap(pixmap.scaled(
+            label.width(), label.height(),
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        ))
+
     # ── Lectores (para que MainWindow lea los valores actuales) ──
 
     @property
@@ -287,6 +327,11 @@ class GameSideBar(QFrame):
             return
         self.fast_forward_speed_cambiada.emit(self.fast_forward_extra_frames)
 
+    def _on_state_slot_changed(self, index):
+        if index < 0:
+            return
+        self.slot_estado_cambiado.emit(self.slot_estado)
+
     def _actualizar_visibilidad_ds_res(self):
         es_opengl = self.ui.dsRendererCombo.currentIndex() == 1
         self.ui.dsResolutionRow.setVisible(es_opengl)
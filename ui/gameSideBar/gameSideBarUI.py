@@ -5,6 +5,7 @@ from PyQt6.QtWidgets import (
     QScrollArea, QLineEdit, QPlainTextEdit, QCheckBox, QSizePolicy
 )
 from PyQt6.QtCore import Qt
+from libretro.savestate_slots import NUM_SLOTS
 
 
 # UI de la barra lateral in-game: configuración rápida + botón salir.
@@ -35,6 +36,12 @@ class GameSideBarUI(QFrame):
         self.fastForwardSectionWidget = None  # contenedor de la sección de fast-forward (DS)
         self.fastForwardButton = None   # botón toggle de fast-forward
         self.fastForwardSpeedCombo = None  # combo de velocidad (x2/x4/x8/x16)
+        self.stateSlotCombo = None      # slot de savestate seleccionado (1..NUM_SLOTS)
+        self.stateThumbLabel = None     # miniatura del slot seleccionado
+        self.stateSaveButton = None     # guarda el estado en el slot (F2)
+        self.stateLoadButton = None     # carga el estado del slot (F4)
+        self.statsCheck = None          # toggle del overlay de tiempos por frame
+        self.statsExportButton = None   # exporta el anillo de tiempos a CSV/JSON
 
         self._setup_ui()
 
@@ -196,9 +203,9 @@ class GameSideBarUI(QFrame):
         layout.addWidget(self.cheatSectionWidget)
 
         # ── Sección Fast-Forward – DS ──
-        # Toggle que acelera la emulación de melonDS: muta el audio (libera
-        # el throttle bloqueante de PyAudio) y GameWindow ejecuta N frames
-        # extra por tick del timer. Solo tiene sentido para .nds; para
+        # Toggle que acelera la emulación de melonDS: muta el audio (el
+        # FramePacer deja de usarlo como reloj) y GameWindow ejecuta N frames
+        # extra por cada frame a velocidad normal. Solo tiene sentido para .nds; para
         # 3DS/Wii/GC la sección se oculta desde set_consola.
         self.fastForwardSectionWidget = QWidget()
         self.fastForwardSectionWidget.setSizePolicy(QSizePolicy.Policy.Preferred, QSizePolicy.Policy.Fixed)
@@ -235,6 +242,53 @@ class GameSideBarUI(QFrame):
 
         layout.addWidget(self.fastForwardSectionWidget)
 
+        # ── Sección Estados guardados ──
+        # Slots numerados por ROM con miniatura del último frame. Los atajos
+        # F2/F4 guardan/cargan el slot seleccionado y F6/F7 lo cambian.
+        tituloEstados = QLabel("Estados guardados")
+        tituloEstados.setObjectName("gameSideBarSectionTitle")
+        layout.addWidget(tituloEstados)
+
+        self.stateSlotCombo = QComboBox()
+        self.stateSlotCombo.setObjectName("gameSideBarCombo")
+        for slot in range(1, NUM_SLOTS + 1):
+            self.stateSlotCombo.addItem(f"Slot {slot}", slot)
+        layout.addWidget(self.stateSlotCombo)
+
+        self.stateThumbLabel = QLabel("Vacío")
+        self.stateThumbLabel.setObjectName("stateThumbnail")
+        self.stateThumbLabel.setFixedHeight(140)
+        self.stateThumbLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.stateThumbLabel)
+
+        stateButtonsRow = QHBoxLayout()
+        stateButtonsRow.setSpacing(10)
+        self.stateSaveButton = QPushButton("Guardar (F2)")
+        self.stateSaveButton.setObjectName("stateButton")
+        self.stateSaveButton.setCursor(Qt.CursorShape.PointingHandCursor)
+        stateButtonsRow.addWidget(self.stateSaveButton)
+        self.stateLoadButton = QPushButton("Cargar (F4)")
+        self.stateLoadButton.setObjectName("stateButton")
+        self.stateLoadButton.setCursor(Qt.CursorShape.PointingHandCursor)
+        stateButtonsRow.addWidget(self.stateLoadButton)
+        layout.addLayout(stateButtonsRow)
+
+        # ── Sección Rendimiento ──
+        # Overlay con p50/p95/p99 de cada fase del frame (retro_run, upload,
+        # blit, audio, input) y exportación de las muestras a CSV/JSON.
+        tituloRend = QLabel("Rendimiento")
+        tituloRend.setObjectName("gameSideBarSectionTitle")
+        layout.addWidget(tituloRend)
+
+        self.statsCheck = QCheckBox("Mostrar tiempos por frame")
+        self.statsCheck.setObjectName("gameSideBarCheckBox")
+        layout.addWidget(self.statsCheck)
+
+        self.statsExportButton = QPushButton("Exportar tiempos…")
+        self.statsExportButton.setObjectName("statsExportButton")
+        self.statsExportButton.setCursor(Qt.CursorShape.PointingHandCursor)
+        layout.addWidget(self.statsExportButton)
+
         # ── Espacio flexible ──
         layout.addStretch()
 
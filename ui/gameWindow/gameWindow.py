@@ -2,10 +2,18 @@
 # time.perf_counter: reloj de alta precisión para medir FPS
 import time
 
-from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QFileDialog
 from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from ui.gameWindow.gameWindowUI import GameWindowUI
 from ui.openGLWidget import OpenGLWidget
+from audio.frame_pacer import FramePacer
+from audio.audio_manager import DEFAULT_LATENCY_MS
+from libretro.savestate_slots import SaveStateSlots, NUM_SLOTS
+
+# Intervalo del timer de GameWindow. No es el periodo de frame: en cada tick
+# el FramePacer decide si toca emular (0, 1 o más frames), así que un tick
+# corto permite clavar la tasa nativa del core (p.ej. 59.8 fps).
+_TICK_MS = 4
 
 
 # Página de juego: se crea una sola vez y se reutiliza para cada juego.
@@ -14,6 +22,9 @@ from ui.openGLWidget import OpenGLWidget
 class GameWindow(QWidget):
 
     salir_signal = pyqtSignal(object)  # emite el juego que se estaba ejecutando
+    # Avisos del hilo de SaveStateSlots (Qt los entrega en el hilo de la GUI)
+    _estado_escrito = pyqtSignal(object, int)          # (slots, slot)
+    _estado_leido = pyqtSignal(object, int, object)    # (slots, slot, bytes o None)
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -22,6 +33,10 @@ class GameWindow(QWidget):
         self._juego_actual = None   # juego que se está ejecutando ahora mismo
         self._pending_state = None  # savestate en memoria para restaurar tras reload
         self._session_start = None  # tiempo de inicio de la sesión actual (perf_counter)
+        self.emulation_thread = False  # True → los juegos se ejecutan en un EmulationThread (config)
+        self.audio_latency_ms = DEFAULT_LATENCY_MS  # Profundidad del buffer de audio (config)
+        self.rewind_config = None   # (memoria MB, intervalo) del rebobinado, None = desactivado (config)
+        self._slots = None          # SaveStateSlots de la ROM actual
 
         # Layout del contenedor (vacío hasta que se carga el primer juego)
         self._container_layout = QVBoxLayout(self.ui.openglContainer)
@@ -30,10 +45,13 @@ class GameWindow(QWidget):
         # OpenGLWidget inicial
         self.game_widget = OpenGLWidget(self.ui.openglContainer)
         self._container_layout.addWidget(self.game_widget)
+        self.game_widget.atajo_savestate.connect(self._on_atajo_savestate)
 
         # Timer permanente (parado)
         self.timer = QTimer()
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.timer.timeout.connect(self._on_frame)
+        self._pacer = None  # FramePacer del juego actual (se crea con el AudioManager)
 
         # Frames emulados extra por tick del timer al activar fast-forward,
         # además del frame que dispara paintGL. Se sincroniza con el combo
@@ -46,12 +64,21 @@ class GameWindow(QWidget):
         self.ui.gameSideBar.cheats_cambiados.connect(self._on_cheats_cambiados)
         self.ui.gameSideBar.fast_forward_cambiado.connect(self._on_fast_forward_cambiado)
         self.ui.gameSideBar.fast_forward_speed_cambiada.connect(self._on_fast_forward_speed_cambiada)
+        self.ui.gameSideBar.estadisticas_cambiadas.connect(self._on_estadisticas_cambiadas)
+        self.ui.gameSideBar.exportar_tiempos_clicked.connect(self._exportar_tiempos)
+        self.ui.gameSideBar.guardar_estado_clicked.connect(self._guardar_estado)
+        self.ui.gameSideBar.cargar_estado_clicked.connect(self._cargar_estado)
+        self.ui.gameSideBar.slot_estado_cambiado.connect(self._mostrar_slot)
+        self._estado_escrito.connect(self._on_estado_escrito)
+        self._estado_leido.connect(self._on_estado_leido)
 
         self._pending_cheats = None  # cheats a aplicar cuando el core esté listo
 
         # Performance tracking
         self._fps_frame_count = 0
         self._fps_last_time = 0.0
+        self._fps_last_thread_count = 0  # frame_count del EmulationThread en el último tick
+        self._stats_visible = False     # overlay de tiempos por frame (toggle de la sidebar)
 
         _overlay_style = (
             "background-color: rgba(0, 0, 0, 160);"
@@ -66,6 +93,15 @@ class GameWindow(QWidget):
         self._fps_label.move(0, 0)
         self._fps_label.hide()
 
+        # Overlay de tiempos por frame (p50/p95/p99 de cada fase), debajo del FPS
+        self._stats_label = QLabel("", self.ui.openglContainer)
+        self._stats_label.setObjectName("frameStatsOverlay")
+        self._stats_label.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self._stats_label.setStyleSheet(
+            _overlay_style + "color: #ecf0f1; font-family: Consolas, monospace; font-weight: normal;"
+        )
+        self._stats_label.hide()
+
     # Destruye el OpenGLWidget actual y crea uno nuevo con contexto GL limpio.
     # Citra libretro deja objetos GL huérfanos (shaders, VAOs, texturas de caché)
     # que no libera en retro_deinit(). Recrear el widget fuerza a Qt a destruir el
@@ -79,7 +115,12 @@ class GameWindow(QWidget):
         old.deleteLater()                         # Qt destruye el contexto GL al procesar el evento
 
         self.game_widget = OpenGLWidget(self.ui.openglContainer)
+        self.game_widget.threaded = self.emulation_thread
+        self.game_widget.audio_latency_ms = self.audio_latency_ms
+        self.game_widget.rewind_config = self.rewind_config
+        self.game_widget.atajo_savestate.connect(self._on_atajo_savestate)
         self._container_layout.addWidget(self.game_widget)
+        self._fps_last_thread_count = 0
 
         # El widget nuevo arranca con fast-forward apagado. Reseteamos el
         # botón de la sidebar para que refleje el estado real y no quede
@@ -89,33 +130,59 @@ class GameWindow(QWidget):
         ff_btn.setChecked(False)
         ff_btn.blockSignals(False)
 
-    # Tick del timer (~60 Hz): restaura savestate si hay uno pendiente,
-    # actualiza el contador de FPS y repinta el widget OpenGL.
+    # Tick del timer (cada _TICK_MS): restaura savestate si hay uno pendiente,
+    # emula los frames que pida el FramePacer, actualiza el contador de FPS
+    # y repinta el widget OpenGL.
     # perf_counter: reloj monotonónico de nanosegundos, ideal para medir
     # intervalos cortos de tiempo con alta precisión.
     def _on_frame(self):
         # Si hay cheats pendientes de aplicar, aplicarlos cuando el core esté listo
         if self._pending_cheats is not None and self.game_widget.initialized and self.game_widget.core:
-            self.game_widget.core.apply_cheats(self._pending_cheats)
+            cheats = self._pending_cheats
             self._pending_cheats = None
+            self.game_widget.ejecutar_entre_frames(lambda core, c=cheats: core.apply_cheats(c))
         # Si hay un savestate pendiente (tras reload), restaurarlo ahora
         if self._pending_state and self.game_widget.initialized and self.game_widget.core:
             state = self._pending_state
             self._pending_state = None
             QTimer.singleShot(32, lambda: self._restore_state(state))
 
-        # Fast-forward: ejecuta frames extra sin repintar antes del paintGL.
-        # Con el audio mudo (set en OpenGLWidget.set_fast_forward), PyAudio
-        # no bloquea y el core corre a máxima velocidad. Contamos los frames
-        # extra en el contador de FPS para que el overlay refleje la velocidad
-        # real de emulación.
-        extra_frames = 0
-        if self.game_widget._fast_forward and self.game_widget.initialized:
-            for _ in range(self._ff_extra_frames):
-                self.game_widget.run_extra_frame()
-                extra_frames += 1
-
-        self._fps_frame_count += 1 + extra_frames
+        # Con hilo de emulación el ritmo lo marca el propio hilo: aquí solo
+        # se le pasa la velocidad de fast-forward y se cuentan los frames que
+        # ha emulado desde el último tick.
+        thread = self.game_widget.emulation_thread
+        if thread:
+            thread.extra_frames = self._ff_extra_frames
+            total = thread.frame_count
+            frames = total - self._fps_last_thread_count
+            self._fps_last_thread_count = total
+        elif self.game_widget.initialized and self.game_widget.core:
+            # Ritmo guiado por audio: el FramePacer dice cuántos frames tocan
+            # según el llenado del buffer de audio. Si ya hay un paintGL en
+            # cola no se encola otro; el pacer lo volverá a pedir en el
+            # siguiente tick si el buffer sigue bajo.
+            frames = 0
+            pacer = self._obtener_pacer()
+            pendientes = pacer.frames_pendientes(self.game_widget.core.fps)
+            if pendientes and not self.game_widget.paint_pendiente:
+                # Fast-forward: ejecuta frames extra sin repintar antes del paintGL.
+                # Con el audio mudo (set en OpenGLWidget.set_fast_forward), el
+                # pacer usa el reloj de pared y cada frame "real" se multiplica
+                # por la velocidad elegida. Contamos los frames extra en el
+                # contador de FPS para que el overlay refleje la velocidad real.
+                frames = pendientes
+                if self.game_widget._fast_forward:
+                    frames *= 1 + self._ff_extra_frames
+                for _ in range(frames - 1):
+                    self.game_widget.run_extra_frame()
+                self.game_widget.paint_pendiente = True
+                self.game_widget.update()
+                pacer.frames_ejecutados(pendientes)
+        else:
+            frames = 0
+            self.game_widget.update()
+
+        self._fps_frame_count += frames
         now = time.perf_counter()
         elapsed = now - self._fps_last_time
         if elapsed >= 0.5:
@@ -123,15 +190,141 @@ class GameWindow(QWidget):
             suffix = " ▶▶" if self.game_widget._fast_forward else ""
             self._fps_label.setText(f"FPS: {fps:.1f}{suffix}")
             self._fps_label.adjustSize()
+            if self._stats_visible:
+                self._actualizar_stats()
 
             self._fps_frame_count = 0
             self._fps_last_time = now
-        self.game_widget.update()
+
+    # Rellena el overlay de tiempos con los percentiles del anillo del core
+    def _actualizar_stats(self):
+        core = self.game_widget.core
+        if not core:
+            return
+        nombres = {"run": "retro_run", "upload": "upload", "blit": "blit",
+                   "audio": "audio", "input": "input"}
+        lineas = ["fase        p50    p95    p99 ms"]
+        for metrica, valores in core.timings.resumen().items():
+            if valores:
+                p50, p95, p99 = valores
+                lineas.append(f"{nombres[metrica]:<9} {p50:6.2f} {p95:6.2f} {p99:6.2f}")
+        self._stats_label.setText("\n".join(lineas))
+        self._stats_label.adjustSize()
+        self._stats_label.move(0, self._fps_label.height())
+
+    def _on_estadisticas_cambiadas(self, visible):
+        self._stats_visible = visible
+        self._stats_label.setVisible(visible and self._juego_actual is not None)
+        if visible:
+            self._stats_label.raise_()
+            self._actualizar_stats()
+
+    # Guarda el anillo de tiempos del core en CSV o JSON (según la extensión)
+    def _exportar_tiempos(self):
+        core = self.game_widget.core
+        if not core or not len(core.timings):
+            return
+        ruta, _ = QFileDialog.getSaveFileName(
+            self, "Exportar tiempos por frame", "frame_timings.csv",
+            "CSV (*.csv);;JSON (*.json)",
+        )
+        if not ruta:
+            return
+        try:
+            if ruta.lower().endswith(".json"):
+                core.timings.exportar_json(ruta)
+            else:
+                core.timings.exportar_csv(ruta)
+            print(f"[Stats] {len(core.timings)} frames exportados a {ruta}")
+        except OSError as e:
+            print(f"[Stats] Error exportando tiempos: {e}")
+
+    # Devuelve el FramePacer del juego actual. Se (re)crea cuando el widget
+    # tiene un AudioManager nuevo (cada carga de juego crea uno).
+    def _obtener_pacer(self):
+        audio_mgr = self.game_widget.audio_mgr
+        if self._pacer is None or self._pacer.audio_manager is not audio_mgr:
+            self._detener_pacer()
+            self._pacer = FramePacer(audio_mgr)
+        return self._pacer
+
+    def _detener_pacer(self):
+        if self._pacer:
+            self._pacer.detener()
+            self._pacer = None
 
     # Restaura un savestate (bloque de bytes) en el core activo
     def _restore_state(self, state_data):
         if self.game_widget.core and self.game_widget.initialized:
-            self.game_widget.core.load_state(state_data)
+            self.game_widget.ejecutar_entre_frames(lambda core: core.load_state(state_data))
+
+    # ── Estados guardados ──
+
+    # F2/F4 guardan/cargan el slot seleccionado; F6/F7 cambian de slot
+    def _on_atajo_savestate(self, accion):
+        if accion == "guardar":
+            self._guardar_estado()
+        elif accion == "cargar":
+            self._cargar_estado()
+        else:
+            paso = 1 if accion == "slot_siguiente" else -1
+            slot = (self.sidebar.slot_estado - 1 + paso) % NUM_SLOTS + 1
+            self.sidebar.set_slot_estado(slot)
+            print(f"[Savestate] Slot {slot} seleccionado")
+
+    # Solo la serialización y la lectura del FBO ocurren entre frames (en el
+    # hilo de emulación si lo hay); comprimir y escribir lo hace el hilo de
+    # SaveStateSlots, así que la GUI no espera a ninguno de los dos.
+    def _guardar_estado(self):
+        slots = self._slots
+        if not slots or not (self.game_widget.initialized and self.game_widget.core):
+            return
+        slot = self.sidebar.slot_estado
+
+        def serializar(core):
+            datos = core.save_state()
+            return (datos, core.leer_miniatura()) if datos is not None else None
+
+        futuro = self.game_widget.ejecutar_entre_frames(serializar)
+        futuro.add_done_callback(lambda f: self._encolar_escritura(slots, slot, f))
+
+    # Se ejecuta en el hilo que serializó: pasa el estado al hilo de escritura
+    def _encolar_escritura(self, slots, slot, futuro):
+        if futuro.exception() or futuro.result() is None:
+            return
+        datos, miniatura = futuro.result()
+        try:
+            escritura = slots.guardar(slot, datos, miniatura)
+        except RuntimeError:
+            return  # juego descargado mientras tanto (hilo de escritura cerrado)
+        escritura.add_done_callback(lambda f: self._estado_escrito.emit(slots, slot))
+
+    # Lee y descomprime en el hilo de SaveStateSlots; el estado se carga en
+    # el core entre frames cuando llega _estado_leido.
+    def _cargar_estado(self):
+        slots = self._slots
+        if not slots or not (self.game_widget.initialized and self.game_widget.core):
+            return
+        slot = self.sidebar.slot_estado
+        slots.cargar(slot).add_done_callback(
+            lambda f: self._estado_leido.emit(slots, slot, None if f.exception() else f.result())
+        )
+
+    def _on_estado_leido(self, slots, slot, datos):
+        if datos and slots is self._slots:
+            self._restore_state(datos)
+
+    def _on_estado_escrito(self, slots, slot):
+        if slots is self._slots and slot == self.sidebar.slot_estado:
+            self._mostrar_slot(slot)
+
+    # Actualiza la miniatura de la sidebar para el slot seleccionado
+    def _mostrar_slot(self, slot=None):
+        if not self._slots:
+            self.sidebar.mostrar_estado(None, False)
+            return
+        slot = slot or self.sidebar.slot_estado
+        self.sidebar.mostrar_estado(self._slots.ruta_miniatura(slot), self._slots.ocupado(slot))
 
     # Atajo para acceder a la sidebar desde fuera
     @property
@@ -145,11 +338,15 @@ class GameWindow(QWidget):
     # Carga un juego: recrea el contexto GL limpio y arranca el timer de renderizado
     def load_game(self, juego, core_options_extra=None):
         self.timer.stop()
+        self._detener_pacer()
         self._recreate_game_widget()
         self._juego_actual = juego
         self._session_start = time.perf_counter()
         self.ui.gameSideBar.set_consola(juego.extension)
         self.ui.gameSideBar.cargar_cheats(juego.nombre_archivo)
+        self._cerrar_slots()
+        self._slots = SaveStateSlots(juego.ruta_juego)
+        self._mostrar_slot()
         if core_options_extra:
             self.game_widget.core_options_extra = core_options_extra
         self.game_widget.load_game(juego.ruta_core, juego.ruta_juego)
@@ -160,8 +357,11 @@ class GameWindow(QWidget):
         self._fps_label.adjustSize()
         self._fps_label.show()
         self._fps_label.raise_()
+        self._stats_label.setText("")
+        self._stats_label.setVisible(self._stats_visible)
+        self._stats_label.raise_()
         if not self.timer.isActive():
-            self.timer.start(16)
+            self.timer.start(_TICK_MS)
 
     # Recarga el juego actual con nuevas opciones gráficas (ej: cambio de renderer).
     # Guarda el estado completo en memoria (savestate) antes de recargar y lo
@@ -176,18 +376,24 @@ class GameWindow(QWidget):
         # 1. Guardar estado completo en memoria (savestate)
         state_data = None
         if self.game_widget.core:
-            state_data = self.game_widget.core.save_state()
+            try:
+                state_data = self.game_widget.ejecutar_entre_frames(
+                    lambda core: core.save_state()
+                ).result(timeout=5)
+            except Exception:
+                state_data = None
             if state_data is None:
                 print("[Reload] Savestate no disponible; se perderá el estado en RAM")
 
         # 2. Recargar con contexto GL limpio y las nuevas opciones
         self.timer.stop()
+        self._detener_pacer()
         self._recreate_game_widget()
         self.game_widget.core_options_extra = core_options_extra
         self.game_widget.load_game(juego.ruta_core, juego.ruta_juego)
         self.game_widget.setFocus()
         if not self.timer.isActive():
-            self.timer.start(16)
+            self.timer.start(_TICK_MS)
 
         # 3. Restaurar estado en el próximo tick (el core necesita al menos un frame)
         if state_data:
@@ -203,11 +409,20 @@ class GameWindow(QWidget):
                 self._juego_actual.registrar_sesion(elapsed)
         self._session_start = None
         self.timer.stop()
+        self._detener_pacer()
         self._fps_label.hide()
+        self._stats_label.hide()
         self._juego_actual = None
         self._pending_state = None
         self._pending_cheats = None
         self.game_widget.unload_game()
+        self._cerrar_slots()
+
+    # Espera a que se terminen de escribir los estados pendientes
+    def _cerrar_slots(self):
+        if self._slots:
+            self._slots.cerrar()
+            self._slots = None
 
     # Recibe cheats cambiados desde la sidebar. Siempre los marca como pendientes
     # para que se apliquen ENTRE frames (justo antes de retro_run en _on_frame).
@@ -0,0 +1,101 @@
+# ── Imports ──────────────────────────────────────────────────────────
+import os
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from game.game import Game, analizar_rom
+
+# Máximo de hilos con max_workers = 0 (automático). Extraer un icono es
+# sobre todo leer unos KB de la ROM y escribir un PNG pequeño, así que más
+# hilos que esto solo compiten por el disco.
+_MAX_AUTO = 4
+
+# Espera antes de escribir en el índice los iconos ya registrados, para
+# agruparlos en una sola transacción
+_VOLCADO_MS = 250
+
+
+# Extrae los iconos de las ROMs en un pool de hilos, fuera del hilo de la GUI.
+# De la misma lectura de la cabecera salen también los metadatos de la ROM
+# (títulos, editor, código), que se indexan junto con el icono.
+#
+# Game.escanear_juegos encola los juegos sin icono y devuelve la lista al
+# momento; el grid se pinta con el placeholder de la consola y cada icono
+# llega por icono_listo(juego) cuando su hilo termina. cancelar() descarta
+# lo que aún no ha empezado (p. ej. si la carpeta cambia a mitad de
+# escaneo); lo que ya está en marcha termina y Game.registrar_icono
+# descarta el resultado si la ROM ya no está o ha cambiado.
+class IconExtractor(QObject):
+    icono_listo = pyqtSignal(object)             # juego (con imagen_rom ya asignada)
+    _extraido = pyqtSignal(object, object)       # juego, (icono, cabecera) (desde un worker)
+
+    def __init__(self, max_workers=0, parent=None):
+        super().__init__(parent)
+        self._max_workers = None
+        self._pool = None
+        self._trabajos = {}          # nombre_archivo → (juego, Future)
+        self._extraido.connect(self._on_extraido)
+        self._timer_volcado = QTimer(self)
+        self._timer_volcado.setSingleShot(True)
+        self._timer_volcado.setInterval(_VOLCADO_MS)
+        self._timer_volcado.timeout.connect(Game.volcar_indice)
+        self.set_max_workers(max_workers)
+
+    # Cambia el tamaño del pool (0 = automático). Lo que estuviera en cola
+    # se cancela: el siguiente escaneo lo vuelve a encolar.
+    def set_max_workers(self, max_workers):
+        if max_workers <= 0:
+            max_workers = max(1, min(_MAX_AUTO, os.cpu_count() or 1))
+        if max_workers == self._max_workers:
+            return
+        if self._pool:
+            self.cancelar()
+            self._pool.shutdown(wait=False)
+        self._max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="iconos")
+
+    @property
+    def pendientes(self):
+        return len(self._trabajos)
+
+    # Encola la extracción del icono de 'juego' (si no está ya en marcha)
+    def encolar(self, juego):
+        trabajo = self._trabajos.get(juego.nombre_archivo)
+        if trabajo and trabajo[0] is juego:
+            return
+        futuro = self._pool.submit(analizar_rom, juego)
+        self._trabajos[juego.nombre_archivo] = (juego, futuro)
+        futuro.add_done_callback(lambda f, j=juego: self._on_futuro(j, f))
+
+    # Cancela las extracciones que aún no han empezado
+    def cancelar(self):
+        for nombre, (_, futuro) in list(self._trabajos.items()):
+            if futuro.cancel():
+                del self._trabajos[nombre]
+
+    # Para el pool y escribe en el índice lo ya registrado
+    def cerrar(self):
+        self.cancelar()
+        self._pool.shutdown(wait=True)
+        self._timer_volcado.stop()
+        Game.volcar_indice()
+
+    # Se ejecuta en el hilo del worker (o en el que cancela): reenvía el
+    # resultado al hilo de la GUI
+    def _on_futuro(self, juego, futuro):
+        if futuro.cancelled():
+            return
+        try:
+            resultado = futuro.result()
+        except Exception as e:
+            print(f"[Iconos] Error extrayendo el icono de {juego.nombre_archivo}: {e}")
+            resultado = (None, None)
+        self._extraido.emit(juego, resultado)
+
+    def _on_extraido(self, juego, resultado):
+        trabajo = self._trabajos.get(juego.nombre_archivo)
+        if trabajo and trabajo[0] is juego:
+            del self._trabajos[juego.nombre_archivo]
+        if Game.registrar_icono(juego, *resultado):
+            if not self._timer_volcado.isActive():
+                self._timer_volcado.start()
+            self.icono_listo.emit(juego)
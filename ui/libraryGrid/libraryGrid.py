@@ -0,0 +1,458 @@
+# ── Imports ──────────────────────────────────────────────────────
+from PyQt6.QtWidgets import (
+    QListView, QStyledItemDelegate, QStyle, QLineEdit, QMenu,
+    QAbstractItemView, QFrame
+)
+from PyQt6.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QRect, QRectF, QSize, pyqtSignal
+)
+from PyQt6.QtGui import QPainter, QColor, QBrush, QPen, QFont, QPainterPath
+from lista import Lista, SIN_LISTA
+from ui.thumbnailCache import obtener_cache
+
+
+# Medidas de las cartas (las mismas que tenían las cartas QWidget)
+CARD_WIDTH = 220
+CARD_HEIGHT = 300
+CARD_SPACING = 20
+IMAGEN_LADO = 200
+
+# Tipos de elemento del modelo
+TIPO_JUEGO = "juego"
+TIPO_LISTA = "lista"
+
+# Roles propios del modelo
+ROL_TIPO = Qt.ItemDataRole.UserRole + 1        # TIPO_JUEGO | TIPO_LISTA
+ROL_JUEGO = Qt.ItemDataRole.UserRole + 2       # objeto Game
+ROL_LISTA = Qt.ItemDataRole.UserRole + 3       # nombre de la lista (cartas de carpeta)
+ROL_COUNT = Qt.ItemDataRole.UserRole + 4       # nº de juegos de la lista
+ROL_MINIATURA = Qt.ItemDataRole.UserRole + 5   # QPixmap escalado o None
+
+# Colores de las cartas. Las pinta el delegate a mano, así que no les
+# llegan las reglas de mainWindow.qss; son los mismos valores que usaban
+# QFrame#gameCard y QFrame#folderCard.
+_COLOR_FONDO_JUEGO = QColor("#34495e")
+_COLOR_FONDO_JUEGO_HOVER = QColor("#3d566e")
+_COLOR_BORDE_JUEGO = QColor("#4a6278")
+_COLOR_BORDE_JUEGO_HOVER = QColor("#3498db")
+_COLOR_FONDO_IMAGEN = QColor("#2c3e50")
+_COLOR_TEXTO_IMAGEN = QColor("#7f8c8d")
+_COLOR_FONDO_LISTA = QColor("#2c3e50")
+_COLOR_FONDO_LISTA_HOVER = QColor("#34495e")
+_COLOR_BORDE_LISTA = QColor("#e67e22")
+_COLOR_BORDE_LISTA_HOVER = QColor("#f39c12")
+_COLOR_TITULO = QColor("#ecf0f1")
+_COLOR_SECUNDARIO = QColor("#95a5a6")
+
+
+# Flags de drawText (int: combina alineación y ajuste de línea)
+_TEXTO_CENTRADO = Qt.AlignmentFlag.AlignCenter.value
+_TEXTO_ARRIBA = (Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop).value
+_TEXTO_ARRIBA_AJUSTADO = _TEXTO_ARRIBA | Qt.TextFlag.TextWordWrap.value
+
+
+def _texto_count(count):
+    return f"{count} juego{'s' if count != 1 else ''}"
+
+
+# Modelo de la biblioteca: una fila por carta del grid.
+# Cada elemento es (TIPO_LISTA, nombre_lista, count) o (TIPO_JUEGO, juego).
+#
+# No crea ningún widget: el coste de poblar() es una lista de tuplas, y las
+# portadas solo se piden a la ThumbnailCache cuando el delegate pide
+# ROL_MINIATURA, es decir, cuando la carta se pinta porque está en pantalla.
+class LibraryModel(QAbstractListModel):
+    # El usuario ha editado el título de un juego desde el grid
+    titulo_editado = pyqtSignal(object, str)  # juego, nuevo título
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._items = []
+        self._claves = []     # clave estable de cada fila (nombre_archivo o nombre de lista)
+        self._filas = {}      # clave → fila
+        # Portadas pedidas a la caché y aún no listas: ruta → clave de la fila
+        self._pendientes = {}
+        self._cache = obtener_cache()
+        self._cache.miniatura_lista.connect(self._on_miniatura_lista)
+
+    # Rellena el modelo con lo que se debe ver.
+    # Si filtro_lista es None (vista 'Todos'), una carta por cada lista y
+    # las cartas de los juegos sin lista; si es un nombre de lista, solo
+    # los juegos de esa lista.
+    # Si las cartas son las mismas y en el mismo orden (volver del juego,
+    # reescaneo sin altas ni bajas...) solo se notifica dataChanged, así la
+    # vista conserva scroll y hover; si no, se reinicia el modelo.
+    def poblar(self, juegos, filtro_lista=None):
+        items = []
+        claves = []
+        if filtro_lista is not None:
+            for juego in Lista.obtener_juegos_de_lista(filtro_lista, juegos):
+                items.append((TIPO_JUEGO, juego))
+                claves.append(juego.nombre_archivo)
+        else:
+            for nombre_lista in Lista.obtener_nombres():
+                count = len(Lista.obtener_juegos_de_lista(nombre_lista, juegos))
+                items.append((TIPO_LISTA, nombre_lista, count))
+                claves.append((TIPO_LISTA, nombre_lista))
+            for juego in Lista.obtener_juegos_de_lista(SIN_LISTA, juegos):
+                items.append((TIPO_JUEGO, juego))
+                claves.append(juego.nombre_archivo)
+
+        if claves == self._claves:
+            self._items = items
+            if items:
+                self.dataChanged.emit(self.index(0), self.index(len(items) - 1))
+            return
+
+        self.beginResetModel()
+        self._items = items
+        self._claves = claves
+        self._filas = {clave: fila for fila, clave in enumerate(claves)}
+        # Lo que se pidió para la vista anterior ya no corre prisa
+        self._pendientes.clear()
+        self._cache.cancelar_pendientes()
+        self.endResetModel()
+
+    # Refresca la carta de un juego (p. ej. cuando llega su portada).
+    # Se busca por nombre_archivo porque el escaneo puede haber sustituido
+    # el objeto Game.
+    def actualizar_juego(self, juego):
+        fila = self._filas.get(juego.nombre_archivo)
+        if fila is None:
+            return
+        self._items[fila][1].imagen = juego.imagen
+        if juego.imagen:
+            self._cache.invalidar(juego.imagen)
+        idx = self.index(fila)
+        self.dataChanged.emit(idx, idx)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._items)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._items):
+            return None
+        item = self._items[index.row()]
+        tipo = item[0]
+        if role == ROL_TIPO:
+            return tipo
+        if tipo == TIPO_LISTA:
+            if role in (Qt.ItemDataRole.DisplayRole, ROL_LISTA):
+                return item[1]
+            if role == ROL_COUNT:
+                return item[2]
+            return None
+        juego = item[1]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return juego.titulo
+        if role == ROL_JUEGO:
+            return juego
+        if role == ROL_MINIATURA:
+            return self._miniatura(juego)
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.isValid() and self._items[index.row()][0] == TIPO_JUEGO:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    # Edición del título desde el delegate
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid():
+            return False
+        item = self._items[index.row()]
+        nuevo = str(value).strip()
+        if item[0] != TIPO_JUEGO or not nuevo:
+            return False
+        self.titulo_editado.emit(item[1], nuevo)
+        self.dataChanged.emit(index, index)
+        return True
+
+    # Devuelve la miniatura de la portada si la caché la tiene en memoria.
+    # Si no, la caché la genera en segundo plano y devuelve None (el
+    # delegate pinta el placeholder hasta que llega miniatura_lista).
+    def _miniatura(self, juego):
+        ruta = juego.imagen
+        if not ruta:
+            return None
+        pixmap = self._cache.obtener(ruta, IMAGEN_LADO, IMAGEN_LADO)
+        if pixmap is None:
+            self._pendientes[ruta] = juego.nombre_archivo
+        return pixmap
+
+    # Una portada pedida ya está en memoria: repintar su fila
+    def _on_miniatura_lista(self, ruta):
+        clave = self._pendientes.pop(ruta, None)
+        fila = self._filas.get(clave)
+        if fila is not None:
+            idx = self.index(fila)
+            self.dataChanged.emit(idx, idx, [ROL_MINIATURA])
+
+
+# Pinta las cartas del grid (juego o lista) y gestiona el editor del título.
+# Solo se llama para las filas visibles, así el coste de pintar no depende
+# del tamaño de la biblioteca.
+class LibraryDelegate(QStyledItemDelegate):
+
+    def sizeHint(self, option, index):
+        return QSize(CARD_WIDTH, CARD_HEIGHT)
+
+    # Rectángulo de la carta dentro de la celda (centrada en horizontal)
+    @staticmethod
+    def rect_carta(rect_celda):
+        x = rect_celda.x() + (rect_celda.width() - CARD_WIDTH) // 2
+        return QRect(x, rect_celda.y(), CARD_WIDTH, CARD_HEIGHT)
+
+    # Zona del título del juego (doble clic para editar)
+    @staticmethod
+    def rect_titulo(rect_celda):
+        carta = LibraryDelegate.rect_carta(rect_celda)
+        return QRect(carta.x() + 10, carta.y() + 10 + IMAGEN_LADO + 8,
+                     CARD_WIDTH - 20, CARD_HEIGHT - IMAGEN_LADO - 36)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        hover = bool(option.state & QStyle.StateFlag.State_MouseOver)
+        carta = self.rect_carta(option.rect)
+        if index.data(ROL_TIPO) == TIPO_LISTA:
+            self._pintar_lista(painter, carta, index, hover)
+        else:
+            self._pintar_juego(painter, carta, option.rect, index, hover)
+        painter.restore()
+
+    @staticmethod
+    def _pintar_fondo(painter, rect, fondo, borde):
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(rect).adjusted(1, 1, -1, -1), 12, 12)
+        painter.fillPath(path, QBrush(fondo))
+        painter.setPen(QPen(borde, 2))
+        painter.drawPath(path)
+
+    def _pintar_juego(self, painter, carta, rect_celda, index, hover):
+        self._pintar_fondo(
+            painter, carta,
+            _COLOR_FONDO_JUEGO_HOVER if hover else _COLOR_FONDO_JUEGO,
+            _COLOR_BORDE_JUEGO_HOVER if hover else _COLOR_BORDE_JUEGO,
+        )
+
+        # Imagen (placeholder con la consola si no hay carátula o aún no ha cargado)
+        imagen = QRect(carta.x() + 10, carta.y() + 10, IMAGEN_LADO, IMAGEN_LADO)
+        path = QPainterPath()
+        path.addRoundedRect(QRectF(imagen), 8, 8)
+        painter.fillPath(path, QBrush(_COLOR_FONDO_IMAGEN))
+        pixmap = index.data(ROL_MINIATURA)
+        if pixmap is not None and not pixmap.isNull():
+            x = imagen.x() + (IMAGEN_LADO - pixmap.width()) // 2
+            y = imagen.y() + (IMAGEN_LADO - pixmap.height()) // 2
+            painter.drawPixmap(x, y, pixmap)
+        else:
+            juego = index.data(ROL_JUEGO)
+            painter.setPen(_COLOR_TEXTO_IMAGEN)
+            painter.setFont(self._fuente(14))
+            painter.drawText(imagen, _TEXTO_CENTRADO, juego.consola if juego else "")
+
+        # Título
+        painter.setPen(_COLOR_TITULO)
+        painter.setFont(self._fuente(14, negrita=True))
+        painter.drawText(
+            self.rect_titulo(rect_celda),
+            _TEXTO_ARRIBA_AJUSTADO,
+            index.data(Qt.ItemDataRole.DisplayRole) or "",
+        )
+
+    def _pintar_lista(self, painter, carta, index, hover):
+        self._pintar_fondo(
+            painter, carta,
+            _COLOR_FONDO_LISTA_HOVER if hover else _COLOR_FONDO_LISTA,
+            _COLOR_BORDE_LISTA_HOVER if hover else _COLOR_BORDE_LISTA,
+        )
+        interior = carta.adjusted(10, 10, -10, -10)
+
+        # Icono de carpeta
+        painter.setFont(self._fuente(64))
+        painter.drawText(QRect(interior.x(), interior.y(), interior.width(), 190),
+                         _TEXTO_CENTRADO, "📁")
+
+        # Nombre de la lista
+        painter.setPen(_COLOR_TITULO)
+        painter.setFont(self._fuente(14, negrita=True))
+        painter.drawText(
+            QRect(interior.x(), interior.y() + 196, interior.width(), 50),
+            _TEXTO_ARRIBA_AJUSTADO,
+            index.data(ROL_LISTA) or "",
+        )
+
+        # Contador de juegos
+        painter.setPen(_COLOR_SECUNDARIO)
+        painter.setFont(self._fuente(12))
+        painter.drawText(
+            QRect(interior.x(), interior.y() + 250, interior.width(), 24),
+            _TEXTO_ARRIBA,
+            _texto_count(index.data(ROL_COUNT) or 0),
+        )
+
+    @staticmethod
+    def _fuente(pixeles, negrita=False):
+        fuente = QFont()
+        fuente.setPixelSize(pixeles)
+        fuente.setBold(negrita)
+        return fuente
+
+    # --- Edición del título (doble clic) ---
+
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        editor.setObjectName("gameCardTitleEdit")
+        editor.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setText(index.data(Qt.ItemDataRole.EditRole) or "")
+        editor.selectAll()
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.text(), Qt.ItemDataRole.EditRole)
+
+    def updateEditorGeometry(self, editor, option, index):
+        titulo = self.rect_titulo(option.rect)
+        editor.setGeometry(titulo.x(), titulo.y(), titulo.width(), editor.sizeHint().height())
+
+
+# Grid virtualizado de la biblioteca (QListView en modo icono).
+# Sustituye a las cartas QWidget en un QGridLayout: la vista solo pide al
+# delegate las filas que están en pantalla y recoloca las celdas ella misma
+# al cambiar el tamaño, así el coste de memoria y de layout no crece con el
+# número de ROMs.
+#
+# Emite una señal por cada acción que antes emitían GameCard / ListCard /
+# GridContainerWidget, con el juego o la lista afectados.
+class LibraryGridView(QListView):
+    juego_clicked = pyqtSignal(object)             # juego
+    lista_clicked = pyqtSignal(str)                # nombre_lista
+    asignar_lista = pyqtSignal(object, str)        # juego, nombre_lista
+    eliminar_lista = pyqtSignal(object)            # juego
+    mover_lista = pyqtSignal(object, str)          # juego, nombre_lista
+    eliminar_lista_completa = pyqtSignal(str)      # nombre_lista
+    crear_lista = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("libraryGrid")
+        # None = vista 'Todos'; si no, la lista que se está mostrando
+        self.filtro_lista_actual = None
+
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setFlow(QListView.Flow.LeftToRight)
+        self.setWrapping(True)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setMovement(QListView.Movement.Static)
+        self.setUniformItemSizes(True)
+        self.setGridSize(QSize(CARD_WIDTH + CARD_SPACING, CARD_HEIGHT + CARD_SPACING))
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.verticalScrollBar().setSingleStep(30)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.setFrameShape(QFrame.Shape.NoFrame)
+        self.setMouseTracking(True)   # hover de las cartas
+
+        self.setItemDelegate(LibraryDelegate(self))
+
+    # Índice de la carta bajo 'pos' (coordenadas del viewport), o None si
+    # el punto cae en el hueco entre cartas
+    def _carta_en(self, pos):
+        index = self.indexAt(pos)
+        if not index.isValid():
+            return None
+        if not LibraryDelegate.rect_carta(self.visualRect(index)).contains(pos):
+            return None
+        return index
+
+    def _en_titulo(self, index, pos):
+        return (index.data(ROL_TIPO) == TIPO_JUEGO
+                and LibraryDelegate.rect_titulo(self.visualRect(index)).contains(pos))
+
+    # Clic izquierdo en una carta: abre el juego o la lista. En el título
+    # de un juego no hace nada, para poder hacer doble clic y editarlo.
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            pos = event.position().toPoint()
+            index = self._carta_en(pos)
+            if index is not None:
+                event.accept()
+                if self._en_titulo(index, pos):
+                    return
+                if index.data(ROL_TIPO) == TIPO_LISTA:
+                    self.lista_clicked.emit(index.data(ROL_LISTA))
+                else:
+                    self.juego_clicked.emit(index.data(ROL_JUEGO))
+                return
+        super().mousePressEvent(event)
+
+    # Doble clic en el título: editor en línea (ver LibraryDelegate)
+    def mouseDoubleClickEvent(self, event):
+        pos = event.position().toPoint()
+        index = self._carta_en(pos)
+        if index is not None and self._en_titulo(index, pos):
+            self.edit(index)
+            event.accept()
+            return
+        super().mouseDoubleClickEvent(event)
+
+    # Cursor de mano solo sobre las cartas
+    def mouseMoveEvent(self, event):
+        if self._carta_en(event.position().toPoint()) is not None:
+            self.viewport().setCursor(Qt.CursorShape.PointingHandCursor)
+        else:
+            self.viewport().unsetCursor()
+        super().mouseMoveEvent(event)
+
+    # Menú contextual: opciones de la carta bajo el cursor o, en el fondo
+    # de la vista 'Todos', crear una lista nueva
+    def contextMenuEvent(self, event):
+        index = self._carta_en(event.pos())
+        menu = QMenu(self)
+        menu.setObjectName("cardContextMenu")
+
+        if index is None:
+            if self.filtro_lista_actual is not None:
+                return
+            menu.addAction("Crear lista", self.crear_lista.emit)
+        elif index.data(ROL_TIPO) == TIPO_LISTA:
+            nombre_lista = index.data(ROL_LISTA)
+            menu.addAction("Eliminar lista",
+                lambda: self.eliminar_lista_completa.emit(nombre_lista))
+        else:
+            self._menu_juego(menu, index.data(ROL_JUEGO))
+
+        if not menu.isEmpty():
+            menu.exec(event.globalPos())
+
+    # Opciones del menú según la lista del juego y la vista actual
+    def _menu_juego(self, menu, juego):
+        lista_actual = juego.lista
+
+        if lista_actual == SIN_LISTA:
+            # Juego sin lista: opción de añadir
+            submenu_anadir = menu.addMenu("Añadir a lista")
+            submenu_anadir.setObjectName("cardContextMenu")
+            for nombre_lista in Lista.obtener_nombres():
+                submenu_anadir.addAction(nombre_lista,
+                    lambda nl=nombre_lista: self.asignar_lista.emit(juego, nl))
+            return
+
+        if self.filtro_lista_actual is not None and self.filtro_lista_actual != SIN_LISTA:
+            # Estamos en una lista específica: también se puede quitar de ella
+            menu.addAction("Eliminar de lista", lambda: self.eliminar_lista.emit(juego))
+
+        # "Mover a lista" (en "Todos los juegos", "Sin lista" o en una lista)
+        submenu_mover = menu.addMenu("Mover a lista")
+        submenu_mover.setObjectName("cardContextMenu")
+        for nombre_lista in Lista.obtener_nombres():
+            if nombre_lista != lista_actual:
+                submenu_mover.addAction(nombre_lista,
+                    lambda nl=nombre_lista: self.mover_lista.emit(juego, nl))
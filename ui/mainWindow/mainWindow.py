@@ -2,11 +2,14 @@
 import os
 import json
 import shutil  # Para copiar archivos ROM al hacer drag & drop
-from PyQt6.QtWidgets import QMainWindow, QMenu, QFileDialog, QLabel
-from PyQt6.QtGui import QPixmap
+import threading
+from PyQt6.QtWidgets import QMainWindow, QMenu, QFileDialog
 # QFileSystemWatcher: observa cambios en directorios/archivos del sistema
-from PyQt6.QtCore import QFileSystemWatcher, QTimer, Qt
+from PyQt6.QtCore import QFileSystemWatcher, QTimer, pyqtSignal
 from ui.mainWindow.mainWindowUI import MainWindowUI
+from ui.thumbnailCache import configurar_cache, obtener_cache
+from ui.iconExtractor import IconExtractor
+from ui.scrapingService import ScrapingService
 from ui.gameWindow.gameWindow import GameWindow
 from ui.configWindow.configWindow import ConfigWindow
 from ui.controlsWindow.controlsWindow import ControlsWindow
@@ -14,9 +17,13 @@ from ui.sidebar.sidebar import Sidebar
 from ui.popups.popupEliminar.popupEliminar import PopupEliminar
 from ui.popups.popupAnadir.popupAnadir import PopupAnadir
 from ui.gameDetailPage.gameDetailPage import GameDetailPage
-from game.game import Game, extraer_titulo_rom, EXTENSIONES_VALIDAS
+from game.game import Game, EXTENSIONES_VALIDAS
 from lista import Lista, SIN_LISTA
-from api.screenscraper import ScreenScraperAPI, obtener_ruta_portada, cargar_info_cache
+from api.screenscraper import (
+    ScreenScraperAPI, obtener_ruta_portada, cargar_info_cache, invalidar_metadatos, preparar_almacen,
+    migrar_almacen,
+)
+from api.rom_hashes import cerrar_hashes
 
 
 # Devuelve la ruta a un recurso empaquetado (ej: archivos QSS dentro de ui/).
@@ -44,31 +51,40 @@ def _get_base_path():
 # la sincronización bidireccional de ajustes (ConfigWindow ↔ GameSideBar),
 # la vigilancia de la carpeta games/ (QFileSystemWatcher) y el drag & drop de ROMs.
 class MainWindow(QMainWindow):
+    # Migración de la caché de ScreenScraper (se emiten desde su hilo)
+    _progreso_migracion = pyqtSignal(int, int)     # hechos, total
+    _migracion_terminada = pyqtSignal(object)      # almacén de origen, o None si falló
+    _origen_borrado = pyqtSignal()
+
     def __init__(self):
         super().__init__()
 
         # --- Declaración de todas las variables de instancia ---
         self.ui = None
         self.juegos = []
-        self.cartas_juego = {}
-        self.labels_juego = {}
-        self.botones_carpeta = {}
         self.game_page = None
         self.config_page = None
         self.controls_page = None
         self.detail_page = None
         self.scraper_api = None
+        self.scraper = None
 
         self.sidebar = None
         self._ruta_games = None
         self._ruta_cores = None
         self._archivos_actuales = set()
         self._watcher = None
+        self._scraper_cache_dir = None
+        self._extractor = None
         self._filtro_lista_actual = None  # None = todos
         self._prev_ds_renderer_index = 0  # para detectar cambios de renderer DS
         self._prev_ds_resolution_index = 0
         self._prev_citra_resolution_index = 0
 
+        # Caché de miniaturas compartida (grid, sidebar, detalle). Se crea
+        # antes que la UI porque el modelo del grid la toma al construirse.
+        configurar_cache(os.path.join(_get_base_path(), "cache", "thumbnails"))
+
         # --- Configuración de la UI ---
         self.ui = MainWindowUI()
         self.ui.setupUi(self)
@@ -91,7 +107,19 @@ class MainWindow(QMainWindow):
         os.makedirs(ruta_games, exist_ok=True)
         os.makedirs(ruta_cores, exist_ok=True)
 
-        self.juegos = Game.escanear_juegos(ruta_games, ruta_cores)
+        # Página de configuración (se carga ya porque el escaneo usa sus ajustes;
+        # se añade al stackedWidget más abajo)
+        self.config_page = ConfigWindow()
+        self.config_page.set_config_path(os.path.join(base, "config.json"))
+        # Formato de la caché de ScreenScraper. Si en disco está en el otro
+        # formato se sigue usando ese hasta que _migrar_cache_scraper la pase
+        migracion_cache = preparar_almacen(ruta_games, self.config_page.cache_unificada)
+
+        # Los iconos de las ROMs nuevas se extraen en segundo plano: el grid
+        # sale ya con placeholders y cada icono llega por icono_listo
+        self._extractor = IconExtractor(self.config_page.icon_workers, parent=self)
+        self._extractor.icono_listo.connect(self._on_icono_listo)
+        self.juegos = Game.escanear_juegos(ruta_games, ruta_cores, self._extractor)
 
         # Usar portadas cacheadas como imagen de la carta
         for juego in self.juegos:
@@ -99,9 +127,9 @@ class MainWindow(QMainWindow):
             if portada:
                 juego.imagen = portada
 
-        # Poblar el grid con cartas y conectar
-        self.cartas_juego, self.labels_juego, self.botones_carpeta = self.ui.poblar_grid(self.juegos)
-        self._conectar_cartas()
+        # Poblar el grid y conectar las acciones de sus cartas
+        self.ui.poblar_grid(self.juegos)
+        self._conectar_grid()
 
         # Conectar botón de volver
         self.ui.btn_volver.clicked.connect(self._mostrar_todos)
@@ -109,9 +137,6 @@ class MainWindow(QMainWindow):
         # Conectar botón de añadir juego
         self.ui.btn_anadir_juego.clicked.connect(self._anadir_juego_desde_dialogo)
 
-        # Conectar señal de crear lista desde el click derecho en el grid
-        self.ui.gridContainer.crear_lista.connect(self._mostrar_popup_crear_lista)
-
         # Crear controlador de la sidebar y conectar señales
         self.sidebar = Sidebar(parent=self)
         self.ui.sidebar.setParent(None)  # quitar la SidebarUI por defecto
@@ -125,8 +150,6 @@ class MainWindow(QMainWindow):
         self.sidebar.lista_borrada.connect(self._borrar_lista)
 
         # Página de configuración
-        self.config_page = ConfigWindow()
-        self.config_page.set_config_path(os.path.join(base, "config.json"))
         self.ui.stackedWidget.addWidget(self.config_page)  # index 1
         self.controls_page = ControlsWindow()
         self.controls_page.set_config_path(os.path.join(base, "config.json"))
@@ -154,13 +177,20 @@ class MainWindow(QMainWindow):
         self.scraper_api = ScreenScraperAPI(
             devid=ss_devid, devpassword=ss_devpassword
         )
+        # Cola única de scraping (juegos nuevos, página de detalle y
+        # "Scrapear biblioteca")
+        self.scraper = ScrapingService(self.scraper_api, ruta_games, parent=self)
+        self.scraper.juego_scrapeado.connect(self._on_juego_scrapeado)
+        self.scraper.progreso.connect(self._on_progreso_scrapeo)
+        self.scraper.galeria_diferida = self.config_page.galeria_diferida
+        self.config_page.galeria_diferida_cambiada.connect(self._on_galeria_diferida_cambiada)
+        self.ui.btn_scrapear.clicked.connect(self._scrapear_biblioteca)
 
         # Página de detalle del juego
-        self.detail_page = GameDetailPage(self.scraper_api, ruta_games)
+        self.detail_page = GameDetailPage(self.scraper, ruta_games)
         self.ui.stackedWidget.addWidget(self.detail_page)  # index 4
         self.detail_page.jugar_signal.connect(self._jugar)
         self.detail_page.volver_signal.connect(self._volver_menu)
-        self.detail_page.portada_actualizada.connect(self._on_portada_actualizada)
 
         # Sincronizar game sidebar → config page
         self.game_page.sidebar.volumen_cambiado.connect(self._on_game_sidebar_volume)
@@ -172,9 +202,11 @@ class MainWindow(QMainWindow):
         # Mostrar la ruta de games en el label
         self.ui.games_path_label.setText(f"Ruta de juegos: {os.path.abspath(ruta_games)}")
         self._archivos_actuales = Game.obtener_archivos_rom(ruta_games)
-        scraper_cache_dir = os.path.join(ruta_games, "scraper_cache")
+        scraper_cache_dir = self._scraper_cache_dir = os.path.join(ruta_games, "scraper_cache")
         os.makedirs(scraper_cache_dir, exist_ok=True)
         self._watcher = QFileSystemWatcher([ruta_games, scraper_cache_dir], self)
+        # Antes que el reescaneo: este ya debe leer portadas sin caché vieja
+        self._watcher.directoryChanged.connect(self._on_carpeta_vigilada_cambiada)
         self._watcher.directoryChanged.connect(self._on_games_folder_changed)
 
         # Conectar navegación de la cabecera
@@ -183,6 +215,58 @@ class MainWindow(QMainWindow):
         # Habilitar drag & drop de archivos
         self.setAcceptDrops(True)
 
+        self._progreso_migracion.connect(self.ui.mostrar_progreso_migracion)
+        self._migracion_terminada.connect(self._on_migracion_terminada)
+        self._origen_borrado.connect(self._on_origen_borrado)
+        if migracion_cache:
+            self._migrar_cache_scraper()
+
+    # Pasa la caché de ScreenScraper al formato elegido en la configuración
+    # (carpetas ↔ un solo archivo) en un hilo aparte, con su barra de
+    # progreso. Mientras tanto la biblioteca sigue leyendo el formato
+    # anterior, que no se borra hasta que la migración ha terminado.
+    #
+    # scraper_cache deja de vigilarse mientras dura la copia y el borrado
+    # del formato anterior: cada carpeta de juego creada o borrada haría
+    # reescanear la biblioteca entera. Se vuelve a vigilar en
+    # _on_origen_borrado (o al fallar la migración).
+    def _migrar_cache_scraper(self):
+        unificada = self.config_page.cache_unificada
+        self.ui.mostrar_progreso_migracion(0, 1)
+        self._watcher.removePath(self._scraper_cache_dir)
+
+        def migrar():
+            try:
+                origen = migrar_almacen(self._ruta_games, unificada, self._progreso_migracion.emit)
+            except Exception as e:
+                print(f"[ScreenScraper] Error migrando la caché: {e}")
+                origen = None
+            self._migracion_terminada.emit(origen)
+
+        threading.Thread(target=migrar, name="migracion-cache", daemon=True).start()
+
+    # Ya se lee del formato nuevo: refrescar las portadas y borrar el
+    # anterior (también en segundo plano)
+    def _on_migracion_terminada(self, origen):
+        self.ui.mostrar_progreso_migracion(0, 0)
+        if origen is None:
+            self._watcher.addPath(self._scraper_cache_dir)
+            return
+        for juego in self.juegos:
+            portada = obtener_ruta_portada(self._ruta_games, juego.nombre_archivo)
+            if portada:
+                juego.imagen = portada
+        self.ui.poblar_grid(self.juegos, self._filtro_lista_actual)
+
+        def borrar():
+            origen.borrar()
+            self._origen_borrado.emit()
+
+        threading.Thread(target=borrar, name="migracion-cache-borrado", daemon=True).start()
+
+    def _on_origen_borrado(self):
+        self._watcher.addPath(self._scraper_cache_dir)
+
     # Devuelve los bindings de la consola cuyo core está corriendo ahora mismo.
     # Se elige por extensión de la ROM para que las asignaciones de DS y 3DS
     # no se pisen entre sí cuando comparten teclas (p.ej. WASD en D-pad DS
@@ -212,7 +296,7 @@ class MainWindow(QMainWindow):
     # Carga el juego seleccionado y cambia a la página de juego
     def _jugar(self, juego):
         # Extraer el título interno de la ROM para debug
-        titulo_rom = extraer_titulo_rom(juego.ruta_juego, juego.extension)
+        titulo_rom = juego.titulo_rom
         if titulo_rom:
             print(f"[ROM] Título interno: {titulo_rom}")
         else:
@@ -222,6 +306,10 @@ class MainWindow(QMainWindow):
         # Sincronizar config → game sidebar antes de mostrar
         self._sync_config_to_game_sidebar()
         self.ui.stackedWidget.setCurrentWidget(self.game_page)
+        # Modo de ejecución (hilo de emulación dedicado o tick del QTimer)
+        self.game_page.emulation_thread = self.config_page.emulation_thread
+        self.game_page.audio_latency_ms = self.config_page.audio_latency_ms
+        self.game_page.rewind_config = self.config_page.rewind_config
         # Cargar juego con las opciones gráficas actuales
         self.game_page.load_game(juego, self._build_core_options_extra())
         # Aplicar bindings DESPUÉS de load_game (que recrea el widget)
@@ -241,7 +329,7 @@ class MainWindow(QMainWindow):
 
     # Espera a que el archivo ROM esté completamente escrito antes de scrapearlo.
     # Comprueba el tamaño cada 500 ms; cuando es estable y el archivo se puede
-    # abrir (no está bloqueado), lanza scrape_en_background.
+    # abrir (no está bloqueado), lo encola en el servicio de scraping.
     def _esperar_archivo_listo(self, juego, tamano_anterior=None):
         try:
             tamano_actual = os.path.getsize(juego.ruta_juego)
@@ -256,10 +344,17 @@ class MainWindow(QMainWindow):
             except PermissionError:
                 QTimer.singleShot(500, lambda j=juego, t=tamano_actual: self._esperar_archivo_listo(j, t))
                 return
-            self.detail_page.scrape_en_background(juego)
+            self.scraper.encolar(juego)
         else:
             QTimer.singleShot(500, lambda j=juego, t=tamano_actual: self._esperar_archivo_listo(j, t))
 
+    # Un cambio en scraper_cache (carpetas de juegos creadas, borradas o
+    # renombradas fuera de la app) deja vieja la caché en memoria de
+    # portadas e info de ScreenScraper
+    def _on_carpeta_vigilada_cambiada(self, ruta):
+        if os.path.basename(os.path.normpath(ruta)) == "scraper_cache":
+            invalidar_metadatos()
+
     # Re-escanea la carpeta games/ y reconstruye el grid de cartas.
     # Se ejecuta automáticamente cuando QFileSystemWatcher detecta un cambio.
     def _on_games_folder_changed(self):
@@ -267,15 +362,18 @@ class MainWindow(QMainWindow):
         nuevos_nombres = archivos_nuevos - self._archivos_actuales
         Game.migrar_renombrados(self._ruta_games, self._archivos_actuales, archivos_nuevos)
         self._archivos_actuales = archivos_nuevos
-        self.juegos = Game.escanear_juegos(self._ruta_games, self._ruta_cores)
+        # Lo que quedara en cola del escaneo anterior puede ya no existir;
+        # el nuevo escaneo vuelve a encolar los iconos que sigan faltando
+        self._extractor.cancelar()
+        self._extractor.set_max_workers(self.config_page.icon_workers)
+        self.juegos = Game.escanear_juegos(self._ruta_games, self._ruta_cores, self._extractor)
         for juego in self.juegos:
             portada = obtener_ruta_portada(self._ruta_games, juego.nombre_archivo)
             if portada:
                 juego.imagen = portada
-        self.cartas_juego, self.labels_juego, self.botones_carpeta = self.ui.poblar_grid(
+        self.ui.poblar_grid(
             self.juegos, self._filtro_lista_actual
         )
-        self._conectar_cartas()
         self._poblar_sidebar()
         for juego in self.juegos:
             if juego.nombre_archivo in nuevos_nombres:
@@ -297,10 +395,9 @@ class MainWindow(QMainWindow):
         self.ui.header.set_active(0)
         self.ui.stackedWidget.setCurrentIndex(0)
         # Refrescar el grid por si se descargaron portadas nuevas
-        self.cartas_juego, self.labels_juego, self.botones_carpeta = self.ui.poblar_grid(
+        self.ui.poblar_grid(
             self.juegos, self._filtro_lista_actual
         )
-        self._conectar_cartas()
 
     # Cambia entre páginas del stacked widget (0=Biblioteca, 1=Config, 2=Controles)
     def _navegar(self, index):
@@ -312,6 +409,9 @@ class MainWindow(QMainWindow):
         if audio_mgr:
             audio_mgr.volume = value / 100.0
 
+    def _on_galeria_diferida_cambiada(self, diferida):
+        self.scraper.galeria_diferida = diferida
+
     # Recarga los controles en el InputManager del juego activo
     def _on_controls_changed(self):
         self.game_page.game_widget.set_pending_bindings(
@@ -403,19 +503,20 @@ class MainWindow(QMainWindow):
     #  Sidebar helpers
     # ------------------------------------------------------------------
 
-    # Conecta señales de clic de las cartas y etiquetas editables del grid
-    def _conectar_cartas(self):
-        for carta, juego in self.cartas_juego.items():
-            carta.clicked.connect(lambda j=juego: self._mostrar_detalle(j))
-            # Conectar señales del menú contextual
-            carta.asignar_lista.connect(lambda nl, j=juego: self._asignar_lista(j, nl))
-            carta.eliminar_lista.connect(lambda j=juego: self._eliminar_lista(j))
-            carta.mover_lista.connect(lambda nl, j=juego: self._mover_lista(j, nl))
-        for lbl, juego in self.labels_juego.items():
-            lbl.texto_cambiado.connect(lambda texto, j=juego: self._renombrar_juego(j, texto))
-        for carta, nombre_lista in self.botones_carpeta.items():
-            carta.clicked.connect(lambda nl=nombre_lista: self._filtrar_por_lista(nl))
-            carta.eliminar_lista.connect(lambda nl=nombre_lista: self._eliminar_lista_completa(nl))
+    # Conecta las acciones de las cartas del grid (clic, menú contextual,
+    # edición del título). La vista y el modelo viven lo que la ventana, así
+    # que se conectan una sola vez.
+    def _conectar_grid(self):
+        grid = self.ui.gridView
+        grid.juego_clicked.connect(self._mostrar_detalle)
+        grid.lista_clicked.connect(self._filtrar_por_lista)
+        grid.asignar_lista.connect(self._asignar_lista)
+        grid.eliminar_lista.connect(self._eliminar_lista)
+        grid.mover_lista.connect(self._mover_lista)
+        grid.eliminar_lista_completa.connect(self._eliminar_lista_completa)
+        # Crear lista desde el click derecho en el fondo del grid
+        grid.crear_lista.connect(self._mostrar_popup_crear_lista)
+        self.ui.gridModel.titulo_editado.connect(self._renombrar_juego)
 
     # Reconstruye la barra lateral con los datos actuales
     def _poblar_sidebar(self):
@@ -424,23 +525,17 @@ class MainWindow(QMainWindow):
     # Filtra las cartas del grid por la lista seleccionada
     def _filtrar_por_lista(self, nombre_lista):
         self._filtro_lista_actual = nombre_lista
-        self.cartas_juego, self.labels_juego, self.botones_carpeta = self.ui.poblar_grid(
+        self.ui.poblar_grid(
             self.juegos, nombre_lista
         )
-        self._conectar_cartas()
-        # Actualizar el filtro en el gridContainer
-        self.ui.gridContainer.filtro_lista_actual = nombre_lista
         # Mostrar botón de volver
         self.ui.btn_volver.show()
 
     # Muestra todos los juegos (sin filtro de lista)
     def _mostrar_todos(self):
         self._filtro_lista_actual = None
-        self.cartas_juego, self.labels_juego, self.botones_carpeta = self.ui.poblar_grid(self.juegos)
-        self._conectar_cartas()
+        self.ui.poblar_grid(self.juegos)
         self._poblar_sidebar()
-        # Actualizar el filtro en el gridContainer
-        self.ui.gridContainer.filtro_lista_actual = None
         # Ocultar botón de volver
         self.ui.btn_volver.hide()
 
@@ -453,24 +548,36 @@ class MainWindow(QMainWindow):
                 Lista.crear_lista(nombre_lista)
                 self._mostrar_todos()
 
+    # Un icono extraído en segundo plano está listo: refrescar su carta y
+    # su entrada en la barra lateral
+    def _on_icono_listo(self, juego):
+        self.ui.actualizar_carta(juego)
+        self.sidebar.actualizar_icono(juego)
+
     # Actualiza la imagen de la carta del grid cuando llega la portada de ScreenScraper.
-    # Se compara por nombre_archivo (no por identidad de objeto) porque el
+    # Se busca por nombre_archivo (no por identidad de objeto) porque el
     # QFileSystemWatcher puede recrear los objetos Game mientras el scraper trabaja.
-    def _on_portada_actualizada(self, juego):
-        for carta, j in self.cartas_juego.items():
-            if j.nombre_archivo == juego.nombre_archivo:
-                j.imagen = juego.imagen
-                imagen_label = carta.findChild(QLabel, "gameCardImage")
-                if imagen_label and juego.imagen and os.path.exists(juego.imagen):
-                    pixmap = QPixmap(juego.imagen).scaled(
-                        200, 200,
-                        Qt.AspectRatioMode.KeepAspectRatio,
-                        Qt.TransformationMode.SmoothTransformation,
-                    )
-                    imagen_label.setPixmap(pixmap)
-                    imagen_label.setText("")
+    def _on_juego_scrapeado(self, juego, info):
+        portada = obtener_ruta_portada(self._ruta_games, juego.nombre_archivo)
+        if not portada:
+            return
+        for actual in self.juegos:
+            if actual.nombre_archivo == juego.nombre_archivo:
+                actual.imagen = portada
+                self.ui.actualizar_carta(actual)
                 break
 
+    # Botón "Scrapear biblioteca": encola todos los juegos sin información
+    # de ScreenScraper, o cancela lo pendiente si ya hay un scrapeo en marcha
+    def _scrapear_biblioteca(self):
+        if self.scraper.activo:
+            self.scraper.cancelar()
+        elif not self.scraper.encolar_biblioteca(self.juegos):
+            print("[ScreenScraper] Todos los juegos tienen ya su información")
+
+    def _on_progreso_scrapeo(self, hechos, total):
+        self.ui.mostrar_progreso_scrapeo(hechos, total)
+
     # Abre la página de detalle de un juego (con info de ScreenScraper)
     def _mostrar_detalle(self, juego):
         self.detail_page.mostrar_juego(juego)
@@ -480,30 +587,27 @@ class MainWindow(QMainWindow):
     def _asignar_lista(self, juego, nombre_lista):
         juego.lista = nombre_lista
         # Refrescar grid y sidebar
-        self.cartas_juego, self.labels_juego, self.botones_carpeta = self.ui.poblar_grid(
+        self.ui.poblar_grid(
             self.juegos, self._filtro_lista_actual
         )
-        self._conectar_cartas()
         self._poblar_sidebar()
 
     # Elimina un juego de su lista actual
     def _eliminar_lista(self, juego):
         juego.lista = SIN_LISTA
         # Refrescar grid y sidebar
-        self.cartas_juego, self.labels_juego, self.botones_carpeta = self.ui.poblar_grid(
+        self.ui.poblar_grid(
             self.juegos, self._filtro_lista_actual
         )
-        self._conectar_cartas()
         self._poblar_sidebar()
 
     # Mueve un juego a una lista diferente
     def _mover_lista(self, juego, nombre_lista):
         juego.lista = nombre_lista
         # Refrescar grid y sidebar
-        self.cartas_juego, self.labels_juego, self.botones_carpeta = self.ui.poblar_grid(
+        self.ui.poblar_grid(
             self.juegos, self._filtro_lista_actual
         )
-        self._conectar_cartas()
         self._poblar_sidebar()
 
     # Elimina una lista completa y mueve sus juegos a "Todos los juegos"
@@ -534,16 +638,6 @@ class MainWindow(QMainWindow):
                 self._mostrar_detalle(juego)
                 return
 
-    # Reflow inicial cuando la ventana ya tiene su tamaño real
-    def showEvent(self, event):
-        super().showEvent(event)
-        self.ui._reflow_grid()
-
-    # Recalcula las columnas del grid al redimensionar la ventana
-    def resizeEvent(self, event):
-        super().resizeEvent(event)
-        self.ui._reflow_grid()
-
     # ── Drag & Drop de archivos ROM ──
     # Permite arrastrar archivos .nds/.3ds desde el explorador hacia la ventana.
 
@@ -630,7 +724,12 @@ class MainWindow(QMainWindow):
 
         self._on_games_folder_changed()
 
-    # Al cerrar la ventana, descargar el core si estaba activo
+    # Al cerrar la ventana, descargar el core si estaba activo y parar los
+    # hilos de iconos, scraping, hashes y de la caché de miniaturas
     def closeEvent(self, event):
         self.game_page.unload_game()
+        self._extractor.cerrar()
+        self.scraper.cerrar()
+        cerrar_hashes()
+        obtener_cache().cerrar()
         super().closeEvent(event)
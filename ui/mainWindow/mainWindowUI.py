@@ -1,111 +1,16 @@
 # ── Imports ──────────────────────────────────────────────────────
-import os
 from PyQt6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
-    QLabel, QPushButton, QStackedWidget, QScrollArea,
-    QFrame, QSizePolicy, QMenu
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+    QLabel, QPushButton, QStackedWidget, QProgressBar
 )
-from PyQt6.QtCore import Qt, QSize, pyqtSignal
-from PyQt6.QtGui import QPixmap
-from ui.editableLabel.editableLabel import EditableLabel
+from PyQt6.QtCore import Qt
 from ui.header.header import Header
 from ui.sidebar.sidebarUI import SidebarUI
-from lista import Lista, SIN_LISTA
-
-
-# QFrame que emite una señal clicked al hacer clic.
-# Se usa como contenedor clickeable para las cartas de juego.
-class ClickableFrame(QFrame):
-    clicked = pyqtSignal()
-
-    def mousePressEvent(self, event):
-        if event.button() == Qt.MouseButton.LeftButton:
-            self.clicked.emit()
-        super().mousePressEvent(event)
-
-
-# Tarjeta de juego con soporte para menú contextual (click derecho)
-class GameCard(ClickableFrame):
-    # Señales para las acciones del menú contextual
-    asignar_lista = pyqtSignal(str)  # nombre_lista
-    eliminar_lista = pyqtSignal()
-    mover_lista = pyqtSignal(str)  # nombre_lista
-    
-    def __init__(self, juego, filtro_lista_actual=None):
-        super().__init__()
-        self.juego = juego
-        self.filtro_lista_actual = filtro_lista_actual
-    
-    # Muestra menú contextual con opciones según la lista del juego.
-    def contextMenuEvent(self, event):
-        menu = QMenu(self)
-        menu.setObjectName("cardContextMenu")
-        
-        lista_actual = self.juego.lista
-        
-        if lista_actual == SIN_LISTA:
-            # Juego sin lista: opción de añadir
-            submenu_anadir = menu.addMenu("Añadir a lista")
-            submenu_anadir.setObjectName("cardContextMenu")
-            for nombre_lista in Lista.obtener_nombres():
-                submenu_anadir.addAction(nombre_lista, 
-                    lambda nl=nombre_lista: self.asignar_lista.emit(nl))
-        elif self.filtro_lista_actual is None or self.filtro_lista_actual == SIN_LISTA:
-            # Estamos en "Todos los juegos" o en "Sin lista": solo mostrar "Mover a lista"
-            submenu_mover = menu.addMenu("Mover a lista")
-            submenu_mover.setObjectName("cardContextMenu")
-            for nombre_lista in Lista.obtener_nombres():
-                if nombre_lista != lista_actual:
-                    submenu_mover.addAction(nombre_lista,
-                        lambda nl=nombre_lista: self.mover_lista.emit(nl))
-        else:
-            # Estamos en una lista específica: opciones de eliminar y mover
-            menu.addAction("Eliminar de lista", self.eliminar_lista.emit)
-            
-            submenu_mover = menu.addMenu("Mover a lista")
-            submenu_mover.setObjectName("cardContextMenu")
-            for nombre_lista in Lista.obtener_nombres():
-                if nombre_lista != lista_actual:
-                    submenu_mover.addAction(nombre_lista,
-                        lambda nl=nombre_lista: self.mover_lista.emit(nl))
-        
-        menu.exec(event.globalPos())
-
-
-# Tarjeta de lista/carpeta con soporte para menú contextual (click derecho)
-class ListCard(ClickableFrame):
-    # Señal para eliminar la lista
-    eliminar_lista = pyqtSignal(str)  # nombre_lista
-    
-    def __init__(self, nombre_lista):
-        super().__init__()
-        self.nombre_lista = nombre_lista
-    
-    # Muestra menú contextual con opción de eliminar lista.
-    def contextMenuEvent(self, event):
-        menu = QMenu(self)
-        menu.setObjectName("cardContextMenu")
-        menu.addAction("Eliminar lista",
-            lambda: self.eliminar_lista.emit(self.nombre_lista))
-        menu.exec(event.globalPos())
-
-
-# Widget custom para el grid container que captura clicks derechos
-class GridContainerWidget(QWidget):
-    crear_lista = pyqtSignal()
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.filtro_lista_actual = None
-    
-    # Muestra menú contextual al hacer click derecho en el fondo del grid.
-    def contextMenuEvent(self, event):
-        # Solo mostrar el menú si estamos en "Todos los juegos"
-        if self.filtro_lista_actual is None:
-            menu = QMenu(self)
-            menu.setObjectName("cardContextMenu")
-            menu.addAction("Crear lista", self.crear_lista.emit)
-            menu.exec(event.globalPos())
+from ui.libraryGrid.libraryGrid import LibraryModel, LibraryGridView
+
+
+_TEXTO_SCRAPEAR = "⟳ Scrapear biblioteca"
+_TEXTO_CANCELAR_SCRAPEO = "✕ Cancelar scrapeo"
 
 
 # UI principal: contiene un QStackedWidget para navegar entre páginas.
@@ -122,15 +27,18 @@ class MainWindowUI:
         self.menuPage = None
         # Sidebar (widget externo)
         self.sidebar = None
-        # Grid de cartas (panel derecho)
-        self.scrollArea = None
-        self.gridContainer = None
-        self.gridLayout = None
-        self._cartas = []
+        # Grid de cartas (panel derecho, model/view)
+        self.gridModel = None
+        self.gridView = None
         self._filtro_lista = None  # None = mostrar todos
         # Label de ruta de games
         self.games_path_label = None
         self.btn_anadir_juego = None
+        # Scrapeo de toda la biblioteca
+        self.btn_scrapear = None
+        self.scrape_progress = None
+        # Migración de la caché de ScreenScraper entre formatos
+        self.cache_progress = None
 
     def setupUi(self, MainWindow):
         MainWindow.setObjectName("MainWindow")
@@ -192,6 +100,28 @@ class MainWindowUI:
         # Stretch para separar el botón del label
         topLayout.addStretch()
 
+        # Progreso de la migración de la caché de ScreenScraper (solo
+        # visible mientras se pasa de un formato a otro)
+        self.cache_progress = QProgressBar()
+        self.cache_progress.setObjectName("cacheProgress")
+        self.cache_progress.setFormat("Migrando caché %v/%m")
+        self.cache_progress.setMaximumWidth(220)
+        self.cache_progress.hide()
+        topLayout.addWidget(self.cache_progress, alignment=Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+        # Progreso del scrapeo (solo visible mientras hay juegos en cola)
+        self.scrape_progress = QProgressBar()
+        self.scrape_progress.setObjectName("scrapeProgress")
+        self.scrape_progress.setFormat("Scrapeando %v/%m")
+        self.scrape_progress.setMaximumWidth(220)
+        self.scrape_progress.hide()
+        topLayout.addWidget(self.scrape_progress, alignment=Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
+        # Botón para scrapear todos los juegos sin información de ScreenScraper
+        self.btn_scrapear = QPushButton(_TEXTO_SCRAPEAR)
+        self.btn_scrapear.setObjectName("scrapeLibraryButton")
+        topLayout.addWidget(self.btn_scrapear, alignment=Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+
         # Botón para añadir un juego desde el explorador de archivos
         self.btn_anadir_juego = QPushButton("+ Añadir juego")
         self.btn_anadir_juego.setObjectName("addGameButton")
@@ -205,19 +135,11 @@ class MainWindowUI:
 
         rightLayout.addLayout(topLayout)
 
-        self.scrollArea = QScrollArea()
-        self.scrollArea.setObjectName("scrollArea")
-        self.scrollArea.setWidgetResizable(True)
-        self.scrollArea.setFrameShape(QFrame.Shape.NoFrame)
-        rightLayout.addWidget(self.scrollArea)
-
-        self.gridContainer = GridContainerWidget()
-        self.gridContainer.setObjectName("gridContainer")
-        self.gridLayout = QGridLayout(self.gridContainer)
-        self.gridLayout.setSpacing(20)
-        self.gridLayout.setContentsMargins(10, 10, 10, 10)
-        self.gridLayout.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
-        self.scrollArea.setWidget(self.gridContainer)
+        # Grid virtualizado: solo se pintan las cartas visibles
+        self.gridModel = LibraryModel()
+        self.gridView = LibraryGridView()
+        self.gridView.setModel(self.gridModel)
+        rightLayout.addWidget(self.gridView)
 
         menuLayout.addWidget(rightPanel)
 
@@ -232,156 +154,29 @@ class MainWindowUI:
     #  Cartas (panel derecho)
     # ------------------------------------------------------------------
 
-    # Crea un widget 'carta' con imagen y nombre editable para un juego
-    def crear_carta(self, juego, filtro_lista_actual=None):
-        carta = GameCard(juego, filtro_lista_actual)
-        carta.setObjectName("gameCard")
-        carta.setFixedSize(220, 300)
-        carta.setCursor(Qt.CursorShape.PointingHandCursor)
-        carta.setProperty("nombre_archivo", juego.nombre_archivo)
-
-        layout = QVBoxLayout(carta)
-        layout.setContentsMargins(10, 10, 10, 10)
-        layout.setSpacing(8)
-
-        # Imagen (placeholder si no hay carátula)
-        imagen_label = QLabel()
-        imagen_label.setObjectName("gameCardImage")
-        imagen_label.setFixedSize(200, 200)
-        imagen_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        if juego.imagen and os.path.exists(juego.imagen):
-            pixmap = QPixmap(juego.imagen).scaled(
-                200, 200,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            imagen_label.setPixmap(pixmap)
-        else:
-            imagen_label.setText(juego.consola)
-
-        layout.addWidget(imagen_label, alignment=Qt.AlignmentFlag.AlignCenter)
-
-        # Nombre del juego (editable con doble clic)
-        nombre_label = EditableLabel(juego.titulo)
-        layout.addWidget(nombre_label)
-
-        layout.addStretch()
-
-        return carta, nombre_label
-
-    # Ancho fijo de cada carta + spacing del grid
-    CARD_WIDTH = 220
-    CARD_SPACING = 20
-
-    # Crea una carta visual para una carpeta/lista del grid
-    def crear_carta_carpeta(self, nombre_lista, count):
-        carta = ListCard(nombre_lista)
-        carta.setObjectName("folderCard")
-        carta.setFixedSize(self.CARD_WIDTH, 300)
-        carta.setCursor(Qt.CursorShape.PointingHandCursor)
-
-        layout = QVBoxLayout(carta)
-        layout.setContentsMargins(10, 10, 10, 10)
-        layout.setSpacing(6)
-
-        # Icono de carpeta
-        icono_label = QLabel("📁")
-        icono_label.setObjectName("folderCardIcon")
-        icono_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(icono_label, stretch=1)
-
-        # Nombre de la lista
-        nombre_label = QLabel(nombre_lista)
-        nombre_label.setObjectName("folderCardName")
-        nombre_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        nombre_label.setWordWrap(True)
-        layout.addWidget(nombre_label)
-
-        # Contador de juegos
-        texto_count = f"{count} juego{'s' if count != 1 else ''}"
-        count_label = QLabel(texto_count)
-        count_label.setObjectName("folderCardCount")
-        count_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(count_label)
-
-        layout.addStretch()
-
-        return carta
-
-    # Llena el grid con cartas generadas dinámicamente.
+    # Muestra en el grid las cartas de la vista indicada.
     # Si filtro_lista es None (vista 'Todos'), muestra una carta por cada carpeta
-    # con juegos y las cartas de los juegos sin carpeta asignada.
+    # y las cartas de los juegos sin carpeta asignada.
     # Si filtro_lista es un nombre de lista, solo muestra los juegos de esa lista.
-    # Devuelve 4 dicts para que MainWindow pueda conectar señales a cada carta.
+    # Las señales de las cartas las emite gridView (ver LibraryGridView).
     def poblar_grid(self, juegos, filtro_lista=None):
         self._filtro_lista = filtro_lista
-
-        # Guardar referencias para poder reposicionar al cambiar tamaño
-        self._cartas = []
-
-        # Limpiar grid existente
-        while self.gridLayout.count():
-            item = self.gridLayout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
-        cartas_juego = {}
-        labels = {}
-        carpetas = {}
-        borrar_carpetas = {}
-
-        if filtro_lista is not None:
-            # Filtro activo: mostrar solo los juegos de esa lista
-            juegos_visibles = Lista.obtener_juegos_de_lista(filtro_lista, juegos)
-            for juego in juegos_visibles:
-                carta, lbl = self.crear_carta(juego, filtro_lista)
-                self._cartas.append(carta)
-                cartas_juego[carta] = juego
-                labels[lbl] = juego
-        else:
-            # Sin filtro: una carta por cada carpeta + juegos sin carpeta
-            for nombre_lista in Lista.obtener_nombres():
-                juegos_en_lista = Lista.obtener_juegos_de_lista(nombre_lista, juegos)
-                carta = self.crear_carta_carpeta(nombre_lista, len(juegos_en_lista))
-                self._cartas.append(carta)
-                carpetas[carta] = nombre_lista
-
-            # Juegos sin carpeta asignada
-            juegos_sin_lista = Lista.obtener_juegos_de_lista(SIN_LISTA, juegos)
-            for juego in juegos_sin_lista:
-                carta, lbl = self.crear_carta(juego, None)
-                self._cartas.append(carta)
-                cartas_juego[carta] = juego
-                labels[lbl] = juego
-
-        # Posicionar con las columnas que quepan ahora
-        self._reflow_grid()
-
-        return cartas_juego, labels, carpetas
-
-    # Calcula cuántas columnas caben según el ancho del scrollArea
-    def _calcular_columnas(self):
-        ancho = self.scrollArea.viewport().width()
-        if ancho <= 0:
-            return 1
-        columnas = max(1, (ancho + self.CARD_SPACING) // (self.CARD_WIDTH + self.CARD_SPACING))
-        return columnas
-
-    # Reposiciona todas las cartas en el grid según las columnas actuales.
-    # Se llama en cada resizeEvent para hacer el grid responsivo.
-    def _reflow_grid(self):
-        if not self._cartas:
-            return
-
-        columnas = self._calcular_columnas()
-
-        # Quitar widgets del layout sin destruirlos
-        while self.gridLayout.count():
-            self.gridLayout.takeAt(0)
-
-        # Reposicionar
-        for i, carta in enumerate(self._cartas):
-            fila = i // columnas
-            col = i % columnas
-            self.gridLayout.addWidget(carta, fila, col, Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+        self.gridView.filtro_lista_actual = filtro_lista
+        self.gridModel.poblar(juegos, filtro_lista)
+
+    # Refresca la carta de un juego (p. ej. al llegar su portada)
+    def actualizar_carta(self, juego):
+        self.gridModel.actualizar_juego(juego)
+
+    # Muestra el progreso de la migración de la caché; con total = 0 lo oculta
+    def mostrar_progreso_migracion(self, hechos, total):
+        self.cache_progress.setVisible(total > 0)
+        self.cache_progress.setRange(0, max(total, 1))
+        self.cache_progress.setValue(hechos)
+
+    # Muestra el progreso del scrapeo; con total = 0 (nada en cola) lo oculta
+    def mostrar_progreso_scrapeo(self, hechos, total):
+        self.scrape_progress.setVisible(total > 0)
+        self.scrape_progress.setRange(0, max(total, 1))
+        self.scrape_progress.setValue(hechos)
+        self.btn_scrapear.setText(_TEXTO_CANCELAR_SCRAPEO if total > 0 else _TEXTO_SCRAPEAR)
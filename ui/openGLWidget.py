@@ -1,13 +1,27 @@
 # ── Imports ──────────────────────────────────────────────────────────
 import os
 import sys
+from concurrent.futures import Future
 # QOpenGLWidget: widget de Qt que crea y gestiona un contexto OpenGL.
 # Permite renderizar directamente con OpenGL dentro de una ventana Qt.
 from PyQt6.QtOpenGLWidgets import QOpenGLWidget
-from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from libretro.retro_core import RetroCore
-from audio.audio_manager import AudioManager
+from libretro.rewind import RewindBuffer
+from audio.audio_manager import AudioManager, DEFAULT_LATENCY_MS
 from input.input_manager import QtInputManager
+from ui.emulationThread import EmulationThread
+
+# Tecla que rebobina mientras se mantiene pulsada
+_REWIND_KEY = Qt.Key.Key_Backspace
+
+# Atajos de savestates (los gestiona GameWindow)
+_SAVESTATE_KEYS = {
+    Qt.Key.Key_F2: "guardar",
+    Qt.Key.Key_F4: "cargar",
+    Qt.Key.Key_F6: "slot_anterior",
+    Qt.Key.Key_F7: "slot_siguiente",
+}
 
 
 # Devuelve la ruta base del proyecto, compatible con PyInstaller.
@@ -26,6 +40,9 @@ def _get_base_path():
 # renderice con OpenGL mientras el resto de la UI usa el sistema de
 # ventanas normal de Qt.
 class OpenGLWidget(QOpenGLWidget):
+
+    atajo_savestate = pyqtSignal(str)  # "guardar", "cargar", "slot_anterior" o "slot_siguiente"
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.core_path = None          # Ruta a la DLL del core libretro
@@ -37,6 +54,13 @@ class OpenGLWidget(QOpenGLWidget):
         self.gl_ready = False          # True cuando el contexto OpenGL de Qt está listo
         self.core_options_extra = {}   # Opciones del frontend (resolución, renderizador, etc.)
         self._pending_volume = 1.0     # Volumen a aplicar cuando se cree el AudioManager
+        self.audio_latency_ms = DEFAULT_LATENCY_MS  # Profundidad del buffer de audio (se fija antes de load_game)
+        self.rewind_config = None      # (memoria MB, intervalo) del rebobinado; None = desactivado (se fija antes de load_game)
+        self.threaded = False          # True → retro_run en un EmulationThread propio (se fija antes de load_game)
+        self.emulation_thread = None   # EmulationThread activo en modo threaded
+        self._present_fbo = 0          # FBO del contexto del widget que envuelve la textura del core
+        self._present_tex = 0          # Textura del core a la que está enlazado _present_fbo
+        self.paint_pendiente = False   # True entre el update() de GameWindow y el paintGL que emula el frame
         # StrongFocus: el widget recibe pulsaciones de teclado al hacer clic
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
         # Tracking de ratón: recibir mouseMoveEvent incluso sin botón pulsado
@@ -70,6 +94,12 @@ class OpenGLWidget(QOpenGLWidget):
         # extra por tick del timer. Se activa con Tab (hold).
         self._fast_forward = False
 
+        # ── Rebobinado ──
+        # Mientras se mantiene _REWIND_KEY, RetroCore carga el estado anterior
+        # del RewindBuffer antes de cada frame. El audio se muta (sonaría a
+        # trozos repetidos) y el FramePacer pasa al reloj de pared.
+        self._rebobinando = False
+
     # Callback de Qt: se llama una sola vez cuando el contexto GL está listo.
     # No se puede usar OpenGL antes de que este método se ejecute.
     def initializeGL(self):
@@ -104,32 +134,101 @@ class OpenGLWidget(QOpenGLWidget):
             print(f"Error: ROM no encontrada en {self.rom_path}")
             return
 
+        self.audio_mgr = AudioManager(self.audio_latency_ms)
+        self.audio_mgr.volume = self._pending_volume
+        self.input_mgr = QtInputManager()
+
+        # Modo hilo de emulación: el core se crea y se ejecuta dentro del
+        # EmulationThread; el widget solo presenta los frames.
+        if self.threaded:
+            self.emulation_thread = EmulationThread(
+                self.context(), self.core_path, self.rom_path,
+                self.audio_mgr, self.input_mgr, self.core_options_extra,
+            )
+            self.emulation_thread.cargado.connect(self._on_emulation_thread_cargado)
+            self.emulation_thread.frame_listo.connect(self.update)
+            self.emulation_thread.start()
+            return
+
         # makeCurrent(): activa el contexto OpenGL de este widget.
         # Necesario antes de cualquier operación GL porque Qt puede tener
         # múltiples contextos y OpenGL es una máquina de estados global.
         self.makeCurrent()
 
-        self.audio_mgr = AudioManager()
-        self.audio_mgr.volume = self._pending_volume
-        self.input_mgr = QtInputManager()
         self.core = RetroCore(self.core_path, self.audio_mgr, self.input_mgr)
         # Aplicar opciones extra del frontend (resolución, etc.)
         for key, val in self.core_options_extra.items():
             self.core.set_option(key, val)
 
         if self.core.load_game(self.rom_path):
-            self.initialized = True
-            print("Juego iniciado en Qt!")
-            # Aplicar bindings pendientes antes de empezar
-            if self._pending_bindings is not None and self.input_mgr:
-                self.input_mgr.load_bindings(self._pending_bindings)
-            self._init_gamepad_polling()
-            self._audio_device_check_timer.start()
+            self._on_juego_iniciado()
         else:
             print("Fallo al iniciar el juego")
 
         self.doneCurrent()
 
+    # Pasos comunes tras cargar el juego con éxito (con o sin hilo de emulación)
+    def _on_juego_iniciado(self):
+        self.initialized = True
+        print("Juego iniciado en Qt!")
+        # Aplicar bindings pendientes antes de empezar
+        if self._pending_bindings is not None and self.input_mgr:
+            self.input_mgr.load_bindings(self._pending_bindings)
+        if self.rewind_config and self.core:
+            self.core.rewind = RewindBuffer(*self.rewind_config)
+            print(f"[Rewind] Activado: {self.rewind_config[0]} MB, "
+                  f"un estado cada {self.rewind_config[1]} frames")
+        self._init_gamepad_polling()
+        self._audio_device_check_timer.start()
+
+    # Slot de EmulationThread.cargado (llega en el hilo de la GUI).
+    def _on_emulation_thread_cargado(self, ok):
+        if not self.emulation_thread:
+            return
+        if ok:
+            self.core = self.emulation_thread.core
+            self._on_juego_iniciado()
+        else:
+            print("Fallo al iniciar el juego")
+
+    # Ejecuta fn(core) entre dos frames emulados. Con hilo de emulación se
+    # encola en ese hilo; sin él, el tick de GameWindow ya ocurre entre
+    # frames y se ejecuta directamente con el contexto GL del widget activo
+    # (como en el hilo). Devuelve un Future con el resultado.
+    def ejecutar_entre_frames(self, fn):
+        if self.emulation_thread:
+            return self.emulation_thread.ejecutar_entre_frames(fn)
+        futuro = Future()
+        self.makeCurrent()
+        try:
+            futuro.set_result(fn(self.core))
+        except Exception as e:
+            print(f"Error ejecutando comando entre frames: {e}")
+            futuro.set_exception(e)
+        finally:
+            self.doneCurrent()
+        return futuro
+
+    # Para el hilo de emulación (que descarga el core en su propio contexto)
+    # y libera el FBO de presentación, que pertenece al contexto del widget.
+    def _detener_emulation_thread(self):
+        thread = self.emulation_thread
+        self.emulation_thread = None
+        thread.stop()
+        thread.wait()
+        thread.deleteLater()
+        if self._present_fbo:
+            from OpenGL.GL import glDeleteFramebuffers
+            self.makeCurrent()
+            try:
+                glDeleteFramebuffers(1, [self._present_fbo])
+            except Exception as e:
+                print(f"Aviso: Error liberando FBO de presentación: {e}")
+            self.doneCurrent()
+        self._present_fbo = 0
+        self._present_tex = 0
+        self.core = None
+
     # Descarga el core y el audio, dejando el widget GL vivo.
     # El contexto OpenGL del widget NO se destruye aquí; se reutiliza
     # para el siguiente juego o se destruye con el widget.
@@ -137,6 +236,8 @@ class OpenGLWidget(QOpenGLWidget):
         self._gamepad_poll_timer.stop()
         self._audio_device_check_timer.stop()
         self._pygame_joystick = None
+        if self.emulation_thread:
+            self._detener_emulation_thread()
         if self.core:
             # makeCurrent() antes de unload: es necesario porque los recursos
             # OpenGL (FBOs, texturas, shaders) solo se pueden liberar con el
@@ -213,6 +314,7 @@ class OpenGLWidget(QOpenGLWidget):
         self.core_path = None
         self.rom_path = None
         self._fast_forward = False
+        self._rebobinando = False
 
     # Guarda bindings para aplicar cuando se cree el input_mgr.
     # Si ya existe, los aplica inmediatamente.
@@ -299,7 +401,10 @@ class OpenGLWidget(QOpenGLWidget):
     # Callback de Qt: se llama cada vez que el widget debe repintarse.
     # Aquí se ejecuta un frame completo del emulador (retro_run).
     def paintGL(self):
-        if self.initialized and self.core and self.core.lib:
+        self.paint_pendiente = False
+        if self.emulation_thread and self.initialized and self.core:
+            self._presentar_frame_threaded()
+        elif self.initialized and self.core and self.core.lib:
             # defaultFramebufferObject(): devuelve el ID del FBO que Qt usa
             # para este widget. El core renderiza aquí y Qt lo muestra en pantalla.
             current_fbo = self.defaultFramebufferObject()
@@ -318,17 +423,78 @@ class OpenGLWidget(QOpenGLWidget):
             glClearColor(0, 0, 0, 1)
             glClear(GL_COLOR_BUFFER_BIT)
 
+    # Presenta el último frame del hilo de emulación: blit desde la textura
+    # compartida del core al FBO de Qt. Si el hilo está a mitad de retro_run
+    # se espera como mucho unos milisegundos; si no, se conserva el frame
+    # anterior (QOpenGLWidget mantiene el contenido de su FBO entre paints).
+    def _presentar_frame_threaded(self):
+        from OpenGL.GL import (
+            glGenFramebuffers, glDeleteFramebuffers, glBindFramebuffer,
+            glFramebufferTexture2D, GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D,
+        )
+        dpr = self.devicePixelRatio()
+        self.core.update_video(int(self.width() * dpr), int(self.height() * dpr))
+        vx, vy, vw, vh = self.core.view_rect
+        self.input_mgr.update_viewport(vx, vy, vw, vh)
+
+        lock = self.emulation_thread.frame_lock
+        if not lock.acquire(timeout=0.004):
+            return
+        try:
+            tex_id = self.core.tex_id
+            if not tex_id or not self.core.frame_desc:
+                return
+            # El core recrea su textura al cambiar de resolución: re-enlazarla
+            if self._present_tex != tex_id:
+                if not self._present_fbo:
+                    self._present_fbo = int(glGenFramebuffers(1))
+                glBindFramebuffer(GL_FRAMEBUFFER, self._present_fbo)
+                glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, tex_id, 0)
+                glBindFramebuffer(GL_FRAMEBUFFER, 0)
+                self._present_tex = tex_id
+            self.core.blit_frame(self._present_fbo, self.defaultFramebufferObject())
+        finally:
+            lock.release()
+
     # ── Eventos de teclado ──
     # Qt llama a estos métodos cuando se pulsa/suelta una tecla mientras
-    # este widget tiene el foco. Se delegan al InputManager.
+    # este widget tiene el foco. Se delegan al InputManager, salvo la tecla
+    # de rebobinar y los atajos de savestates (se ignoran las repeticiones
+    # automáticas del teclado).
     def keyPressEvent(self, event):
+        if event.key() == _REWIND_KEY:
+            if not event.isAutoRepeat():
+                self.set_rewinding(True)
+            return
+        if event.key() in _SAVESTATE_KEYS:
+            if not event.isAutoRepeat():
+                self.atajo_savestate.emit(_SAVESTATE_KEYS[event.key()])
+            return
         if self.input_mgr:
             self.input_mgr.handle_key_press(event.key())
 
     def keyReleaseEvent(self, event):
+        if event.key() == _REWIND_KEY:
+            if not event.isAutoRepeat():
+                self.set_rewinding(False)
+            return
+        if event.key() in _SAVESTATE_KEYS:
+            return
         if self.input_mgr:
             self.input_mgr.handle_key_release(event.key())
 
+    # Activa/desactiva el rebobinado. Sin rebobinado configurado no hace nada.
+    # El flag lo lee RetroCore.run() en el hilo que emula (GUI o EmulationThread).
+    def set_rewinding(self, enabled):
+        enabled = bool(enabled)
+        rewind = self.core.rewind if self.core else None
+        if rewind is None or enabled == self._rebobinando:
+            return
+        self._rebobinando = enabled
+        rewind.rebobinando = enabled
+        if self.audio_mgr:
+            self.audio_mgr.set_muted(enabled or self._fast_forward)
+
     # Activa/desactiva fast-forward. Muta el audio (libera el throttle
     # bloqueante de PyAudio) y marca el flag que GameWindow consulta para
     # ejecutar frames extra por tick.
@@ -338,7 +504,9 @@ class OpenGLWidget(QOpenGLWidget):
             return
         self._fast_forward = enabled
         if self.audio_mgr:
-            self.audio_mgr.set_muted(enabled)
+            self.audio_mgr.set_muted(enabled or self._rebobinando)
+        if self.emulation_thread:
+            self.emulation_thread.set_fast_forward(enabled)
 
     # Ejecuta un frame emulado sin presentar en pantalla. Usado por
     # GameWindow durante fast-forward para multiplicar la velocidad.
@@ -349,6 +517,9 @@ class OpenGLWidget(QOpenGLWidget):
     # No llamamos a set_target_fbo/update_video porque solo se usan en
     # el blit final que ahora se salta.
     def run_extra_frame(self):
+        # Con hilo de emulación los frames extra los ejecuta el propio hilo
+        if self.emulation_thread:
+            return
         if not (self.initialized and self.core and self.core.lib):
             return
         self.makeCurrent()
@@ -0,0 +1,195 @@
+# ── Imports ──────────────────────────────────────────────────────────
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, pyqtSignal
+from api.screenscraper import cargar_info_cache, obtener_ruta_media
+from game.rom_header import leer_cabecera
+
+# Hilos del pool. Cuántas peticiones van a la vez lo decide el limitador de
+# la API con la cuota de la cuenta; estos hilos solo ponen el techo (y
+# mientras uno espera al limitador, otro puede estar calculando hashes).
+_MAX_HILOS = 4
+# Hilos para las imágenes de galería que pide la página de detalle. Van en
+# su propio pool para no esperar detrás de los juegos en cola (cada uno
+# calcula hashes y hace varias llamadas a la API).
+_HILOS_GALERIA = 2
+
+
+# Servicio único de scraping: cola de juegos pendientes de ScreenScraper
+# atendida por un pool de hilos acotado.
+#
+# Sustituye al QThread por juego que había antes: los juegos nuevos, la
+# página de detalle y la acción "Scrapear biblioteca" encolan aquí. Las
+# peticiones de la página de detalle van al principio de la cola (el
+# usuario está esperando) y las demás al final. Un juego que ya está en cola
+# no se encola dos veces.
+#
+# Cada juego se procesa con ScreenScraperAPI.scrapear (hashes, búsqueda,
+# descargas y caché) en un hilo del pool; el resultado llega al hilo de la
+# GUI por juego_scrapeado / juego_fallido. progreso(hechos, total) cuenta
+# los juegos terminados del lote actual; vuelve a (0, 0) al vaciarse.
+#
+# Con galeria_diferida los juegos se scrapean sin las imágenes de la
+# galería; la página de detalle las pide una a una con pedir_media() cuando
+# van a verse (en un pool aparte, el usuario las está esperando) y llegan
+# por media_lista.
+class ScrapingService(QObject):
+    juego_scrapeado = pyqtSignal(object, dict)   # juego, info guardada en caché
+    juego_fallido = pyqtSignal(object, str)      # juego, mensaje de error
+    progreso = pyqtSignal(int, int)              # hechos, total
+    media_lista = pyqtSignal(str, str)           # nombre_archivo, ruta de la imagen (puede no existir si falló)
+    _terminado = pyqtSignal(object, object)      # juego, info o None (desde un worker)
+    _media_terminada = pyqtSignal(str)           # ruta pedida (desde un worker)
+
+    def __init__(self, api, ruta_games, parent=None):
+        super().__init__(parent)
+        self.api = api
+        self.ruta_games = ruta_games
+        self._pool = ThreadPoolExecutor(max_workers=_MAX_HILOS, thread_name_prefix="scraper")
+        self._pool_galeria = ThreadPoolExecutor(max_workers=_HILOS_GALERIA, thread_name_prefix="galeria")
+        self._lock = threading.Lock()
+        self._cola = deque()        # (juego, título, cabecera o None) pendientes
+        self._encolados = set()     # nombre_archivo de los juegos en cola o en curso
+        self._hechos = 0
+        self._total = 0
+        self._medias_pedidas = {}   # ruta → nombre_archivo de las medias en descarga
+        self.galeria_diferida = False
+        self._terminado.connect(self._on_terminado)
+        self._media_terminada.connect(self._on_media_terminada)
+
+    @property
+    def activo(self):
+        return self._total > 0
+
+    # Encola un juego. 'prioritario' lo pone delante de todo lo pendiente.
+    # Devuelve False si ya estaba en cola.
+    def encolar(self, juego, prioritario=False):
+        if juego.nombre_archivo in self._encolados:
+            if prioritario:
+                self._priorizar(juego.nombre_archivo)
+            return False
+        # Aquí solo se mira la cabecera ya conocida (el índice de la
+        # biblioteca solo se toca desde el hilo de la GUI); si falta, la lee
+        # el worker de la ROM (ver _nombre_busqueda)
+        item = (juego, juego.titulo, juego.cabecera_conocida())
+
+        self._encolados.add(juego.nombre_archivo)
+        with self._lock:
+            if prioritario:
+                self._cola.appendleft(item)
+            else:
+                self._cola.append(item)
+        self._total += 1
+        self._pool.submit(self._trabajar)
+        self.progreso.emit(self._hechos, self._total)
+        return True
+
+    # Encola todos los juegos que aún no tienen caché de ScreenScraper.
+    # Devuelve cuántos se han encolado.
+    def encolar_biblioteca(self, juegos):
+        encolados = 0
+        for juego in juegos:
+            if cargar_info_cache(self.ruta_games, juego.nombre_archivo):
+                continue
+            if self.encolar(juego):
+                encolados += 1
+        print(f"[ScreenScraper] {encolados} juegos encolados para scrapear")
+        return encolados
+
+    # Descarga una imagen de la galería diferida de un juego ('nombre' y
+    # 'url' de info["galeria"]). Avisa por media_lista al terminar, se haya
+    # podido descargar o no; si ya se está descargando no hace nada.
+    def pedir_media(self, nombre_archivo, nombre, url):
+        ruta = obtener_ruta_media(self.ruta_games, nombre_archivo, nombre)
+        if ruta in self._medias_pedidas:
+            return
+        self._medias_pedidas[ruta] = nombre_archivo
+        try:
+            self._pool_galeria.submit(self._descargar_media, ruta, nombre_archivo, nombre, url)
+        except RuntimeError:   # pool ya cerrado
+            del self._medias_pedidas[ruta]
+
+    # Descarta lo que aún no ha empezado (lo que está en curso termina)
+    def cancelar(self):
+        with self._lock:
+            descartados = list(self._cola)
+            self._cola.clear()
+        for juego, _, _ in descartados:
+            self._encolados.discard(juego.nombre_archivo)
+        self._total -= len(descartados)
+        self._emitir_progreso()
+
+    def cerrar(self):
+        self.cancelar()
+        # Sin esperar: una petición en curso puede tardar hasta su timeout
+        self._pool.shutdown(wait=False)
+        self._pool_galeria.shutdown(wait=False, cancel_futures=True)
+
+    def _priorizar(self, nombre_archivo):
+        with self._lock:
+            for i, item in enumerate(self._cola):
+                if item[0].nombre_archivo == nombre_archivo:
+                    del self._cola[i]
+                    self._cola.appendleft(item)
+                    break
+
+    # --- Hilos del pool ---
+
+    # Cada encolar() manda una tarea; cada tarea atiende el primer juego de
+    # la cola en ese momento (no necesariamente el suyo)
+    def _trabajar(self):
+        with self._lock:
+            if not self._cola:
+                return
+            juego, titulo, cabecera = self._cola.popleft()
+        try:
+            nombre_busqueda = self._nombre_busqueda(juego, titulo, cabecera)
+            info = self.api.scrapear(
+                nombre_busqueda, juego.extension,
+                self.ruta_games, juego.nombre_archivo, juego.ruta_juego,
+                galeria_diferida=self.galeria_diferida,
+            )
+        except Exception as e:
+            print(f"[ScreenScraper] Error scrapeando '{juego.nombre_archivo}': {e}")
+            info = None
+        self._terminado.emit(juego, info)
+
+    # Título de la cabecera de la ROM, o el de la biblioteca si no tiene.
+    # Si al encolar no se conocía la cabecera, se lee aquí (fuera de la GUI).
+    @staticmethod
+    def _nombre_busqueda(juego, titulo, cabecera):
+        if cabecera is None:
+            cabecera = leer_cabecera(juego.ruta_juego, juego.extension)
+        titulo_rom = cabecera.titulo if cabecera else None
+        nombre_busqueda = titulo_rom if titulo_rom else titulo
+        print(f"[ScreenScraper] Buscando juego: '{nombre_busqueda}' (título ROM: {titulo_rom!r})")
+        return nombre_busqueda
+
+    def _descargar_media(self, ruta, nombre_archivo, nombre, url):
+        try:
+            self.api.descargar_media_galeria(self.ruta_games, nombre_archivo, nombre, url)
+        except Exception as e:
+            print(f"[ScreenScraper] Error descargando '{nombre}': {e}")
+        self._media_terminada.emit(ruta)
+
+    # --- Hilo de la GUI ---
+
+    def _on_terminado(self, juego, info):
+        self._encolados.discard(juego.nombre_archivo)
+        self._hechos += 1
+        if info:
+            self.juego_scrapeado.emit(juego, info)
+        else:
+            self.juego_fallido.emit(juego, "No se encontró información del juego en ScreenScraper")
+        self._emitir_progreso()
+
+    def _on_media_terminada(self, ruta):
+        nombre_archivo = self._medias_pedidas.pop(ruta, None)
+        if nombre_archivo:
+            self.media_lista.emit(nombre_archivo, ruta)
+
+    def _emitir_progreso(self):
+        if self._hechos >= self._total:
+            self._hechos = self._total = 0
+        self.progreso.emit(self._hechos, self._total)
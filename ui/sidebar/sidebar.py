@@ -38,6 +38,10 @@ class Sidebar(QObject):
             seccion.lista_clicked.connect(self.lista_clicked.emit)
             seccion.lista_borrada.connect(self.lista_borrada.emit)
 
+    # Actualiza el icono de un juego (p. ej. al terminar de extraerlo)
+    def actualizar_icono(self, juego):
+        self.ui.actualizar_icono(juego.nombre_archivo, juego.imagen_rom)
+
     # Muestra el popup para añadir una nueva carpeta.
     # Si el usuario confirma, crea la lista y emite todos_clicked para refrescar.
     def _crear_nueva_lista(self):
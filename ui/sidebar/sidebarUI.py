@@ -1,13 +1,12 @@
 # ── Imports ──────────────────────────────────────────────────────
-import os
-
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
     QScrollArea, QFrame, QSizePolicy
 )
 from PyQt6.QtCore import Qt, pyqtSignal, QSize
-from PyQt6.QtGui import QIcon, QPixmap
+from PyQt6.QtGui import QIcon
 from lista import Lista, SIN_LISTA
+from ui.thumbnailCache import obtener_cache
 
 
 # Sección colapsable en la barra lateral: cabecera (flecha + nombre) + lista de juegos.
@@ -95,13 +94,23 @@ class _ListaSeccion(QWidget):
             btn.setProperty("nombre_archivo", juego.nombre_archivo)
             # Icono de la ROM (no la portada de la API)
             icono = juego.imagen_rom if hasattr(juego, 'imagen_rom') and juego.imagen_rom else juego.imagen
-            if icono and os.path.isfile(icono):
-                btn.setIcon(QIcon(QPixmap(icono)))
+            pixmap = obtener_cache().cargar(icono, 28, 28)
+            if not pixmap.isNull():
+                btn.setIcon(QIcon(pixmap))
                 btn.setIconSize(QSize(28, 28))
             btn.clicked.connect(lambda checked, na=juego.nombre_archivo: self.juego_clicked.emit(na))
             self.items_layout.addWidget(btn)
             self._items.append(btn)
 
+    # Pone el icono del juego 'nombre_archivo' si está en esta sección
+    def set_icono(self, nombre_archivo, icono):
+        for btn in self._items:
+            if btn.property("nombre_archivo") == nombre_archivo:
+                pixmap = obtener_cache().cargar(icono, 28, 28)
+                if not pixmap.isNull():
+                    btn.setIcon(QIcon(pixmap))
+                    btn.setIconSize(QSize(28, 28))
+
 
 # Widget visual de la barra lateral (sin lógica de negocio).
 # Contiene el botón "Todos los juegos", botón "+" para crear listas,
@@ -188,3 +197,8 @@ class SidebarUI(QFrame):
             self._secciones.append(seccion)
 
         return self._secciones
+
+    # Actualiza el icono de un juego en las secciones donde aparezca
+    def actualizar_icono(self, nombre_archivo, icono):
+        for seccion in self._secciones:
+            seccion.set_icono(nombre_archivo, icono)
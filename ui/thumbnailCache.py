@@ -0,0 +1,237 @@
+# ── Imports ──────────────────────────────────────────────────────────
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+# Memoria máxima de las miniaturas ya convertidas a QPixmap
+DEFAULT_MAX_BYTES = 96 * 1024 * 1024
+
+# Tamaño máximo de la caché en disco; al arrancar se borran las miniaturas
+# más antiguas hasta bajar de aquí
+DEFAULT_MAX_DISCO = 256 * 1024 * 1024
+
+# Hilos que decodifican portadas (QImage es seguro fuera del hilo de la GUI)
+_NUM_WORKERS = 2
+
+
+# Caché de miniaturas de portadas e iconos de ROM.
+#
+# Dos niveles:
+#   - Memoria: QPixmap ya escalados, LRU acotada por bytes. Clave
+#     (ruta, ancho, alto). obtener() la usa sin mirar el disco (se llama en
+#     cada repintado del grid), así que quien cambia una imagen en el mismo
+#     sitio (p. ej. el scraper al descargar la portada) llama a
+#     invalidar(ruta); cargar() sí comprueba mtime y tamaño.
+#   - Disco: PNG escalados en <directorio>/<sha1>.png. La clave incluye
+#     ruta, mtime, tamaño del archivo y tamaño destino, así una portada
+#     modificada nunca reutiliza una miniatura vieja.
+#
+# obtener() no bloquea: si la miniatura no está en memoria la encola para
+# los hilos de trabajo y devuelve None; cuando está lista se emite
+# miniatura_lista(ruta) en el hilo de la GUI. Las peticiones se atienden
+# de la más reciente a la más antigua, así al hacer scroll rápido se
+# cargan primero las cartas que están en pantalla. cargar() es la versión
+# síncrona para las vistas que muestran una sola imagen.
+class ThumbnailCache(QObject):
+    miniatura_lista = pyqtSignal(str)                 # ruta de la imagen original
+    _imagen_generada = pyqtSignal(object, object)     # clave, QImage (desde un worker)
+
+    def __init__(self, directorio=None, max_bytes=DEFAULT_MAX_BYTES,
+                 max_disco=DEFAULT_MAX_DISCO, parent=None):
+        super().__init__(parent)
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self._memoria = OrderedDict()      # clave → (QPixmap, firma) (más recientes al final)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._pendientes = OrderedDict()   # claves encoladas aún sin atender (pila)
+        self._en_curso = set()             # claves encoladas o decodificándose
+        self._pool = ThreadPoolExecutor(max_workers=_NUM_WORKERS, thread_name_prefix="miniaturas")
+        self._imagen_generada.connect(self._on_imagen_generada)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+            self._pool.submit(self._limpiar_disco, max_disco)
+
+    # Miniatura en memoria o None (y se encola su generación)
+    def obtener(self, ruta, ancho, alto):
+        if not ruta:
+            return None
+        clave = (ruta, ancho, alto)
+        entrada = self._memoria.get(clave)
+        if entrada is not None:
+            self._memoria.move_to_end(clave)
+            return entrada[0]
+        if clave not in self._en_curso:
+            self._en_curso.add(clave)
+            with self._lock:
+                self._pendientes[clave] = None
+            self._pool.submit(self._trabajar)
+        return None
+
+    # Miniatura síncrona (memoria → disco → decodificar). Devuelve un
+    # QPixmap nulo si la imagen no existe o no se puede leer.
+    def cargar(self, ruta, ancho, alto):
+        if not ruta:
+            return QPixmap()
+        clave = (ruta, ancho, alto)
+        entrada = self._memoria.get(clave)
+        if entrada is not None and entrada[1] == _firma(ruta):
+            self._memoria.move_to_end(clave)
+            return entrada[0]
+        return self._guardar_en_memoria(clave, *self._generar(ruta, ancho, alto))
+
+    # Olvida las miniaturas en memoria de 'ruta' (la de disco se descarta
+    # sola porque cambian mtime/tamaño)
+    def invalidar(self, ruta):
+        for clave in [c for c in self._memoria if c[0] == ruta]:
+            self._bytes -= _bytes_pixmap(self._memoria.pop(clave)[0])
+        # Lo que se esté generando de la versión anterior se descarta al llegar
+        self._en_curso.difference_update([c for c in self._en_curso if c[0] == ruta])
+
+    # Descarta las peticiones que aún no ha empezado ningún hilo
+    def cancelar_pendientes(self):
+        with self._lock:
+            claves = list(self._pendientes)
+            self._pendientes.clear()
+        self._en_curso.difference_update(claves)
+
+    def cerrar(self):
+        self.cancelar_pendientes()
+        self._pool.shutdown(wait=True)
+
+    # --- Hilos de trabajo ---
+
+    # Cada petición encola una tarea; cada tarea atiende la petición más
+    # reciente que quede (LIFO), no necesariamente la suya
+    def _trabajar(self):
+        with self._lock:
+            if not self._pendientes:
+                return
+            clave, _ = self._pendientes.popitem(last=True)
+        try:
+            resultado = self._generar(*clave)
+        except Exception as e:
+            print(f"[Miniaturas] Error generando {clave[0]}: {e}")
+            resultado = (QImage(), None)
+        self._imagen_generada.emit(clave, resultado)
+
+    # Devuelve (QImage, firma) con la miniatura: de la caché de disco si
+    # existe; si no, decodifica la original, la escala y la guarda en disco
+    def _generar(self, ruta, ancho, alto):
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            return QImage(), None
+        firma = (st.st_mtime_ns, st.st_size)
+        ruta_disco = self._ruta_disco(ruta, firma, ancho, alto)
+        if ruta_disco and os.path.exists(ruta_disco):
+            imagen = QImage(ruta_disco)
+            if not imagen.isNull():
+                return imagen, firma
+
+        reader = QImageReader(ruta)
+        reader.setAutoTransform(True)
+        imagen = reader.read()
+        if imagen.isNull():
+            print(f"[Miniaturas] No se pudo leer {ruta}: {reader.errorString()}")
+            return imagen, firma
+        imagen = imagen.scaled(
+            ancho, alto,
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+        if ruta_disco:
+            tmp = ruta_disco + ".tmp"
+            try:
+                if imagen.save(tmp, "PNG"):
+                    os.replace(tmp, ruta_disco)
+            except OSError as e:
+                print(f"[Miniaturas] No se pudo guardar en caché {ruta}: {e}")
+        return imagen, firma
+
+    def _ruta_disco(self, ruta, firma, ancho, alto):
+        if not self.directorio:
+            return None
+        mtime_ns, tamano = firma
+        clave = f"{os.path.abspath(ruta)}|{mtime_ns}|{tamano}|{ancho}x{alto}"
+        nombre = hashlib.sha1(clave.encode("utf-8")).hexdigest()
+        return os.path.join(self.directorio, nombre + ".png")
+
+    # Borra las miniaturas en disco más antiguas si se pasa de max_disco
+    def _limpiar_disco(self, max_disco):
+        try:
+            entradas = [e for e in os.scandir(self.directorio) if e.is_file()]
+            archivos = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entradas]
+        except OSError:
+            return
+        total = sum(tam for _, tam, _ in archivos)
+        if total <= max_disco:
+            return
+        for _, tam, ruta in sorted(archivos):
+            try:
+                os.remove(ruta)
+            except OSError:
+                continue
+            total -= tam
+            if total <= max_disco:
+                break
+
+    # --- Hilo de la GUI ---
+
+    # QPixmap solo se puede crear en el hilo de la GUI: aquí llega cada
+    # QImage generada por un worker
+    def _on_imagen_generada(self, clave, resultado):
+        if clave not in self._en_curso:
+            return   # cancelada o invalidada mientras se generaba
+        self._en_curso.discard(clave)
+        self._guardar_en_memoria(clave, *resultado)
+        self.miniatura_lista.emit(clave[0])
+
+    def _guardar_en_memoria(self, clave, imagen, firma):
+        pixmap = QPixmap.fromImage(imagen) if not imagen.isNull() else QPixmap()
+        anterior = self._memoria.pop(clave, None)
+        if anterior is not None:
+            self._bytes -= _bytes_pixmap(anterior[0])
+        # Los nulos también se guardan, para no reintentar imágenes ilegibles
+        self._memoria[clave] = (pixmap, firma)
+        self._bytes += _bytes_pixmap(pixmap)
+        while self._bytes > self.max_bytes and len(self._memoria) > 1:
+            _, (viejo, _) = self._memoria.popitem(last=False)
+            self._bytes -= _bytes_pixmap(viejo)
+        return pixmap
+
+
+# Firma de un archivo (mtime en ns, tamaño) o None si no existe
+def _firma(ruta):
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _bytes_pixmap(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+# Instancia compartida por el grid, la barra lateral y la página de detalle
+_INSTANCIA = None
+
+
+# Crea la caché compartida con su directorio en disco (lo llama MainWindow
+# al arrancar). Si nadie la configura, obtener_cache() crea una solo en memoria.
+def configurar_cache(directorio):
+    global _INSTANCIA
+    _INSTANCIA = ThumbnailCache(directorio)
+    return _INSTANCIA
+
+
+def obtener_cache():
+    global _INSTANCIA
+    if _INSTANCIA is None:
+        _INSTANCIA = ThumbnailCache()
+    return _INSTANCIA